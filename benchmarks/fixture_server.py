@@ -0,0 +1,183 @@
+"""
+Local site for the benchmarks, so they never touch the network.
+
+    /static/<i>    plain server-rendered profile page
+    /spa/<i>       empty app shell, content injected by JS after a delay
+    /scroll/<i>    listing that keeps loading more items as you scroll
+    /large/<i>     one huge listing page (thousands of rows)
+    /media/<i>     JS-rendered listing with photos, a web font and a video (see fetch profiles)
+    /asset/<f>     dummy image/font/video bytes, served slowly like a CDN far away
+    /recorded/<f>  any saved page dropped into benchmarks/fixtures/
+
+Run on its own with `python benchmarks/fixture_server.py` to click around.
+"""
+import os
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+FIRST_NAMES = ["Maria", "Jose", "Ana", "Mark", "Grace", "Paolo", "Liza", "Carlo", "Joy", "Miguel"]
+LAST_NAMES = ["Santos", "Reyes", "Cruz", "Bautista", "Garcia", "Mendoza", "Torres", "Flores", "Ramos", "Aquino"]
+TITLES = ["Real Estate Broker", "Sales Agent", "Property Manager", "Leasing Consultant", "Appraiser"]
+CITIES = ["Makati", "Taguig", "Quezon City", "Pasig", "Cebu City", "Davao City"]
+FILLER = (
+    "helps families find homes across the metro and has closed deals on condos, townhouses "
+    "and lots. Known for quick replies, honest pricing advice and patient site visits, "
+    "with a background in marketing and a license renewed every year. "
+)
+
+
+def person(i: int) -> dict:
+    """Same fake person for the same number, every run."""
+    rng = random.Random(i)
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    return {
+        "name": f"{first} {last}",
+        "title": rng.choice(TITLES),
+        "email": f"{first.lower()}.{last.lower()}{i}@example.com",
+        "phone": f"+63 917 {rng.randint(100, 999)} {rng.randint(1000, 9999)}",
+        "city": rng.choice(CITIES),
+        "price": f"₱{rng.randint(2, 40)},{rng.randint(100, 999)},000",
+    }
+
+
+def profile_html(p: dict) -> str:
+    return (
+        f"<h1>{p['name']}</h1>"
+        f"<p>Name: {p['name']}</p><p>Title: {p['title']}</p><p>City: {p['city']}</p>"
+        f"<p>Email: {p['email']}</p><p>Phone: {p['phone']}</p>"
+        f"<p>{p['name']} {FILLER * 4}</p>"
+    )
+
+
+def static_page(i: int) -> str:
+    p = person(i)
+    return f"<html><head><title>{p['name']}</title></head><body><nav>Home | Agents</nav>{profile_html(p)}</body></html>"
+
+
+def spa_page(i: int) -> str:
+    """Nothing in the HTML, the browser has to run the script (and static_tier should notice)."""
+    body = json.dumps(profile_html(person(i)))
+    return (
+        "<html><head><title>Loading</title></head><body>"
+        '<div id="root"></div><noscript>You need to enable JavaScript to run this app.</noscript>'
+        f"<script>setTimeout(function() {{ document.getElementById('root').innerHTML = {body}; }}, 300);</script>"
+        "</body></html>"
+    )
+
+
+def listing_row(i: int) -> str:
+    p = person(i)
+    return f"<li><b>{p['name']}</b> - {p['title']}, {p['city']} - {p['price']} - {p['phone']}</li>"
+
+
+def scroll_page(i: int, per_batch: int = 20, batches: int = 10) -> str:
+    """Infinite scroll: each time the bottom is reached another batch is appended, `batches` times."""
+    first = "".join(listing_row(i * 1000 + n) for n in range(per_batch))
+    more = json.dumps([
+        "".join(listing_row(i * 1000 + b * per_batch + n) for n in range(per_batch)) for b in range(1, batches)
+    ])
+    return (
+        "<html><body><h1>Listings</h1><ul id='list'>" + first + "</ul>"
+        "<script>var more = " + more + ";"
+        "window.addEventListener('scroll', function() {"
+        "  if (more.length && window.innerHeight + window.scrollY >= document.body.scrollHeight - 50) {"
+        "    var chunk = more.shift();"
+        "    setTimeout(function() { document.getElementById('list').insertAdjacentHTML('beforeend', chunk); }, 150);"
+        "  }"
+        "});</script></body></html>"
+    )
+
+
+ASSET_TYPES = {".jpg": ("image/jpeg", 120_000), ".woff2": ("font/woff2", 40_000), ".mp4": ("video/mp4", 1_500_000)}
+ASSET_DELAY_S = 0.05
+
+
+def media_page(i: int, photos: int = 12) -> str:
+    """Real-estate style listing: the text is small, the photos, font and video are most of the bytes."""
+    gallery = "".join(f'<img src="/asset/{i}-{n}.jpg" width="400">' for n in range(photos))
+    body = json.dumps(profile_html(person(i)) + gallery + f'<video src="/asset/{i}.mp4" autoplay muted></video>')
+    return (
+        "<html><head><title>Listing</title>"
+        f"<style>@font-face {{ font-family: Brand; src: url('/asset/{i}.woff2'); }} body {{ font-family: Brand; }}</style>"
+        '</head><body><div id="root"></div>'
+        f"<script>document.getElementById('root').innerHTML = {body};</script>"
+        "</body></html>"
+    )
+
+
+def large_page(i: int, rows: int = 3000) -> str:
+    return "<html><body><h1>All listings</h1><ul>" + "".join(listing_row(i * 100000 + n) for n in range(rows)) + "</ul></body></html>"
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+        kind = parts[0] if parts else ""
+        arg = parts[1] if len(parts) > 1 else "0"
+        number = int(arg) if arg.isdigit() else 0
+
+        if kind == "static":
+            html = static_page(number)
+        elif kind == "spa":
+            html = spa_page(number)
+        elif kind == "scroll":
+            html = scroll_page(number)
+        elif kind == "large":
+            html = large_page(number)
+        elif kind == "media":
+            html = media_page(number)
+        elif kind == "asset":
+            self.send_asset(arg)
+            return
+        elif kind == "recorded":
+            path = os.path.join(FIXTURES_DIR, os.path.basename(arg))
+            if not os.path.isfile(path):
+                self.send_error(404)
+                return
+            with open(path, encoding="utf-8", errors="replace") as f:
+                html = f.read()
+        else:
+            self.send_error(404)
+            return
+
+        body = html.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_asset(self, name: str):
+        content_type, size = ASSET_TYPES.get(os.path.splitext(name)[1], ("application/octet-stream", 10_000))
+        time.sleep(ASSET_DELAY_S)
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+        try:
+            self.wfile.write(b"\0" * size)
+        except (BrokenPipeError, ConnectionResetError):
+            # The browser gave up on it (blocked or page closed)
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fixture_server(port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Starts the site on a background thread. Returns (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    server, base_url = start_fixture_server(8765)
+    print(f"Fixture site on {base_url} (static/1, spa/1, scroll/1, large/1, media/1)")
+    threading.Event().wait()
@@ -0,0 +1,126 @@
+"""
+OpenAI-compatible mock LLM for the benchmarks.
+
+Answers POST /v1/chat/completions after a configurable delay, with records built
+from the prompt itself ("Field: value" lines, emails, phones), so extraction
+code paths run end to end. Point litellm at it with OPENAI_API_BASE and use an
+"openai/..." model name.
+"""
+import os
+import re
+import sys
+import json
+import time
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from pre_extractors import EMAIL_RE, PHONE_RE
+
+SCHEMA_FIELD_RE = re.compile(r'"(\w+)":\s*\{\s*"description"')
+PAGE_RE = re.compile(r'<page id="(\d+)"[^>]*>(.*?)</page>', re.S)
+
+
+@dataclass
+class MockLLMSettings:
+    """
+    latency_s: fixed delay per call
+    latency_per_1k_tokens_s: extra delay per 1k prompt tokens (long prompts are slower)
+    price_per_1k_prompt / price_per_1k_completion: USD the benchmark charges per 1k tokens
+    """
+    latency_s: float = 0.5
+    latency_per_1k_tokens_s: float = 0.02
+    price_per_1k_prompt: float = 0.00015
+    price_per_1k_completion: float = 0.0006
+
+
+def fake_record(fields: List[str], text: str) -> dict:
+    record = {}
+    for field in fields:
+        label = field.replace("_", " ")
+        match = re.search(rf"{re.escape(label)}\s*:\s*([^\n<|]+)", text, re.I)
+        if match:
+            record[field] = match.group(1).strip()
+        elif "email" in field.lower() and EMAIL_RE.search(text):
+            record[field] = EMAIL_RE.search(text).group(0)
+        elif "phone" in field.lower() and PHONE_RE.search(text):
+            record[field] = PHONE_RE.search(text).group(0).strip()
+        else:
+            record[field] = "N/A"
+    return record
+
+
+def answer(prompt: str) -> str:
+    """What a well-behaved model would say to our extraction and batch prompts."""
+    fields = list(dict.fromkeys(SCHEMA_FIELD_RE.findall(prompt)))
+    pages = PAGE_RE.findall(prompt)
+    if pages:
+        # llm_batching.BATCH_PROMPT: {"1": [...], "2": [...]}
+        return json.dumps({page_id: [fake_record(fields, body)] for page_id, body in pages})
+    # crawl4ai's LLMExtractionStrategy reads a JSON list inside <blocks>
+    return "<blocks>" + json.dumps([fake_record(fields, prompt)]) + "</blocks>"
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    def __init__(self, address, settings: MockLLMSettings):
+        super().__init__(address, MockLLMHandler)
+        self.settings = settings
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.lock = threading.Lock()
+
+    def cost_usd(self) -> float:
+        s = self.settings
+        return self.prompt_tokens / 1000 * s.price_per_1k_prompt + self.completion_tokens / 1000 * s.price_per_1k_completion
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        prompt = "\n".join(str(m.get("content", "")) for m in request.get("messages", []))
+
+        settings = self.server.settings
+        prompt_tokens = len(prompt) // 4
+        time.sleep(settings.latency_s + prompt_tokens / 1000 * settings.latency_per_1k_tokens_s)
+
+        content = answer(prompt)
+        completion_tokens = len(content) // 4
+        with self.server.lock:
+            self.server.calls += 1
+            self.server.prompt_tokens += prompt_tokens
+            self.server.completion_tokens += completion_tokens
+
+        body = json.dumps({
+            "id": f"mock-{self.server.calls}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_mock_llm(settings: MockLLMSettings = None, port: int = 0) -> Tuple[MockLLMServer, str]:
+    """Starts the mock on a background thread. Returns (server, base_url ending in /v1)."""
+    server = MockLLMServer(("127.0.0.1", port), settings or MockLLMSettings())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
@@ -0,0 +1,212 @@
+"""
+Offline scrape benchmarks: local fixture site + mock LLM, nothing leaves the machine.
+
+    python benchmarks/run_benchmarks.py                          # every scenario
+    python benchmarks/run_benchmarks.py -s static -s large --scale 2
+    python benchmarks/run_benchmarks.py --out before.json
+    python benchmarks/run_benchmarks.py --baseline before.json   # exit 1 on a regression
+    python benchmarks/run_benchmarks.py -s media --fetch-profile full   # compare with text-only
+
+Each scenario reports URLs/sec, time to first result, peak RSS (this process and
+its browser) and tokens per record. The browser scenarios need Playwright's
+Chromium installed, but no network.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from typing import Dict, List
+
+import psutil
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(HERE)
+sys.path.append(os.path.join(os.path.dirname(HERE), "src"))
+
+from fixture_server import start_fixture_server
+from mock_llm import MockLLMSettings, start_mock_llm
+
+FIELDS = ["name", "title", "email", "phone", "city"]
+MODEL = "openai/mock-extractor"
+
+# scenario -> [(fixture path, number of pages)]
+SCENARIOS: Dict[str, List[tuple]] = {
+    "static": [("static", 50)],
+    "spa": [("spa", 20)],
+    "scroll": [("scroll", 10)],
+    "large": [("large", 3)],
+    "media": [("media", 20)],
+    "mixed": [("static", 30), ("spa", 10), ("scroll", 5), ("large", 1), ("media", 5)],
+}
+
+# What counts as a regression against a baseline, relative change
+LOWER_IS_WORSE = ("urls_per_sec",)
+HIGHER_IS_WORSE = ("first_result_s", "peak_rss_mb", "tokens_per_record")
+
+
+class PeakRss:
+    """Samples RSS of this process plus its children (Chromium) in the background."""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.peak = 0
+        self._task = None
+
+    def sample(self):
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        self.peak = max(self.peak, total)
+
+    async def _run(self):
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self):
+        self._task = asyncio.ensure_future(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+        self.sample()
+
+    @property
+    def peak_mb(self) -> float:
+        return round(self.peak / (1024 * 1024), 1)
+
+
+def scenario_urls(base_url: str, name: str, scale: float) -> List[str]:
+    urls = []
+    for path, count in SCENARIOS[name]:
+        urls.extend(f"{base_url}/{path}/{i}" for i in range(max(1, int(count * scale))))
+    return urls
+
+
+async def run_scenario(name: str, urls: List[str], llm_server, concurrency: int, fetch_profile: str) -> dict:
+    # Imported here so OPENAI_API_BASE is set before litellm reads it
+    import LLM_extraction
+    from metrics import MetricsRecorder
+    from scheduler import SchedulerSettings
+
+    # Local server: no politeness needed, rate 0 means unlimited
+    scheduler = SchedulerSettings(max_concurrency=concurrency, per_domain_concurrency=concurrency, per_domain_rate=0)
+    metrics = MetricsRecorder(path=None, provider=MODEL)
+    calls_before, prompt_before, completion_before = llm_server.calls, llm_server.prompt_tokens, llm_server.completion_tokens
+
+    records = failed = 0
+    first_result = None
+    start = time.perf_counter()
+    with PeakRss() as rss:
+        async for event in LLM_extraction.stream_scrape(
+            urls, FIELDS, MODEL, "mock-key",
+            use_cache=False,
+            scheduler_settings=scheduler,
+            metrics=metrics,
+            fetch_profile=fetch_profile,
+        ):
+            if not event["success"]:
+                failed += 1
+            if event["records"] and first_result is None:
+                first_result = time.perf_counter() - start
+            records += len(event["records"])
+    seconds = time.perf_counter() - start
+
+    tokens = (llm_server.prompt_tokens - prompt_before) + (llm_server.completion_tokens - completion_before)
+    summary = metrics.summary()
+    return {
+        "scenario": name,
+        "fetch_profile": fetch_profile,
+        "urls": len(urls),
+        "failed": failed,
+        "records": records,
+        "seconds": round(seconds, 2),
+        "urls_per_sec": round(len(urls) / seconds, 2) if seconds else 0.0,
+        "first_result_s": round(first_result, 2) if first_result is not None else None,
+        "peak_rss_mb": rss.peak_mb,
+        "llm_calls": llm_server.calls - calls_before,
+        "tokens_per_record": round(tokens / records, 1) if records else None,
+        "blocked_requests": summary["totals"].get("blocked_requests", 0),
+        "stages": summary["stages"],
+    }
+
+
+def compare(results: List[dict], baseline: List[dict], tolerance: float) -> List[str]:
+    """Lines describing every metric that got worse than the baseline by more than `tolerance`."""
+    old = {r["scenario"]: r for r in baseline}
+    problems = []
+    for result in results:
+        before = old.get(result["scenario"])
+        if before is None:
+            continue
+        for key in LOWER_IS_WORSE + HIGHER_IS_WORSE:
+            new_value, old_value = result.get(key), before.get(key)
+            if not new_value or not old_value:
+                continue
+            change = (new_value - old_value) / old_value
+            worse = -change if key in LOWER_IS_WORSE else change
+            if worse > tolerance:
+                problems.append(f"{result['scenario']}: {key} {old_value} -> {new_value} ({change:+.0%})")
+    return problems
+
+
+def print_table(results: List[dict]):
+    print(f"\n{'scenario':<10}{'urls':>6}{'failed':>8}{'urls/s':>9}{'first (s)':>11}{'peak MB':>10}{'tok/rec':>9}{'LLM calls':>11}")
+    for r in results:
+        print(
+            f"{r['scenario']:<10}{r['urls']:>6}{r['failed']:>8}{r['urls_per_sec']:>9}"
+            f"{str(r['first_result_s']):>11}{r['peak_rss_mb']:>10}{str(r['tokens_per_record']):>9}{r['llm_calls']:>11}"
+        )
+
+
+async def main(args) -> int:
+    site, site_url = start_fixture_server()
+    llm, llm_url = start_mock_llm(MockLLMSettings(latency_s=args.llm_latency))
+    os.environ["OPENAI_API_BASE"] = llm_url
+    os.environ["OPENAI_BASE_URL"] = llm_url
+    print(f"Fixture site {site_url}, mock LLM {llm_url}")
+
+    results = []
+    for name in args.scenario or list(SCENARIOS):
+        print(f"\n=== {name} ===")
+        results.append(await run_scenario(name, scenario_urls(site_url, name, args.scale), llm, args.concurrency, args.fetch_profile))
+
+    site.shutdown()
+    llm.shutdown()
+    print_table(results)
+    print(f"\nMock LLM: {llm.calls} calls, ~${llm.cost_usd():.4f} at the configured prices")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare(results, json.load(f), args.tolerance)
+        if problems:
+            print("\nREGRESSIONS vs baseline:")
+            for line in problems:
+                print("  " + line)
+            return 1
+        print(f"\nNo regressions vs {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline scrape benchmarks")
+    parser.add_argument("-s", "--scenario", action="append", choices=list(SCENARIOS), help="run only this scenario (repeatable)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the page counts")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--fetch-profile", default="text-only", help="text-only, text+images or full")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="mock LLM seconds per call")
+    parser.add_argument("--out", help="save results as JSON")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown (default 0.2)")
+    sys.exit(asyncio.run(main(parser.parse_args())))
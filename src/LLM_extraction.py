@@ -1,11 +1,59 @@
 import os
+import copy
 import json
+import time
 import asyncio
-from typing import List
+from functools import lru_cache
+from typing import TYPE_CHECKING, List
 from pydantic import create_model, Field
 from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 from crawl4ai.extraction_strategy import LLMExtractionStrategy
+from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
 from crawl4ai import LLMConfig
+from crawl4ai.models import TokenUsage
+from crawl4ai.prompts import PROMPT_EXTRACT_SCHEMA_WITH_INSTRUCTION
+from crawl4ai.utils import aperform_completion_with_backoff, escape_json_string, sanitize_html
+
+from extraction_cache import ExtractionCache, make_cache_key
+from domain_scheduler import DomainScheduler
+from scheduler import SchedulerSettings, domain_of
+from readiness import build_readiness_script, ReadinessStats
+from markdown_pruning import MISSING_VALUES, ChunkSettings, select_chunks, merge_chunk_records, estimate_tokens
+from llm_batching import BatchSettings, PageBatcher
+from pre_extractors import pre_extract, reduce_schema, FIELD_KINDS
+from template_schemas import TemplateLearner, TemplateSettings
+from static_tier import create_http_crawler, build_static_run_config, needs_browser
+from job_store import ScrapeJob
+from browser_pool import BrowserPool
+from metrics import MetricsRecorder, current_metrics, set_current_metrics
+from crawl_frontier import CrawlFrontier
+from near_duplicates import DedupSettings, NearDuplicateIndex
+from fetch_profiles import DEFAULT_FETCH_PROFILE, FetchBlocker, FetchProfile, get_fetch_profile
+from retry_policy import RetryPolicy, RetrySettings
+from job_control import DeadlineExceeded, ScrapeControl
+from structured_output import INVALID_KEY, StructuredSettings, invalid_fields, native_rejected, parse_records, resolve_native_mode, response_format_for
+
+if TYPE_CHECKING:
+    # pandas is only loaded when cleaning is asked for
+    from record_cleaning import CleanSettings
+
+EXTRACTION_INSTRUCTION = "Extract the requested fields. Return 'N/A' if not found."
+
+
+class TimedMarkdownGenerator(DefaultMarkdownGenerator):
+    """DefaultMarkdownGenerator that reports how long each page took to convert."""
+
+    def __init__(self, recorder: MetricsRecorder, **kwargs):
+        super().__init__(**kwargs)
+        self.recorder = recorder
+
+    def generate_markdown(self, input_html: str, base_url: str = "", *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().generate_markdown(input_html, base_url, *args, **kwargs)
+        finally:
+            self.recorder.note_markdown(base_url, (time.perf_counter() - start) * 1000)
+
 
 def create_dynamic_schema(field_names: List[str]):
     """
@@ -27,38 +75,351 @@ def create_dynamic_schema(field_names: List[str]):
 
     return create_model('DynamicScrapeModel', **fields)
 
-async def run_scrape(urls: List[str], fields: List[str], model_id: str, api_key: str):
+@lru_cache(maxsize=64)
+def schema_model(field_names: tuple):
+    """create_dynamic_schema, built once per field list (extractors ask for subsets of the fields)."""
+    return create_dynamic_schema(list(field_names))
+
+class StructuredExtractionStrategy(LLMExtractionStrategy):
     """
-    The main function called by the Flet App.
+    LLMExtractionStrategy that asks for the provider's structured output when it has
+    one (see structured_output.py), and otherwise reads the reply with a tolerant JSON
+    parser. Records are validated against the schema in the same pass: fields that
+    are missing or invalid are listed on the record, for CachedExtractor to re-request.
     """
-    print(f"--- Starting Scrape ---")
-    print(f"Targeting: {len(urls)} URLs")
-    print(f"Extracting: {fields}")
+    # Set after construction: crawl4ai checks attributes against the __init__ signature
+    structured = StructuredSettings()
 
-    # 1. Setup API Key for this session
-    if not api_key:
-        return {"error": "API Key is missing."} 
-    
+    def _track_usage(self, response):
+        usage = TokenUsage(
+            completion_tokens=response.usage.completion_tokens,
+            prompt_tokens=response.usage.prompt_tokens,
+            total_tokens=response.usage.total_tokens,
+        )
+        self.usages.append(usage)
+        self.total_usage.completion_tokens += usage.completion_tokens
+        self.total_usage.prompt_tokens += usage.prompt_tokens
+        self.total_usage.total_tokens += usage.total_tokens
+
+    async def aextract(self, url: str, ix: int, html: str):
+        prompt = PROMPT_EXTRACT_SCHEMA_WITH_INSTRUCTION
+        for name, value in (("URL", url), ("HTML", escape_json_string(sanitize_html(html))), ("REQUEST", self.instruction), ("SCHEMA", json.dumps(self.schema, indent=2))):
+            prompt = prompt.replace("{" + name + "}", value)
+
+        provider = self.llm_config.provider
+        response_format = response_format_for(provider, self.schema, self.structured.mode)
+        extra_args = dict(self.extra_args or {})
+        if response_format is not None:
+            extra_args["response_format"] = response_format
+        cfg = self.llm_config
+
+        def complete():
+            return aperform_completion_with_backoff(
+                provider, prompt, cfg.api_token, base_url=cfg.base_url, extra_args=extra_args,
+                base_delay=cfg.backoff_base_delay, max_attempts=cfg.backoff_max_attempts, exponential_factor=cfg.backoff_exponential_factor,
+            )
+
+        try:
+            try:
+                response = await complete()
+            except Exception as e:
+                # Some models behind a provider don't take it after all, ask again with the prompt alone
+                if response_format is None or not native_rejected(provider, e):
+                    raise
+                print(f"[PARSE] {provider} refused structured output, using the prompt only")
+                extra_args.pop("response_format")
+                response = await complete()
+        except Exception as e:
+            return [{"index": ix, "error": True, "tags": ["error"], "content": str(e)}]
+        self._track_usage(response)
+
+        start = time.perf_counter()
+        content = response.choices[0].message.content or ""
+        fields = list(self.schema.get("properties", {}))
+        records, repaired = parse_records(content, schema_model(tuple(fields)), fields)
+        if current_metrics() is not None:
+            current_metrics().add_stage("parse", (time.perf_counter() - start) * 1000)
+        if records is None:
+            # A list, like crawl4ai's block for a reply it couldn't parse
+            return [{"index": ix, "error": True, "tags": ["error"], "content": [content]}]
+        if repaired:
+            print(f"[PARSE] {url}: repaired malformed JSON in the LLM reply")
+        return records
+
+class CachedExtractor:
+    """
+    Runs the extraction for one page.
+    1. Deterministic pre-extractors (regex, mailto/tel, JSON-LD/microdata) find what they can.
+       On a page about a single entity only the unresolved fields go to the LLM, and if nothing
+       is left the LLM is skipped. Pre-extracted values only fill fields the LLM left empty.
+    2. The on-disk cache is checked, a hit returns the stored records without calling the LLM.
+    3. On a miss the page is pruned down to the most relevant chunks (see markdown_pruning.py),
+       which are extracted in parallel and merged back into per-page records.
+       Small pages can be packed together into one LLM call by a PageBatcher (see llm_batching.py).
+    With a TemplateLearner, pages of a site template that already has learned selectors
+    skip the LLM altogether (see template_schemas.py).
+    With a NearDuplicateIndex, a page with the same content as one already extracted
+    in this run gets a copy of its records (see near_duplicates.py).
+    """
+    def __init__(self, llm_strategy: LLMExtractionStrategy, cache: ExtractionCache = None, chunk_settings: ChunkSettings = None, batcher: PageBatcher = None, use_pre_extractors: bool = True, templates: TemplateLearner = None, dedup: NearDuplicateIndex = None):
+        self.llm_strategy = llm_strategy
+        self.cache = cache
+        self.chunk_settings = chunk_settings or ChunkSettings()
+        self.batcher = batcher
+        self.use_pre_extractors = use_pre_extractors
+        self.templates = templates
+        self.dedup = dedup
+        self.llm_skipped = 0
+
+    @property
+    def field_names(self) -> List[str]:
+        return list(self.llm_strategy.schema.get("properties", {}))
+
+    def cache_key(self, markdown: str, schema: dict = None) -> str:
+        return make_cache_key(
+            markdown,
+            schema or self.llm_strategy.schema,
+            self.llm_strategy.llm_config.provider,
+            self.llm_strategy.instruction,
+            extra=self.chunk_settings.__dict__,
+        )
+
+    def _strategy_for(self, fields: List[str]) -> LLMExtractionStrategy:
+        """Same strategy, but only asking for `fields`."""
+        if len(fields) == len(self.field_names):
+            return self.llm_strategy
+        strategy = copy.copy(self.llm_strategy)
+        strategy.schema = reduce_schema(self.llm_strategy.schema, fields)
+        return strategy
+
+    @staticmethod
+    def _metered(strategy: LLMExtractionStrategy) -> LLMExtractionStrategy:
+        """Copy with its own usage counters, so the tokens it reports belong to this page only."""
+        strategy = copy.copy(strategy)
+        strategy.usages = []
+        strategy.total_usage = TokenUsage()
+        return strategy
+
+    @staticmethod
+    def _record_usage(strategy: LLMExtractionStrategy, start: float):
+        metrics = current_metrics()
+        if metrics is None:
+            return
+        metrics.add_stage("llm", (time.perf_counter() - start) * 1000)
+        metrics.add_llm(
+            sum(u.prompt_tokens for u in strategy.usages),
+            sum(u.completion_tokens for u in strategy.usages),
+            calls=len(strategy.usages),
+        )
+        metrics.source = "llm"
+
+    async def extract(self, url: str, markdown: str, html: str = None, cleaned_html: str = None):
+        resolved, remaining = {}, self.field_names
+        if self.use_pre_extractors:
+            resolved, remaining = pre_extract(url, markdown, html, self.field_names)
+            if not remaining:
+                self.llm_skipped += 1
+                if current_metrics() is not None:
+                    current_metrics().source = "pre_extract"
+                print(f"[PRE] {url}: all fields found without the LLM")
+                return [dict(resolved, error=False)]
+            if resolved:
+                print(f"[PRE] {url}: found {list(resolved)}, asking the LLM for {remaining}")
+
+        async def run():
+            if self.templates is not None and cleaned_html:
+                # Selectors are learned for the whole field list (minus the URL), so samples
+                # from the LLM ask for everything too
+                template_fields = [f for f in self.field_names if FIELD_KINDS.get(f.lower()) != "url"]
+                return await self.templates.extract(
+                    url, cleaned_html, template_fields,
+                    lambda: self._llm_extract(url, markdown, self.llm_strategy)
+                )
+            return await self._llm_extract(url, markdown, self._strategy_for(remaining))
+
+        if self.dedup is not None:
+            blocks, original = await self.dedup.extract(url, markdown, tuple(remaining), run)
+            if original is not None and current_metrics() is not None:
+                current_metrics().source = "duplicate"
+        else:
+            blocks = await run()
+
+        records = [r for r in blocks if isinstance(r, dict) and not r.get("error")]
+        # The schema's field names are lowercased, "URL" asked for in the UI is "url" here
+        url_field = next((name for name in self.field_names if name.lower() == "url"), None)
+        for record in records:
+            # Same content can live under another URL (cached, near-duplicate), stamp the current one
+            if url_field is not None:
+                if url_field != "URL":
+                    # The batcher's page URL, already in url_field
+                    record.pop("URL", None)
+                record[url_field] = url
+            elif "URL" in record:
+                record["URL"] = url
+            for name, value in resolved.items():
+                # Fields the LLM was asked for too hold a value seen once on a page with several
+                # things on it: it can only be the record's when there is a single record
+                if name in remaining and len(records) > 1:
+                    continue
+                if str(record.get(name, "")).strip().lower() in MISSING_VALUES:
+                    record[name] = value
+        return blocks
+
+    async def _llm_extract(self, url: str, markdown: str, strategy: LLMExtractionStrategy):
+        """
+        LLM extraction behind the on-disk cache.
+        Entries are keyed by the schema the LLM was sent, which is the full one when the
+        page went out in a batch, so records never come back with another set of fields.
+        """
+        chunks = self._select_chunks(url, markdown, strategy)
+        if self.cache is not None:
+            sent = self.batcher.schema if self._batchable(chunks) else strategy.schema
+            cached = self.cache.get(self.cache_key(markdown, sent))
+            if cached is not None:
+                if current_metrics() is not None:
+                    current_metrics().source = "cache"
+                print(f"Cache hit for {url}")
+                return cached
+
+        blocks, sent = await self._extract_chunks(url, markdown, strategy, chunks=chunks)
+        blocks = await self._refill(url, markdown, blocks)
+
+        # Only cache clean extractions, errors should be retried next run
+        if self.cache is not None and blocks and not any(b.get("error") for b in blocks if isinstance(b, dict)):
+            self.cache.set(self.cache_key(markdown, sent), blocks)
+        return blocks
+
+    async def _refill(self, url: str, markdown: str, blocks: list):
+        """
+        Re-asks the LLM for the fields that came back missing or invalid, and only for those.
+        Answers are matched to records by position, so only when the counts agree.
+        Fields that are still missing end up N/A.
+        """
+        failed = invalid_fields(blocks)
+        records = [b for b in blocks if isinstance(b, dict) and not b.get("error")]
+        if failed and self.llm_strategy.structured.refill:
+            print(f"[PARSE] {url}: re-asking the LLM for {failed} only")
+            answers, _ = await self._extract_chunks(url, markdown, self._strategy_for(failed), use_batcher=False)
+            answers = [a for a in answers if isinstance(a, dict) and not a.get("error")]
+            if len(answers) == len(records):
+                for record, answer in zip(records, answers):
+                    for name in record.get(INVALID_KEY, ()):
+                        if name not in record and name in answer:
+                            record[name] = answer[name]
+            else:
+                print(f"[PARSE] {url}: {len(answers)} records in the answer for {len(records)}, leaving the fields N/A")
+        for record in records:
+            for name in record.pop(INVALID_KEY, ()):
+                record.setdefault(name, "N/A")
+        return blocks
+
+    def _select_chunks(self, url: str, markdown: str, strategy: LLMExtractionStrategy) -> List[str]:
+        if not self.chunk_settings.enabled:
+            return [markdown]
+        chunks = select_chunks(markdown, list(strategy.schema.get("properties", {})), self.chunk_settings)
+        if chunks:
+            print(f"[PRUNE] {url}: ~{estimate_tokens(markdown)} -> ~{sum(estimate_tokens(c) for c in chunks)} tokens in {len(chunks)} chunk(s)")
+        return chunks
+
+    def _batchable(self, chunks: List[str]) -> bool:
+        return self.batcher is not None and len(chunks) == 1 and self.batcher.accepts(chunks[0])
+
+    async def _extract_chunks(self, url: str, markdown: str, strategy: LLMExtractionStrategy, use_batcher: bool = True, chunks: List[str] = None):
+        """Returns (records, the schema the LLM was sent)."""
+        field_names = list(strategy.schema.get("properties", {}))
+        if chunks is None:
+            chunks = self._select_chunks(url, markdown, strategy)
+        if not chunks:
+            return [], strategy.schema
+
+        if len(chunks) == 1:
+            # The batcher always asks for the full schema, pre-extracted values fill in what it leaves empty
+            if use_batcher and self._batchable(chunks):
+                records = await self.batcher.submit(url, chunks[0])
+                if records is not None:
+                    return records, self.batcher.schema
+                print(f"[BATCH] {url}: missing from batch reply, retrying on its own")
+            strategy = self._metered(strategy)
+            start = time.perf_counter()
+            try:
+                return await strategy.arun(url, chunks), strategy.schema
+            finally:
+                self._record_usage(strategy, start)
+
+        # Long pages: one LLM call per chunk, all at once
+        strategy = self._metered(strategy)
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *[strategy.aextract(url, ix, chunk) for ix, chunk in enumerate(chunks)],
+            return_exceptions=True
+        )
+        self._record_usage(strategy, start)
+        chunk_records = []
+        for ix, result in enumerate(results):
+            if isinstance(result, Exception):
+                chunk_records.append([{"index": ix, "error": True, "tags": ["error"], "content": str(result)}])
+            else:
+                chunk_records.append(result)
+        return merge_chunk_records(chunk_records, field_names), strategy.schema
+
+def extraction_error(records: list):
+    """An error message when the LLM gave nothing usable (every block is crawl4ai's error block), else None."""
+    errors = [r for r in records if isinstance(r, dict) and r.get("error")]
+    if not errors or len(errors) < len(records):
+        return None
+    content = errors[0].get("content")
+    if isinstance(content, list):
+        # What the strategy couldn't parse as JSON
+        return "Error extracting: could not parse the JSON in the LLM reply"
+    return f"Error extracting: {content}"
+
+def resolve_provider(model_id: str) -> str:
+    """Turns the model typed in the UI into a litellm provider string."""
     if "/" in model_id:
-        provider_str = model_id
-        provider_prefix = model_id.split("/")[0] # e.g., "deepseek" or "anthropic"
-    else:
-        # Default fallback: assume OpenAI if no slash is present
-        provider_str = f"openai/{model_id}"
-        provider_prefix = "openai"
+        return model_id # e.g., "deepseek/..." or "anthropic/..."
+    # Default fallback: assume OpenAI if no slash is present
+    return f"openai/{model_id}"
+
+def build_scrape_setup(fields: List[str], model_id: str, api_key: str, cache: ExtractionCache = None, use_cache: bool = True, chunk_settings: ChunkSettings = None, batch_settings: BatchSettings = None, template_settings: TemplateSettings = None, dedup_settings: DedupSettings = None, structured_settings: StructuredSettings = None, url_timeout: float = None):
+    """
+    Builds everything a scrape needs: browser config, run config and the extractor.
+    Shared by run_scrape and stream_scrape.
+    url_timeout is the per-URL budget extractions run under (see job_control.py).
+    """
+    provider_str = resolve_provider(model_id)
 
     DynamicSchema = create_dynamic_schema(fields)
     
     llm_cfg = LLMConfig(provider=provider_str, api_token=api_key)
 
-    llm_strategy = LLMExtractionStrategy(
+    llm_strategy = StructuredExtractionStrategy(
         llm_config=llm_cfg,
         schema=DynamicSchema.model_json_schema(),
         extraction_type="schema",
         chunk_token_threshold=100000, 
         apply_chunking=False,
-        instruction="Extract the requested fields. Return 'N/A' if not found."
+        instruction=EXTRACTION_INSTRUCTION
     )
+    if structured_settings is not None:
+        llm_strategy.structured = structured_settings
+
+    # 2. Cache, so re-runs over unchanged pages skip the LLM entirely
+    if use_cache and cache is None:
+        cache = ExtractionCache()
+    # Optional: pack small pages into shared LLM calls
+    batcher = None
+    if batch_settings is not None:
+        batcher = PageBatcher(llm_cfg, llm_strategy.schema, EXTRACTION_INSTRUCTION, batch_settings, model=schema_model(tuple(llm_strategy.schema.get("properties", {}))))
+
+    # Optional: learn CSS selectors per site template and stop using the LLM for it
+    templates = None
+    if template_settings is not None:
+        templates = TemplateLearner(llm_cfg, settings=template_settings)
+
+    # Optional: extract near-duplicate pages once per run
+    dedup = NearDuplicateIndex(dedup_settings, url_timeout) if dedup_settings is not None else None
+
+    extractor = CachedExtractor(llm_strategy, cache if use_cache else None, chunk_settings, batcher, templates=templates, dedup=dedup)
 
     # 3. Configure "Foolproof" Browser
     browser_conf = BrowserConfig(
@@ -66,55 +427,323 @@ async def run_scrape(urls: List[str], fields: List[str], model_id: str, api_key:
         verbose=True,
     )
 
-    scroll_script = """
-        async function scrollDown() {
-            let totalHeight = 0;
-            let distance = 300;
-            while (totalHeight < document.body.scrollHeight) {
-                window.scrollBy(0, distance);
-                totalHeight += distance;
-                await new Promise(r => setTimeout(r, 100)); 
-            }
-        }
-        await scrollDown();
-    """
+    # Scrolls and waits only until the page is stable (capped at 10s), instead of fixed sleeps
+    readiness_script = build_readiness_script(quiet_ms=500, deadline_ms=10000)
 
     run_conf = CrawlerRunConfig(
         cache_mode=CacheMode.BYPASS,
         verbose=True,
         page_timeout=60000,
         wait_until="domcontentloaded",
-        delay_before_return_html=3.0,
+        delay_before_return_html=0.1,
         remove_overlay_elements=True,
-        js_code=scroll_script,
-        extraction_strategy=llm_strategy,
+        js_code=readiness_script,
         excluded_tags=["style", "noscript", "script", "nav", "footer"],
         exclude_external_links=False,
-        magic = True
+        magic = True,
+        stream=True
     )
 
-    # 4. Run Crawler
-    results_data = []
-    
-    async with AsyncWebCrawler(config=browser_conf) as crawler:
-        # arun_many handles both single and multiple URLs efficiently
-        results = await crawler.arun_many(urls=urls, config=run_conf)
+    return browser_conf, run_conf, extractor
 
-        for res in results:
-            if res.success:
+async def stream_scrape(urls: List[str], fields: List[str], model_id: str, api_key: str, cache: ExtractionCache = None, use_cache: bool = True, scheduler_settings: SchedulerSettings = None, static_first: bool = True, chunk_settings: ChunkSettings = None, batch_settings: BatchSettings = None, template_settings: TemplateSettings = None, job: ScrapeJob = None, pool: BrowserPool = None, metrics: MetricsRecorder = None, frontier: CrawlFrontier = None, dedup_settings: DedupSettings = None, fetch_profile: FetchProfile = None, retry_settings: RetrySettings = None, structured_settings: StructuredSettings = None, control: ScrapeControl = None):
+    """
+    Async generator version of run_scrape.
+    Yields one event per URL as soon as that URL is crawled and extracted:
+        {"url", "success", "records", "error", "done", "failed", "pending"}
+    Concurrency and per-domain politeness come from scheduler_settings (see scheduler.py).
+    With static_first, pages are fetched over plain HTTP first and only sent to the browser
+    when they look empty/JS-rendered or none of the fields are on them (see static_tier.py).
+    Both tiers run at once: the browser starts on the first page the HTTP tier hands over.
+    chunk_settings sets the per-page token budget sent to the LLM (see markdown_pruning.py).
+    batch_settings turns on packing small pages into one LLM call (see llm_batching.py).
+    template_settings turns on learned per-site selectors (see template_schemas.py).
+    With a job, every URL's state and records are saved as it goes, so the job can be resumed (see job_store.py).
+    With a pool, the browser is borrowed from it and stays warm for the next scrape (see browser_pool.py).
+    With a metrics recorder, per-URL stage timings, tokens and cost are recorded (see metrics.py).
+    With a frontier, the links of every crawled page are queued in it (see crawl_frontier.py, deep_crawler.py).
+    dedup_settings turns on reusing extractions across near-duplicate pages (see near_duplicates.py).
+    fetch_profile (a FetchProfile or its name: "text-only", "text+images", "full") sets what
+    the browser downloads besides the HTML, text-only by default (see fetch_profiles.py).
+    Failed pages are retried with backoff as retry_settings says: crawl failures go to the back
+    of the line for another round, LLM failures are retried in place, and domains that keep
+    failing are paused by a circuit breaker (see retry_policy.py).
+    structured_settings picks native structured output or the tolerant JSON parser, and whether
+    fields missing from a reply are asked for again (see structured_output.py).
+    With a control, the scrape can be cancelled from outside and gets per-URL and per-job time
+    limits: it then stops, releases the browser and in-flight LLM calls, and ends the stream.
+    Only the URLs it had finished are reported (see job_control.py).
+    """
+    if not api_key:
+        raise ValueError("API Key is missing.")
+
+    control = control or ScrapeControl()
+    browser_conf, run_conf, extractor = build_scrape_setup(fields, model_id, api_key, cache, use_cache, chunk_settings, batch_settings, template_settings, dedup_settings, structured_settings, control.limits.url_timeout)
+    static_conf = build_static_run_config(run_conf.excluded_tags)
+    if extractor.llm_strategy.structured.mode == "auto":
+        # litellm's capability lookup, once per provider and not on the event loop
+        await resolve_native_mode(extractor.llm_strategy.llm_config.provider)
+    if metrics is not None:
+        # Times HTML -> markdown per page, otherwise the default generator
+        run_conf.markdown_generator = TimedMarkdownGenerator(metrics)
+        static_conf.markdown_generator = TimedMarkdownGenerator(metrics)
+        metrics.provider = metrics.provider or resolve_provider(model_id)
+        # litellm's price table, loaded before the first page finishes
+        await metrics.load_pricing()
+
+    if fetch_profile is None or isinstance(fetch_profile, str):
+        fetch_profile = get_fetch_profile(fetch_profile or DEFAULT_FETCH_PROFILE)
+    blocker = FetchBlocker(fetch_profile)
+    retry = RetryPolicy(retry_settings)
+    control.start()
+
+    total = len(urls)
+    counts = {"done": 0, "failed": 0, "static": 0}
+    readiness = ReadinessStats()
+    finished = asyncio.Queue()
+    tasks = []
+
+    async def extract_one(res, static: bool):
+        # Everything below this task (extractor, batcher, templates) reports to this page
+        page_metrics = metrics.for_url(res.url) if metrics is not None else None
+        set_current_metrics(page_metrics)
+        try:
+            start = time.perf_counter()
+            while True:
                 try:
-                    # Clean markdown wrappers if present
-                    clean_json = res.extracted_content.replace("```json", "").replace("```", "").strip()
-                    data = json.loads(clean_json)
-                    
+                    data = await control.within_url_budget(extractor.extract(res.url, res.markdown.raw_markdown, res.html, res.cleaned_html), "extraction")
                     # Normalize list vs single object
-                    if isinstance(data, list):
-                        results_data.extend(data)
-                    else:
-                        results_data.append(data)
+                    records = data if isinstance(data, list) else [data]
+                    error = extraction_error(records)
+                except DeadlineExceeded as e:
+                    records, error = [], str(e)
                 except Exception as e:
-                    print(f"Error parsing JSON for {res.url}: {e}")
+                    records, error = [], f"Error extracting: {e}"
+                # LLM 429s and unparseable replies: the page is fine, just ask again
+                delay = retry.should_retry(res.url, error) if error else None
+                if delay is None:
+                    break
+                print(f"[RETRY] {res.url}: {error}, extracting again in {delay:.1f}s")
+                if page_metrics is not None:
+                    page_metrics.retries += 1
+                await asyncio.sleep(delay)
+            if page_metrics is not None:
+                page_metrics.markdown_tokens = estimate_tokens(res.markdown.raw_markdown)
+                page_metrics.add_stage("extract", (time.perf_counter() - start) * 1000)
+            if error:
+                await finished.put((res.url, [], error))
+                return
+            if static:
+                counts["static"] += 1
+            await finished.put((res.url, records, None))
+        except Exception as e:
+            await finished.put((res.url, [], f"Error extracting: {e}"))
+
+    async def run_tier(crawler, tier_urls: List[str], conf: CrawlerRunConfig, static: bool, to_browser: asyncio.Queue, lease=None):
+        # Start extracting each page the moment it's crawled, don't wait for the batch.
+        # The HTTP tier hands pages to the browser through to_browser, the browser tier crawls what comes through it
+        dispatcher = DomainScheduler(scheduler_settings, control.limits.url_timeout, feed=None if static else to_browser)
+        async for res in await crawler.arun_many(urls=tier_urls, config=conf, dispatcher=dispatcher):
+            fetch_stats = None if static else blocker.pop(res.url)
+            if metrics is not None:
+                metrics.record_crawl(res, "static" if static else "browser", fetch_stats)
+            if static:
+                fallback, reason = needs_browser(res, extractor.field_names)
+                if fallback:
+                    print(f"[STATIC] {res.url} -> browser ({reason})")
+                    await to_browser.put(res.url)
+                    continue
+            elif res.success:
+                readiness.record(res.url, res.js_execution_result)
+            if lease is not None:
+                lease.pages += 1
+            retry.record(res.url, None if res.success else res.error_message)
+
+            if res.success:
+                if job is not None:
+                    job.mark_fetched(res.url)
+                if frontier is not None:
+                    frontier.add_links(res.url, res.links)
+                tasks.append(asyncio.create_task(extract_one(res, static)))
             else:
-                 print(f"Failed to scrape {res.url}: {res.error_message}")
-    
-    return results_data
\ No newline at end of file
+                await finished.put((res.url, [], res.error_message))
+
+    async def static_tier(round_urls: List[str], to_browser: asyncio.Queue):
+        try:
+            async with create_http_crawler() as http_crawler:
+                await run_tier(http_crawler, round_urls, static_conf, True, to_browser)
+        finally:
+            await to_browser.put(None)
+
+    async def browser_tier(to_browser: asyncio.Queue):
+        # The browser only starts if something needs it
+        first = await to_browser.get()
+        if first is None:
+            return
+        # Images, fonts, video and trackers are aborted as the fetch profile says
+        if pool is not None:
+            async with pool.lease(browser_conf) as lease:
+                blocker.attach(lease.crawler)
+                try:
+                    await run_tier(lease.crawler, [first], run_conf, False, to_browser, lease)
+                finally:
+                    # The pooled browser goes on to scrapes that may use another profile
+                    blocker.detach(lease.crawler)
+        else:
+            async with AsyncWebCrawler(config=browser_conf) as crawler:
+                blocker.attach(crawler)
+                await run_tier(crawler, [first], run_conf, False, to_browser)
+
+    async def crawl_all(round_urls: List[str]):
+        to_browser = asyncio.Queue()
+        static = static_first and bool(round_urls)
+        if not static:
+            for url in round_urls:
+                to_browser.put_nowait(url)
+            to_browser.put_nowait(None)
+        # 4. Run Crawler (cheap HTTP tier first, its misses go to the browser while it carries on)
+        tiers = [asyncio.create_task(browser_tier(to_browser))]
+        if static:
+            tiers.append(asyncio.create_task(static_tier(round_urls, to_browser)))
+        try:
+            await asyncio.gather(*tiers)
+            await asyncio.gather(*tasks)
+        finally:
+            for tier in tiers:
+                tier.cancel()
+            for task in tasks:
+                task.cancel()
+            # Let cancelled extractions unwind (LLM requests closed) before the browser goes
+            await asyncio.gather(*tiers, *tasks, return_exceptions=True)
+            await finished.put(None)
+
+    producer = None
+    round_urls = urls
+    try:
+        # Retried URLs come back in later rounds, after everything else
+        while round_urls:
+            ready, dropped = retry.admit(round_urls)
+            for url in dropped:
+                await finished.put((url, [], f"Circuit open: {domain_of(url)} keeps failing, giving up"))
+            producer = asyncio.create_task(crawl_all(ready))
+            while True:
+                running, item = await control.race(finished.get())
+                if not running or item is None:
+                    break
+
+                url, records, error = item
+                if error:
+                    delay = retry.should_retry(url, error)
+                    if delay is not None:
+                        print(f"[RETRY] {url}: {error}, queued again in {delay:.1f}s")
+                        retry.defer(url, delay)
+                        if metrics is not None:
+                            metrics.record_retry(url)
+                        continue
+                    counts["failed"] += 1
+                    print(f"Failed to scrape {url}: {error}")
+                else:
+                    counts["done"] += 1
+
+                if job is not None:
+                    if error:
+                        job.mark_failed(url, error)
+                    else:
+                        job.mark_extracted(url, records)
+                if metrics is not None:
+                    metrics.finish(url, error is None, error)
+
+                yield {
+                    "url": url,
+                    "success": error is None,
+                    "records": records,
+                    "error": error,
+                    "done": counts["done"],
+                    "failed": counts["failed"],
+                    "pending": max(total - counts["done"] - counts["failed"], 0),
+                }
+
+            if control.stopped:
+                break
+            # Surface crawler errors instead of swallowing them
+            await producer
+            running, round_urls = await control.race(retry.next_round())
+            if not running:
+                break
+    finally:
+        if producer is not None and not producer.done():
+            producer.cancel()
+            if control.stopped:
+                # Cancelled pages close, the browser goes back to the pool (or shuts down)
+                await asyncio.gather(producer, return_exceptions=True)
+        if extractor.batcher is not None and control.stopped:
+            extractor.batcher.cancel()
+
+    if control.stopped:
+        print(f"[CANCEL] Scrape stopped ({control.reason}): {counts['done']} done, {counts['failed']} failed, {total - counts['done'] - counts['failed']} not finished")
+
+    if static_first:
+        print(f"Static tier: {counts['static']} of {total} pages without the browser")
+    readiness.print_summary()
+    retry.print_summary()
+    blocker.print_summary()
+    if extractor.llm_skipped:
+        print(f"Pre-extractors: {extractor.llm_skipped} pages needed no LLM call")
+    if extractor.templates is not None:
+        print(f"Templates: {extractor.templates.selector_pages} pages extracted with learned selectors")
+    if extractor.dedup is not None:
+        extractor.dedup.print_summary()
+    if extractor.batcher is not None:
+        print(f"Batching: {extractor.batcher.pages_sent} pages in {extractor.batcher.batches_sent} LLM calls")
+    if extractor.cache is not None:
+        print(f"Cache: {extractor.cache.hits} hits, {extractor.cache.misses} misses")
+    if metrics is not None:
+        metrics.print_summary()
+
+async def run_scrape(urls: List[str], fields: List[str], model_id: str, api_key: str, cache: ExtractionCache = None, use_cache: bool = True, scheduler_settings: SchedulerSettings = None, static_first: bool = True, chunk_settings: ChunkSettings = None, batch_settings: BatchSettings = None, template_settings: TemplateSettings = None, job: ScrapeJob = None, pool: BrowserPool = None, metrics: MetricsRecorder = None, frontier: CrawlFrontier = None, dedup_settings: DedupSettings = None, fetch_profile: FetchProfile = None, retry_settings: RetrySettings = None, structured_settings: StructuredSettings = None, control: ScrapeControl = None, clean_settings: "CleanSettings" = None):
+    """
+    The main function called by the Flet App.
+    Extractions are cached on disk (see extraction_cache.py), pass use_cache=False to always call the LLM.
+    Collects everything from stream_scrape into one list.
+    Pass a job (see job_store.py) to checkpoint progress, then resume with job.todo_urls().
+    Cancelling through control returns the records gathered until then.
+    With clean_settings, the records are normalized and duplicates across pages merged (see record_cleaning.py).
+    """
+    print(f"--- Starting Scrape ---")
+    print(f"Targeting: {len(urls)} URLs")
+    print(f"Extracting: {fields}")
+
+    # 1. Setup API Key for this session
+    if not api_key:
+        return {"error": "API Key is missing."} 
+
+    results_data = []
+    sources = []
+    events = stream_scrape(
+        urls, fields, model_id, api_key,
+        cache=cache,
+        use_cache=use_cache,
+        scheduler_settings=scheduler_settings,
+        static_first=static_first,
+        chunk_settings=chunk_settings,
+        batch_settings=batch_settings,
+        template_settings=template_settings,
+        job=job,
+        pool=pool,
+        metrics=metrics,
+        frontier=frontier,
+        dedup_settings=dedup_settings,
+        fetch_profile=fetch_profile,
+        retry_settings=retry_settings,
+        structured_settings=structured_settings,
+        control=control,
+    )
+    async for event in events:
+        results_data.extend(event["records"])
+        sources.extend([event["url"]] * len(event["records"]))
+
+    if clean_settings is not None:
+        # pandas is only loaded when asked for
+        from record_cleaning import clean_records
+        results_data = clean_records(results_data, clean_settings, sources)
+    return results_data
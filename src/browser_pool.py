@@ -0,0 +1,164 @@
+import json
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Dict, List
+
+import psutil
+
+BROWSER_PROCESS_NAMES = ("chrome", "chromium", "headless_shell")
+
+
+@dataclass
+class PoolSettings:
+    """
+    idle_size: warm crawlers kept per browser config between scrapes
+    max_pages: a crawler is restarted after this many pages (Chromium leaks over time)
+    max_memory_mb: ...or when our browser processes use more than this in total
+    """
+    idle_size: int = 1
+    max_pages: int = 500
+    max_memory_mb: int = 2048
+
+
+def browser_memory_mb() -> float:
+    """RSS of the Chromium processes started by this process."""
+    total = 0
+    for child in psutil.Process().children(recursive=True):
+        try:
+            if any(name in child.name().lower() for name in BROWSER_PROCESS_NAMES):
+                total += child.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return total / (1024 * 1024)
+
+
+def config_key(browser_conf) -> str:
+    """Crawlers are only shared between scrapes with the same browser config."""
+    return json.dumps(browser_conf.to_dict(), sort_keys=True, default=str)
+
+
+class BrowserLease:
+    """A crawler borrowed from the pool. Add to `pages` as pages are crawled."""
+
+    def __init__(self, crawler, key: str):
+        self.crawler = crawler
+        self.key = key
+        self.pages = 0
+        self.bad = False
+
+    def mark_bad(self):
+        """Don't give this crawler to anyone else, restart it instead."""
+        self.bad = True
+
+
+class BrowserPool:
+    """
+    Keeps started AsyncWebCrawlers (and their Chromium) alive between scrapes,
+    so only the first scrape pays for the browser launch.
+
+    Each lease is exclusive. On return a crawler is restarted if it crawled
+    max_pages pages, browser memory is over max_memory_mb, or it was marked bad.
+    Before a warm crawler is handed out it's health-checked, dead ones are replaced.
+    Call close() when the app shuts down.
+    """
+
+    def __init__(self, settings: PoolSettings = None):
+        self.settings = settings or PoolSettings()
+        self._idle: Dict[str, List[BrowserLease]] = {}
+        self._leased: List[BrowserLease] = []
+        self._lock = asyncio.Lock()
+        self.started = 0
+        self.reused = 0
+        self.recycled = 0
+
+    async def _start(self, browser_conf, key: str) -> BrowserLease:
+        # crawl4ai is only loaded once a browser is needed, so creating the pool at startup is free
+        from crawl4ai import AsyncWebCrawler
+
+        crawler = AsyncWebCrawler(config=browser_conf)
+        await crawler.start()
+        self.started += 1
+        return BrowserLease(crawler, key)
+
+    @staticmethod
+    async def _close(lease: BrowserLease):
+        try:
+            await lease.crawler.close()
+        except Exception as e:
+            print(f"[POOL] Error closing browser: {e}")
+
+    @staticmethod
+    def is_healthy(lease: BrowserLease) -> bool:
+        """The browser process is still connected."""
+        try:
+            browser = lease.crawler.crawler_strategy.browser_manager.browser
+        except AttributeError:
+            return bool(getattr(lease.crawler, "ready", True))
+        # Persistent-context setups have no separate Browser object
+        return browser is None or browser.is_connected()
+
+    async def acquire(self, browser_conf) -> BrowserLease:
+        key = config_key(browser_conf)
+        async with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                lease = idle.pop()
+                if self.is_healthy(lease):
+                    lease.bad = False
+                    self._leased.append(lease)
+                    self.reused += 1
+                    return lease
+                print("[POOL] Warm browser is dead, starting a new one")
+                await self._close(lease)
+
+        lease = await self._start(browser_conf, key)
+        self._leased.append(lease)
+        return lease
+
+    async def release(self, lease: BrowserLease):
+        if lease in self._leased:
+            self._leased.remove(lease)
+
+        reason = None
+        if lease.bad:
+            reason = "marked bad"
+        elif lease.pages >= self.settings.max_pages:
+            reason = f"{lease.pages} pages"
+        elif not self.is_healthy(lease):
+            reason = "browser disconnected"
+        else:
+            memory = browser_memory_mb()
+            if memory > self.settings.max_memory_mb:
+                reason = f"browser memory {memory:.0f} MB"
+
+        idle = self._idle.setdefault(lease.key, [])
+        if reason is None and len(idle) < self.settings.idle_size:
+            idle.append(lease)
+            return
+
+        if reason:
+            print(f"[POOL] Recycling browser ({reason})")
+            self.recycled += 1
+        await self._close(lease)
+
+    @asynccontextmanager
+    async def lease(self, browser_conf):
+        """async with pool.lease(conf) as lease: ... lease.crawler ..."""
+        lease = await self.acquire(browser_conf)
+        try:
+            yield lease
+        except Exception:
+            lease.mark_bad()
+            raise
+        finally:
+            await self.release(lease)
+
+    async def close(self):
+        """Shuts every browser down, leased ones included."""
+        leases = [lease for idle in self._idle.values() for lease in idle] + self._leased
+        self._idle = {}
+        self._leased = []
+        await asyncio.gather(*(self._close(lease) for lease in leases))
+        if leases:
+            print(f"[POOL] Closed {len(leases)} browser(s): {self.started} started, {self.reused} reuses, {self.recycled} recycled")
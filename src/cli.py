@@ -0,0 +1,328 @@
+"""
+webbyscraper: run scrapes from a terminal, no GUI needed.
+
+    python src/cli.py urls.txt --fields "name, email, phone" -o leads.csv
+    cat urls.txt | python src/cli.py --fields price,title --shard 2/4 > part2.jsonl
+    python src/cli.py urls.txt --fields name,email --job leads-oct -o leads.csv   # rerun to resume
+    python src/cli.py start.txt --fields name,email --deep --max-pages 100000 -o agents.csv
+
+URLs are read one line at a time and scraped in chunks, so the list can be
+bigger than memory. Records are written as each URL finishes.
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import signal
+import asyncio
+import argparse
+import contextlib
+from typing import Iterator, List, Optional, Tuple
+
+import startup  # first: starts the startup clock
+# Only light modules here, the crawler stack (LLM_extraction, crawl4ai) loads in the background
+from extraction_cache import ExtractionCache
+from scheduler import SchedulerSettings
+from markdown_pruning import ChunkSettings
+from llm_batching import BatchSettings
+from template_schemas import TemplateSettings
+from near_duplicates import DedupSettings
+from retry_policy import RetrySettings
+from structured_output import StructuredSettings
+from job_control import JobLimits, ScrapeControl, ScrapeProgress
+from fetch_profiles import DEFAULT_FETCH_PROFILE, FETCH_PROFILES, get_fetch_profile
+from exporters import EXPORT_FORMATS, open_exporter
+from job_store import JobStore
+from browser_pool import BrowserPool
+from worker_pool import WorkerSettings, sharded_scrape
+from metrics import MetricsRecorder
+from crawl_frontier import CrawlFrontier, DeepCrawlSettings, DEFAULT_FRONTIER_PATH
+from deep_crawler import deep_crawl, frontier_path
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """'2/4' -> (2, 4). Shards are numbered from 1."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"shard must look like i/n, got '{value}'")
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard {value}: need 1 <= i <= n")
+    return index, count
+
+
+def in_shard(url: str, shard: Optional[Tuple[int, int]]) -> bool:
+    """Hash-based, so a URL lands in the same shard whatever order the list is in."""
+    if shard is None:
+        return True
+    index, count = shard
+    return zlib.crc32(url.encode("utf-8")) % count == index - 1
+
+
+def read_urls(source, shard: Optional[Tuple[int, int]] = None) -> Iterator[str]:
+    """Yields URLs from a file object line by line, skipping blanks and # comments."""
+    for line in source:
+        url = line.strip()
+        if url and not url.startswith("#") and in_shard(url, shard):
+            yield url
+
+
+def chunked(items: Iterator[str], size: int) -> Iterator[List[str]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def default_api_key(model_id: str) -> Optional[str]:
+    """WEBBYSCRAPER_API_KEY, else the provider's usual variable (OPENAI_API_KEY, GEMINI_API_KEY...)."""
+    # Same rule as LLM_extraction.resolve_provider, without loading the crawler stack
+    provider = model_id.split("/")[0] if "/" in model_id else "openai"
+    return os.getenv("WEBBYSCRAPER_API_KEY") or os.getenv(f"{provider.upper()}_API_KEY")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="webbyscraper", description="Scrape structured fields from a list of URLs with an LLM.")
+    parser.add_argument("urls", nargs="?", default="-", help="file with one URL per line, '-' or nothing for stdin")
+    parser.add_argument("-f", "--fields", help="comma separated fields, e.g. 'name, email, phone'")
+    parser.add_argument("-m", "--model", default="gpt-4o-mini", help="LLM model, 'provider/model' or an OpenAI model name")
+    parser.add_argument("--api-key", help="defaults to $WEBBYSCRAPER_API_KEY or the provider's <PROVIDER>_API_KEY")
+    parser.add_argument("-o", "--output", help="output file (.csv, .jsonl, .parquet), JSONL on stdout if not set")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="output format if the extension doesn't say")
+    parser.add_argument("--append", action="store_true", help="append to the output file instead of replacing it")
+    parser.add_argument("--shard", type=parse_shard, help="only scrape shard i of n, e.g. 2/4")
+    parser.add_argument("--job", help="checkpoint progress under this job id, an existing id resumes it")
+    parser.add_argument("--retry-failed", action="store_true", help="with --job, scrape the job's failed URLs again")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="worker processes, each with its own browser (default 1: no extra processes)")
+    parser.add_argument("--unordered", action="store_true", help="with --workers, write results as they finish instead of in input order")
+    parser.add_argument("--metrics", metavar="PATH", help="write per-URL timings, tokens and cost as JSONL")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port while running")
+    crawl_defaults = DeepCrawlSettings()
+    parser.add_argument("--deep", action="store_true", help="treat the URLs as start pages and follow their links")
+    parser.add_argument("--max-pages", type=int, default=crawl_defaults.max_pages, help="with --deep, pages to crawl in total")
+    parser.add_argument("--max-depth", type=int, default=crawl_defaults.max_depth, help="with --deep, links to follow from a start page")
+    parser.add_argument("--keywords", help="with --deep, comma separated words that make a link worth crawling first")
+    parser.add_argument("--external", action="store_true", help="with --deep, follow links to other domains")
+    parser.add_argument("--frontier", metavar="PATH", help=f"with --deep, crawl queue file, rerun to resume (default {DEFAULT_FRONTIER_PATH}, or one per --job)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="URLs read and scraped per round without --workers (default 500)")
+    parser.add_argument("--flush-every", type=int, default=100, help="rows buffered before a write (default 100)")
+
+    defaults = SchedulerSettings()
+    parser.add_argument("-c", "--concurrency", type=int, default=defaults.max_concurrency, help="max pages crawled at once (per worker)")
+    parser.add_argument("--per-domain", type=int, default=defaults.per_domain_concurrency, help="max pages per domain at once")
+    parser.add_argument("--rate", type=float, default=defaults.per_domain_rate, help="requests/sec per domain")
+    parser.add_argument("--token-budget", type=int, default=ChunkSettings().token_budget, help="LLM tokens per page")
+    parser.add_argument("--url-timeout", type=float, help="seconds a page may take to load, and again to be extracted, before it fails")
+    parser.add_argument("--time-limit", type=float, help="seconds for the whole run: stops there and keeps what's done (resumable with --job)")
+    parser.add_argument("--retries", type=int, default=RetrySettings().max_attempts, help="tries per URL, with backoff (default 3, 1 turns retrying off)")
+    parser.add_argument("--output-mode", choices=["auto", "schema", "json", "prompt"], default="auto", help="how the LLM is held to the schema: provider structured output if it has it (auto), forced, or the prompt alone")
+    parser.add_argument("--no-refill", action="store_true", help="don't re-ask the LLM for fields missing from its reply")
+    parser.add_argument("--browser-only", action="store_true", help="skip the plain HTTP tier")
+    parser.add_argument("--fetch-profile", choices=list(FETCH_PROFILES), default=DEFAULT_FETCH_PROFILE, help="what the browser downloads besides the HTML (default text-only)")
+    parser.add_argument("--block-domain", action="append", default=[], help="also block requests to this domain (repeatable)")
+    parser.add_argument("--no-cache", action="store_true", help="always call the LLM")
+    parser.add_argument("--batch", action="store_true", help="pack small pages into one LLM call")
+    parser.add_argument("--templates", action="store_true", help="learn CSS selectors per site template")
+    parser.add_argument("--dedup", action="store_true", help="extract near-duplicate pages once and reuse the records")
+    parser.add_argument("--clean", action="store_true", help="normalize the output file and merge duplicate records when done (needs -o)")
+    parser.add_argument("--clean-key", action="append", help="columns that identify a record for --clean, comma-separated, repeatable (default: email, name+url; add 'phone' when phones are personal)")
+    parser.add_argument("--country-code", help="for --clean: turns national phone numbers into +<code>...")
+    return parser
+
+
+def open_urls(path: str):
+    return sys.stdin if path == "-" else open(path, encoding="utf-8")
+
+
+async def run(args, out) -> int:
+    # crawl4ai & co. load while the job store and the URL list are opened
+    startup.warm_up(check_browsers=False)
+
+    # 1. Job: new (URLs from the input) or resumed (URLs from the job store)
+    job = None
+    if args.job:
+        job = JobStore().get_job(args.job)
+        if job is not None:
+            if args.retry_failed:
+                job.retry_failures()
+            print(f"[CLI] Resuming job {job.id}: {job.counts()}", file=sys.stderr)
+            args.fields = ",".join(job.fields)
+            args.model = job.model_id
+
+    if not args.fields:
+        print("--fields is required (unless resuming a job)", file=sys.stderr)
+        return 2
+    fields = [f.strip() for f in args.fields.split(",") if f.strip()]
+
+    api_key = args.api_key or default_api_key(args.model)
+    if not api_key:
+        print("API Key is missing: pass --api-key or set WEBBYSCRAPER_API_KEY", file=sys.stderr)
+        return 2
+
+    scheduler_settings = SchedulerSettings(
+        max_concurrency=args.concurrency,
+        per_domain_concurrency=args.per_domain,
+        per_domain_rate=args.rate,
+    )
+    cache = None if args.no_cache else ExtractionCache()
+
+    if args.output:
+        exporter = open_exporter(args.output, args.format, append=args.append, batch_size=args.flush_every)
+    else:
+        exporter = None
+
+    if job is None and args.job:
+        with open_urls(args.urls) as source:
+            job = JobStore().create_job(read_urls(source, args.shard), fields, args.model, args.job)
+        print(f"[CLI] Created job {job.id}: {job.counts()['pending']} URLs", file=sys.stderr)
+
+    # 2. Scrape in chunks, writing records as URLs finish
+    source = None
+    if job is not None:
+        url_iter = iter(job.todo_urls())
+    else:
+        source = open_urls(args.urls)
+        url_iter = read_urls(source, args.shard)
+
+    options = dict(
+        use_cache=not args.no_cache,
+        scheduler_settings=scheduler_settings,
+        static_first=not args.browser_only,
+        chunk_settings=ChunkSettings(token_budget=args.token_budget),
+        batch_settings=BatchSettings() if args.batch else None,
+        template_settings=TemplateSettings() if args.templates else None,
+        dedup_settings=DedupSettings() if args.dedup else None,
+        fetch_profile=get_fetch_profile(args.fetch_profile, args.block_domain),
+        retry_settings=RetrySettings(max_attempts=max(args.retries, 1)),
+        structured_settings=StructuredSettings(mode=args.output_mode, refill=not args.no_refill),
+        control=ScrapeControl(JobLimits(url_timeout=args.url_timeout, job_timeout=args.time_limit)),
+    )
+    control = options["control"]
+    # Total known up front only for jobs, URLs read from a stream are counted as they come
+    total = None
+    if job is not None:
+        counts = job.counts()
+        total = counts["pending"] + counts["fetched"]
+    workers = WorkerSettings(workers=args.workers, ordered=not args.unordered)
+
+    metrics = None
+    if args.metrics or args.metrics_port:
+        metrics = MetricsRecorder(args.metrics)
+        if args.metrics_port:
+            metrics.serve(args.metrics_port)
+        if args.workers > 1:
+            print("[CLI] Metrics are only recorded without --workers", file=sys.stderr)
+
+    # One warm browser for every chunk instead of a launch per chunk
+    pool = BrowserPool()
+    LLM_extraction = await asyncio.to_thread(startup.crawler_stack)
+
+    frontier = None
+    if args.deep:
+        # One crawl over everything reachable from the start URLs, the frontier does the chunking
+        if args.workers > 1:
+            print("[CLI] --workers is ignored with --deep", file=sys.stderr)
+        crawl_settings = DeepCrawlSettings(
+            max_depth=args.max_depth,
+            max_pages=args.max_pages,
+            include_external=args.external,
+            keywords=[k.strip() for k in (args.keywords or "").split(",") if k.strip()],
+        )
+        frontier = CrawlFrontier(args.frontier or (frontier_path(job.id) if job else DEFAULT_FRONTIER_PATH), crawl_settings)
+        rounds = [deep_crawl(list(url_iter), fields, args.model, api_key, frontier, job=job, cache=cache, pool=pool, metrics=metrics, **options)]
+    elif args.workers > 1:
+        # Workers are started once and read the URLs as they go, they have their own browsers
+        # and open the cache themselves
+        rounds = [sharded_scrape(url_iter, fields, args.model, api_key, workers, job=job, **options)]
+    else:
+        rounds = (
+            LLM_extraction.stream_scrape(urls, fields, args.model, api_key, cache=cache, job=job, pool=pool, metrics=metrics, **options)
+            for urls in chunked(url_iter, args.chunk_size)
+        )
+
+    def interrupt(signum, frame):
+        # First Ctrl+C stops gently and keeps the results, a second one stops right away
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        print("\n[CLI] Stopping, keeping the results so far (Ctrl+C again to quit now)", file=sys.stderr)
+        control.cancel("interrupted")
+
+    previous_handler = signal.signal(signal.SIGINT, interrupt)
+    progress = ScrapeProgress()
+    last_report = time.monotonic()
+    done = failed = 0
+    try:
+        for events in rounds:
+            if control.stopped:
+                break
+            async for event in events:
+                if event["success"]:
+                    done += 1
+                else:
+                    failed += 1
+                progress.update(done, failed, event["pending"] if args.deep else (total - done - failed if total is not None else None))
+                if time.monotonic() - last_report >= 10:
+                    print(f"[CLI] {progress.line()}", file=sys.stderr)
+                    last_report = time.monotonic()
+                records = [r for r in event["records"] if isinstance(r, dict)]
+                if exporter is not None:
+                    exporter.write(records)
+                else:
+                    for record in records:
+                        out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                    out.flush()
+            print(f"[CLI] {progress.line()}", file=sys.stderr)
+            last_report = time.monotonic()
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+        await pool.close()
+        if frontier is not None:
+            frontier.close()
+        if metrics is not None:
+            metrics.close()
+        if exporter is not None:
+            exporter.close()
+        if source is not None and source is not sys.stdin:
+            source.close()
+
+    if control.stopped:
+        print(f"[CLI] Stopped ({control.reason}): {done} done, {failed} failed, the results so far are saved", file=sys.stderr)
+        if job is not None:
+            print(f"[CLI] Run again with --job {job.id} to finish the rest", file=sys.stderr)
+    else:
+        print(f"[CLI] Finished: {done} done, {failed} failed", file=sys.stderr)
+    if args.clean:
+        clean_output(args)
+    if control.reason == "interrupted":
+        return 130
+    return 1 if failed and not done else 0
+
+
+def clean_output(args):
+    """Duplicates span chunks and workers, so the finished file is cleaned as a whole."""
+    if not args.output:
+        print("[CLI] --clean needs -o, records written to stdout are left as they are", file=sys.stderr)
+        return
+    from record_cleaning import CleanSettings, clean_file, parse_keys
+
+    settings = CleanSettings(default_country_code=args.country_code)
+    if args.clean_key:
+        settings.keys = parse_keys(args.clean_key)
+    before, after = clean_file(args.output, args.format, settings)
+    print(f"[CLI] Cleaned {args.output}: {before} -> {after} rows", file=sys.stderr)
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    out = sys.stdout
+    # Records own stdout, the scraper's progress prints go to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        return asyncio.run(run(args, out))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+import os
+import math
+import time
+import sqlite3
+import hashlib
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+
+from scheduler import domain_of
+
+DEFAULT_FRONTIER_PATH = os.path.join("cache", "frontier.db")
+
+# Query params that only track where a click came from, the page is the same without them
+TRACKING_PARAMS = {
+    "gclid", "dclid", "fbclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "ref", "ref_src", "spm", "sessionid", "sid", "phpsessid", "jsessionid",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_")
+
+# Links to these are never pages worth extracting
+SKIP_EXTENSIONS = (
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".ico", ".pdf", ".zip", ".rar",
+    ".mp3", ".mp4", ".avi", ".mov", ".css", ".js", ".xml", ".doc", ".docx", ".xls", ".xlsx",
+)
+
+# Frontier URL states: queued -> in_progress -> done / failed
+FRONTIER_STATES = ("queued", "in_progress", "done", "failed")
+
+
+def canonicalize_url(url: str, base: str = None, drop_query: bool = False) -> Optional[str]:
+    """
+    One spelling per page, so the same page isn't crawled twice:
+    resolves relative links, lowercases scheme and host, drops default ports,
+    fragments and tracking params, and sorts what's left of the query.
+    Returns None for anything that isn't an http(s) URL.
+    """
+    url = (url or "").strip()
+    if base:
+        url = urljoin(base, url)
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.hostname:
+        return None
+
+    host = parts.hostname.lower()
+    if port and not (scheme == "http" and port == 80) and not (scheme == "https" and port == 443):
+        host = f"{host}:{port}"
+
+    query = ""
+    if not drop_query:
+        params = [
+            (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+        ]
+        query = urlencode(sorted(params))
+
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+class BloomFilter:
+    """
+    Fixed-size seen-set: about 1.8 MB for a million URLs at 0.1% false positives.
+    A false positive means a new URL is taken for seen and skipped, never the other way around.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001, bits: bytes = None):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(bits) if bits is not None else bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+@dataclass
+class DeepCrawlSettings:
+    """
+    max_depth: links followed from the start URLs (start URLs are depth 0)
+    max_pages: pages crawled in total, across resumes
+    depth_budgets: optional cap on URLs queued per depth, e.g. {1: 200, 2: 5000}
+    include_external: follow links to other domains
+    keywords: URLs / link texts containing these are crawled first, otherwise breadth first
+    include_patterns / exclude_patterns: substrings a URL must / must not contain
+    drop_query: treat URLs that only differ in their query string as one page
+    batch_size: URLs handed to the scraper at a time, the frontier grows while they run
+    expected_urls / error_rate: sizing of the seen-set
+    """
+    max_depth: int = 3
+    max_pages: int = 1000
+    depth_budgets: Dict[int, int] = field(default_factory=dict)
+    include_external: bool = False
+    keywords: List[str] = field(default_factory=list)
+    include_patterns: List[str] = field(default_factory=list)
+    exclude_patterns: List[str] = field(default_factory=list)
+    drop_query: bool = False
+    batch_size: int = 50
+    expected_urls: int = 1_000_000
+    error_rate: float = 0.001
+
+
+class CrawlFrontier:
+    """
+    Disk-backed priority queue of URLs to crawl.
+    The queue lives in SQLite, only the seen-set (a Bloom filter) and the batch
+    being crawled are in memory, so a 100k-page crawl stays small. Reopening the
+    same file resumes: URLs that were in flight go back to the queue.
+    """
+
+    def __init__(self, path: str = DEFAULT_FRONTIER_PATH, settings: DeepCrawlSettings = None):
+        self.path = path
+        self.settings = settings or DeepCrawlSettings()
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS frontier (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                score REAL NOT NULL,
+                state TEXT NOT NULL DEFAULT 'queued',
+                error TEXT,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_frontier_next ON frontier(state, score DESC, id)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS frontier_meta (key TEXT PRIMARY KEY, value BLOB)")
+        # Resume: whatever was being crawled when we stopped goes back in the queue
+        self._conn.execute("UPDATE frontier SET state = 'queued' WHERE state = 'in_progress'")
+        self._conn.commit()
+
+        self._in_flight: Dict[str, tuple] = {}
+        self._counts = {state: 0 for state in FRONTIER_STATES}
+        self._counts.update(dict(self._conn.execute("SELECT state, COUNT(*) FROM frontier GROUP BY state").fetchall()))
+        self._depth_counts: Dict[int, int] = dict(
+            self._conn.execute("SELECT depth, COUNT(*) FROM frontier GROUP BY depth").fetchall()
+        )
+        self.skipped = 0
+        self._load_seen()
+
+    def _load_seen(self):
+        meta = dict(self._conn.execute("SELECT key, value FROM frontier_meta").fetchall())
+        if "bloom" in meta:
+            self.seen = BloomFilter(int(meta["capacity"]), float(meta["error_rate"]), meta["bloom"])
+            saved_up_to = int(meta["bloom_rowid"])
+        else:
+            self.seen = BloomFilter(self.settings.expected_urls, self.settings.error_rate)
+            saved_up_to = 0
+        # URLs added after the last save (crash) aren't in the saved bits yet
+        for (url,) in self._conn.execute("SELECT url FROM frontier WHERE id > ?", (saved_up_to,)):
+            self.seen.add(url)
+
+    def save(self):
+        """Persists the seen-set. The queue itself is committed as it changes."""
+        last_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM frontier").fetchone()[0]
+        meta = {
+            "bloom": bytes(self.seen.bits),
+            "bloom_rowid": str(last_id),
+            "capacity": str(self.settings.expected_urls),
+            "error_rate": str(self.settings.error_rate),
+        }
+        if self._conn.execute("SELECT 1 FROM frontier_meta WHERE key = 'capacity'").fetchone():
+            # Sized when the crawl started, keep that
+            meta.pop("capacity")
+            meta.pop("error_rate")
+        self._conn.executemany("INSERT OR REPLACE INTO frontier_meta (key, value) VALUES (?, ?)", meta.items())
+        self._conn.commit()
+
+    def score(self, url: str, depth: int, text: str = "") -> float:
+        """Keyword hits in the URL and link text first, shallower pages break ties."""
+        haystack = f"{url} {text}".lower()
+        hits = sum(1 for keyword in self.settings.keywords if keyword.lower() in haystack)
+        return hits - depth * 0.01
+
+    def allows(self, url: str, page_domain: str = None) -> bool:
+        """Scope filters: domain, file type, include/exclude patterns."""
+        s = self.settings
+        if page_domain and not s.include_external and domain_of(url) != page_domain:
+            return False
+        path = urlsplit(url).path.lower()
+        if path.endswith(SKIP_EXTENSIONS):
+            return False
+        if s.include_patterns and not any(p in url for p in s.include_patterns):
+            return False
+        if any(p in url for p in s.exclude_patterns):
+            return False
+        return True
+
+    def _enqueue(self, rows: List[tuple]):
+        if not rows:
+            return
+        now = time.time()
+        self._conn.executemany(
+            "INSERT INTO frontier (url, depth, score, updated_at) VALUES (?, ?, ?, ?)",
+            [(url, depth, score, now) for url, depth, score in rows],
+        )
+        self._conn.commit()
+        for url, depth, _ in rows:
+            self.seen.add(url)
+            self._depth_counts[depth] = self._depth_counts.get(depth, 0) + 1
+        self._counts["queued"] += len(rows)
+
+    def seed(self, urls: Iterable[str]) -> int:
+        """Queues start URLs at depth 0. Seeds already seen (a resumed crawl) are left alone."""
+        rows = []
+        for url in urls:
+            url = canonicalize_url(url, drop_query=self.settings.drop_query)
+            if url and url not in self.seen and url not in {r[0] for r in rows}:
+                rows.append((url, 0, 1000.0))
+        self._enqueue(rows)
+        return len(rows)
+
+    def add_links(self, page_url: str, links: dict) -> int:
+        """
+        Queues the links found on a crawled page (crawl4ai's result.links:
+        {"internal": [{"href", "text"}...], "external": [...]}). Returns how many were new.
+        """
+        parent = self._in_flight.get(page_url)
+        depth = (parent[1] if parent else 0) + 1
+        if not links or depth > self.settings.max_depth:
+            return 0
+
+        page_domain = domain_of(page_url)
+        budget = self.settings.depth_budgets.get(depth)
+        rows, batch_seen = [], set()
+        for link in (links.get("internal") or []) + (links.get("external") or []):
+            url = canonicalize_url(link.get("href"), base=page_url, drop_query=self.settings.drop_query)
+            if url is None or url in batch_seen or url in self.seen:
+                continue
+            batch_seen.add(url)
+            if not self.allows(url, page_domain):
+                self.skipped += 1
+                continue
+            if budget is not None and self._depth_counts.get(depth, 0) + len(rows) >= budget:
+                self.skipped += 1
+                continue
+            rows.append((url, depth, self.score(url, depth, link.get("text") or "")))
+        self._enqueue(rows)
+        return len(rows)
+
+    def next_batch(self, size: int = None) -> List[str]:
+        """Highest-priority queued URLs, marked in progress. Empty when done or max_pages is reached."""
+        crawled = self._counts["done"] + self._counts["failed"] + self._counts["in_progress"]
+        size = min(size or self.settings.batch_size, self.settings.max_pages - crawled)
+        if size <= 0:
+            return []
+        rows = self._conn.execute(
+            "SELECT id, url, depth FROM frontier WHERE state = 'queued' ORDER BY score DESC, id LIMIT ?", (size,)
+        ).fetchall()
+        if not rows:
+            return []
+        self._conn.executemany(
+            "UPDATE frontier SET state = 'in_progress', updated_at = ? WHERE id = ?",
+            [(time.time(), row_id) for row_id, _, _ in rows],
+        )
+        self._conn.commit()
+        for row_id, url, depth in rows:
+            self._in_flight[url] = (row_id, depth)
+        self._counts["queued"] -= len(rows)
+        self._counts["in_progress"] += len(rows)
+        return [url for _, url, _ in rows]
+
+    def in_flight(self) -> List[str]:
+        return list(self._in_flight)
+
+    def mark_done(self, url: str, success: bool, error: str = None):
+        entry = self._in_flight.pop(url, None)
+        if entry is None:
+            return
+        state = "done" if success else "failed"
+        self._conn.execute(
+            "UPDATE frontier SET state = ?, error = ?, updated_at = ? WHERE id = ?",
+            (state, error, time.time(), entry[0]),
+        )
+        self._conn.commit()
+        self._counts["in_progress"] -= 1
+        self._counts[state] += 1
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self._counts)
+
+    def depth_counts(self) -> Dict[int, int]:
+        return dict(sorted(self._depth_counts.items()))
+
+    def close(self):
+        self.save()
+        self._conn.close()
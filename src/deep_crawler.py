@@ -0,0 +1,65 @@
+import os
+from typing import List
+
+from crawl_frontier import CrawlFrontier
+from job_store import ScrapeJob
+
+FRONTIERS_DIR = os.path.join("cache", "frontiers")
+
+
+def frontier_path(job_id: str) -> str:
+    """Where a job's deep-crawl frontier lives, so resuming the job resumes the crawl."""
+    return os.path.join(FRONTIERS_DIR, f"{job_id}.db")
+
+
+async def deep_crawl(start_urls: List[str], fields: List[str], model_id: str, api_key: str, frontier: CrawlFrontier, job: ScrapeJob = None, **scrape_options):
+    """
+    Scrapes the start URLs and the pages they link to, best first.
+    The frontier hands out a batch of URLs, stream_scrape crawls and extracts
+    them concurrently and queues every page's links back in the frontier as it
+    goes, until the queue is empty or the page/depth budgets are used up.
+    Yields the usual stream_scrape events, with done/failed/pending for the whole crawl.
+    With a job, each batch is added to it before it runs, so records are checkpointed like a normal scrape.
+    scrape_options are passed on to stream_scrape. A stopped control (see job_control.py)
+    ends the crawl after the current batch, its unfinished pages stay queued for a resume.
+    """
+    if not api_key:
+        raise ValueError("API Key is missing.")
+    # Imported here so frontier_path() and the settings don't load the crawler stack
+    import LLM_extraction
+
+    added = frontier.seed(start_urls)
+    counts = frontier.counts()
+    if counts["done"] or counts["failed"]:
+        print(f"[DEEP] Resuming crawl: {counts['done']} done, {counts['failed']} failed, {counts['queued']} queued")
+    else:
+        print(f"[DEEP] Crawling from {added} start URLs, up to {frontier.settings.max_pages} pages, depth {frontier.settings.max_depth}")
+
+    control = scrape_options.get("control")
+    try:
+        while True:
+            batch = frontier.next_batch()
+            if not batch:
+                break
+            if job is not None:
+                job.add_urls(batch)
+
+            async for event in LLM_extraction.stream_scrape(batch, fields, model_id, api_key, job=job, frontier=frontier, **scrape_options):
+                frontier.mark_done(event["url"], event["success"], event["error"])
+                counts = frontier.counts()
+                yield dict(event, done=counts["done"], failed=counts["failed"], pending=counts["queued"] + counts["in_progress"])
+
+            if control is not None and control.stopped:
+                # In-progress pages go back in the queue when the frontier is reopened
+                break
+            # Anything the scrape didn't report on counts as failed
+            for url in frontier.in_flight():
+                frontier.mark_done(url, False, "No result from scrape")
+            frontier.save()
+            counts = frontier.counts()
+            print(f"[DEEP] {counts['done']} done, {counts['failed']} failed, {counts['queued']} queued, by depth {frontier.depth_counts()}")
+    finally:
+        frontier.save()
+
+    if frontier.skipped:
+        print(f"[DEEP] {frontier.skipped} links skipped (out of scope or over the depth budget)")
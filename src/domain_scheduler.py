@@ -0,0 +1,201 @@
+import time
+import uuid
+import asyncio
+from collections import deque
+from typing import Dict, List, Optional, Union
+
+import psutil
+from crawl4ai import CrawlerRunConfig
+from crawl4ai.async_dispatcher import BaseDispatcher
+from crawl4ai.models import CrawlResult, CrawlerTaskResult
+
+from scheduler import SchedulerSettings, TokenBucket, domain_of
+from job_control import DEADLINE_PREFIX
+
+
+class DomainScheduler(BaseDispatcher):
+    """
+    crawl4ai dispatcher that is polite per host.
+
+    - Global cap on concurrent pages (max_concurrency)
+    - Per-domain cap on concurrent pages and a per-domain token bucket
+    - Domains are served round-robin, so one slow or heavily listed host
+      can't hold up the rest of the batch
+    - New pages are only admitted while system memory is under the threshold
+    - With url_timeout, a page that takes longer fails and its browser page is closed
+    - With a feed, URLs that arrive while it runs are crawled too, until None comes through it
+    """
+
+    def __init__(self, settings: SchedulerSettings = None, url_timeout: Optional[float] = None, feed: Optional[asyncio.Queue] = None):
+        super().__init__()
+        self.settings = settings or SchedulerSettings()
+        self.url_timeout = url_timeout
+        self.feed = feed
+
+    async def _kill_session(self, task_id: str):
+        """Closes the page (and context) crawl4ai keeps for a session that didn't finish."""
+        manager = getattr(self.crawler.crawler_strategy, "browser_manager", None)
+        if manager is None:
+            return
+        try:
+            await manager.kill_session(task_id)
+        except Exception as e:
+            print(f"[SCHEDULER] Error closing page: {e}")
+
+    async def crawl_url(
+        self,
+        url: str,
+        config: Union[CrawlerRunConfig, List[CrawlerRunConfig]],
+        task_id: str,
+    ) -> CrawlerTaskResult:
+        start_time = time.time()
+        error_message = ""
+        process = psutil.Process()
+        start_memory = process.memory_info().rss / (1024 * 1024)
+
+        selected_config = self.select_config(url, config)
+        if selected_config is None:
+            error_message = f"No matching configuration found for URL: {url}"
+            result = CrawlResult(url=url, html="", metadata={"status": "no_config_match"}, success=False, error_message=error_message)
+        else:
+            try:
+                result = await asyncio.wait_for(self.crawler.arun(url, config=selected_config, session_id=task_id), self.url_timeout)
+                if not result.success:
+                    error_message = result.error_message
+            except asyncio.TimeoutError as e:
+                await self._kill_session(task_id)
+                if self.url_timeout is not None:
+                    error_message = f"{DEADLINE_PREFIX}: page load took over {self.url_timeout:g}s"
+                else:
+                    error_message = f"Timeout: {e}"
+                result = CrawlResult(url=url, html="", metadata={}, success=False, error_message=error_message)
+            except asyncio.CancelledError:
+                # The scrape was stopped: don't leave the page open in the (pooled) browser
+                await asyncio.shield(self._kill_session(task_id))
+                raise
+            except Exception as e:
+                error_message = str(e)
+                result = CrawlResult(url=url, html="", metadata={}, success=False, error_message=error_message)
+
+        memory_usage = process.memory_info().rss / (1024 * 1024) - start_memory
+        return CrawlerTaskResult(
+            task_id=task_id,
+            url=url,
+            result=result,
+            memory_usage=memory_usage,
+            peak_memory=memory_usage,
+            start_time=start_time,
+            end_time=time.time(),
+            error_message=error_message,
+        )
+
+    def _memory_ok(self) -> bool:
+        return psutil.virtual_memory().percent < self.settings.memory_threshold_percent
+
+    async def _dispatch(self, urls: List[str], config):
+        """Yields CrawlerTaskResults as pages finish, launching new ones as slots free up."""
+        settings = self.settings
+
+        # One queue per domain, in the order domains first appear
+        queues: Dict[str, deque] = {}
+        buckets: Dict[str, TokenBucket] = {}
+        active_per_domain: Dict[str, int] = {}
+        running: Dict[asyncio.Task, str] = {}
+        order = deque()
+        feeding = self.feed is not None
+
+        def add(url: Optional[str]):
+            nonlocal feeding
+            if url is None:
+                feeding = False
+                return
+            domain = domain_of(url)
+            if domain not in buckets:
+                buckets[domain] = TokenBucket(settings.per_domain_rate, settings.per_domain_burst)
+                active_per_domain[domain] = 0
+            queue = queues.setdefault(domain, deque())
+            if not queue:
+                order.append(domain)
+            queue.append(url)
+
+        for url in urls:
+            add(url)
+
+        try:
+            while order or running or feeding:
+                while feeding and not self.feed.empty():
+                    add(self.feed.get_nowait())
+
+                # 1. Launch as many pages as the limits allow, one domain at a time
+                next_wake = None
+                for _ in range(len(order)):
+                    if not order:
+                        break
+                    if len(running) >= settings.max_concurrency:
+                        break
+                    if running and not self._memory_ok():
+                        break
+
+                    domain = order[0]
+                    order.rotate(-1)
+                    queue = queues[domain]
+                    # This domain's pages until its cap or its token bucket says no, then the next domain
+                    while queue and active_per_domain[domain] < settings.per_domain_concurrency and len(running) < settings.max_concurrency:
+                        if running and not self._memory_ok():
+                            break
+                        wait = buckets[domain].wait_time()
+                        if wait > 0:
+                            next_wake = wait if next_wake is None else min(next_wake, wait)
+                            break
+
+                        buckets[domain].take()
+                        url = queue.popleft()
+                        active_per_domain[domain] += 1
+                        task = asyncio.create_task(self.crawl_url(url, config, str(uuid.uuid4())))
+                        running[task] = domain
+                    if not queue:
+                        order.remove(domain)
+
+                # 2. Wait for a page to finish, or for a token bucket to refill
+                if not running:
+                    if next_wake is None and feeding and not order:
+                        # Nothing to do until the next URL comes in
+                        add(await self.feed.get())
+                    elif order or feeding:
+                        await asyncio.sleep(next_wake if next_wake is not None else 0.25)
+                    continue
+
+                timeout = next_wake if next_wake is not None else (None if len(running) >= settings.max_concurrency else 0.25)
+                done, _ = await asyncio.wait(running.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    domain = running.pop(task)
+                    active_per_domain[domain] -= 1
+                    yield task.result()
+        finally:
+            for task in running:
+                task.cancel()
+
+    async def run_urls(
+        self,
+        crawler,
+        urls: List[str],
+        config: Union[CrawlerRunConfig, List[CrawlerRunConfig]],
+    ) -> List[CrawlerTaskResult]:
+        self.crawler = crawler
+        results = [res async for res in self._dispatch(urls, config)]
+        # Hand back in input order, like the default dispatcher
+        position = {}
+        for i, url in enumerate(urls):
+            position.setdefault(url, i)
+        return sorted(results, key=lambda r: position.get(r.url, 0))
+
+    async def run_urls_stream(
+        self,
+        crawler,
+        urls: List[str],
+        config: Union[CrawlerRunConfig, List[CrawlerRunConfig]],
+    ):
+        self.crawler = crawler
+        async for res in self._dispatch(urls, config):
+            yield res
@@ -0,0 +1,235 @@
+import os
+import csv
+import json
+import queue
+import threading
+from typing import Iterable, List, Optional
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+DEFAULT_BATCH_SIZE = 1000
+
+
+def format_for(path: str, default: str = "csv") -> str:
+    """Picks the export format from the file extension."""
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    if ext == "ndjson":
+        return "jsonl"
+    return ext if ext in EXPORT_FORMATS else default
+
+
+def _cell(value) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+class RecordExporter:
+    """
+    Writes records to a file in batches of `batch_size`, so only one batch is
+    ever held in memory. Call write() as records arrive and close() at the end.
+    With append=True an existing file is extended instead of replaced.
+    """
+
+    def __init__(self, path: str, append: bool = False, columns: List[str] = None, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.path = path
+        self.append = append and os.path.exists(path) and os.path.getsize(path) > 0
+        self.columns = list(columns) if columns else None
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self._buffer: List[dict] = []
+
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+    def write(self, records: Iterable[dict]):
+        for record in records:
+            self._buffer.append(record)
+            if len(self._buffer) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        if self.columns is None:
+            self.columns = []
+            for record in batch:
+                for key in record:
+                    if key not in self.columns:
+                        self.columns.append(key)
+        self._write_batch(batch)
+        self.rows_written += len(batch)
+
+    def close(self):
+        self.flush()
+        self._close()
+
+    def _write_batch(self, batch: List[dict]):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class CsvExporter(RecordExporter):
+    """CSV with the header taken from the first batch (or the existing file when appending)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.append:
+            with open(self.path, newline="", encoding="utf-8") as f:
+                header = next(csv.reader(f), None)
+            if header:
+                self.columns = header
+        self._file = open(self.path, "a" if self.append else "w", newline="", encoding="utf-8")
+        self._writer = None
+        self._warned = set()
+
+    def _write_batch(self, batch: List[dict]):
+        if self._writer is None:
+            self._writer = csv.DictWriter(self._file, fieldnames=self.columns, extrasaction="ignore")
+            if not self.append:
+                self._writer.writeheader()
+
+        # A CSV header can't grow, keys that show up later are left out
+        for record in batch:
+            for key in record:
+                if key not in self.columns and key not in self._warned:
+                    self._warned.add(key)
+                    print(f"[EXPORT] '{key}' is not in the CSV header, skipping that column")
+
+        self._writer.writerows({k: _cell(v) for k, v in r.items() if k in self.columns} for r in batch)
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class JsonlExporter(RecordExporter):
+    """One JSON object per line, appending is just opening the file in 'a' mode."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._file = open(self.path, "a" if self.append else "w", encoding="utf-8")
+
+    def _write_batch(self, batch: List[dict]):
+        self._file.write("".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in batch))
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class ParquetExporter(RecordExporter):
+    """
+    Parquet, one row group per batch. Needs pyarrow.
+    Every column is stored as a string since LLM output has no reliable types.
+
+    Parquet files can't be appended to in place, so when appending the old row
+    groups are copied into a temp file batch by batch and it replaces the original on close.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Parquet export needs pyarrow: pip install pyarrow")
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self._writer = None
+        self._tmp_path = self.path + ".tmp"
+
+        if self.append:
+            self.columns = self._pq.ParquetFile(self.path).schema_arrow.names
+
+    def _schema(self):
+        return self._pa.schema([(name, self._pa.string()) for name in self.columns])
+
+    def _table(self, batch: List[dict]):
+        return self._pa.table(
+            {name: [_cell(r.get(name)) for r in batch] for name in self.columns},
+            schema=self._schema(),
+        )
+
+    def _write_batch(self, batch: List[dict]):
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._tmp_path, self._schema())
+            if self.append:
+                for old in self._pq.ParquetFile(self.path).iter_batches(batch_size=self.batch_size):
+                    self._writer.write_table(self._pa.Table.from_batches([old]).cast(self._schema()))
+        self._writer.write_table(self._table(batch))
+
+    def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+            os.replace(self._tmp_path, self.path)
+
+
+EXPORTERS = {"csv": CsvExporter, "jsonl": JsonlExporter, "parquet": ParquetExporter}
+
+
+def open_exporter(path: str, fmt: str = None, append: bool = False, columns: List[str] = None, batch_size: int = DEFAULT_BATCH_SIZE) -> RecordExporter:
+    fmt = fmt or format_for(path)
+    if fmt not in EXPORTERS:
+        raise ValueError(f"Unknown export format '{fmt}', use one of {', '.join(EXPORT_FORMATS)}")
+    return EXPORTERS[fmt](path, append=append, columns=columns, batch_size=batch_size)
+
+
+def export_records(records: Iterable[dict], path: str, fmt: str = None, append: bool = False, columns: List[str] = None, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Streams any iterable of records to a file. Returns the number of rows written."""
+    with open_exporter(path, fmt, append, columns, batch_size) as exporter:
+        exporter.write(records)
+    return exporter.rows_written
+
+
+class BackgroundExporter:
+    """
+    Runs an exporter on its own thread, so file writes never block the caller.
+    submit() hands over records through a bounded queue (it only waits if the
+    writer falls max_pending submits behind). close() finishes the file and
+    re-raises anything that went wrong while writing.
+    """
+
+    def __init__(self, exporter: RecordExporter, max_pending: int = 100):
+        self.exporter = exporter
+        self.error: Optional[Exception] = None
+        self._queue: "queue.Queue[Optional[List[dict]]]" = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            records = self._queue.get()
+            if records is None:
+                break
+            if self.error is None:
+                try:
+                    self.exporter.write(records)
+                except Exception as e:
+                    self.error = e
+        try:
+            self.exporter.close()
+        except Exception as e:
+            self.error = self.error or e
+
+    def submit(self, records: List[dict]):
+        if records:
+            self._queue.put(list(records))
+
+    def close(self) -> int:
+        self._queue.put(None)
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.exporter.rows_written
@@ -0,0 +1,150 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+from typing import List, Optional
+
+DEFAULT_CACHE_PATH = os.path.join("cache", "llm_extractions.db")
+# Seconds a writer waits for another process's write to finish (--workers share the file)
+BUSY_TIMEOUT_S = 30.0
+# A hit only refreshes last_used when it's older than this
+LAST_USED_RESOLUTION_S = 3600.0
+
+
+def normalize_markdown(markdown: str) -> str:
+    """
+    Normalizes page markdown so cosmetic differences don't change the cache key.
+    (line endings, trailing spaces, runs of blank lines)
+    """
+    text = markdown.replace("\r\n", "\n").replace("\r", "\n")
+    lines = [line.rstrip() for line in text.split("\n")]
+    text = "\n".join(lines)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def make_cache_key(markdown: str, schema: dict, provider: str, instruction: str, extra: dict = None) -> str:
+    """
+    Builds the content address for one extraction.
+    Same page content + same fields + same model + same instruction -> same key.
+    `extra` holds any other setting that changes what the LLM sees (e.g. token budget).
+    """
+    payload = json.dumps(
+        {
+            "markdown": normalize_markdown(markdown or ""),
+            "schema": schema,
+            "provider": provider,
+            "instruction": instruction or "",
+            "extra": extra or {},
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ExtractionCache:
+    """
+    Persistent on-disk cache of LLM extractions, stored in a single SQLite file.
+
+    Entries older than `ttl_seconds` are ignored and removed. When the stored
+    data grows past `max_bytes`, the least recently used entries are evicted.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        max_bytes: int = 512 * 1024 * 1024,
+        ttl_seconds: Optional[float] = 30 * 24 * 3600,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+        # Worker processes share the file: readers don't block the writer, writers wait their turn
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=BUSY_TIMEOUT_S)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS extractions (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON extractions(last_used)")
+        self._conn.commit()
+        self.evict()
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        """Returns the stored extraction, or None on a miss."""
+        row = self._conn.execute(
+            "SELECT value, created_at, last_used FROM extractions WHERE key = ?", (key,)
+        ).fetchone()
+        now = time.time()
+
+        if row is None or self._is_expired(row[1], now):
+            if row is not None:
+                self._conn.execute("DELETE FROM extractions WHERE key = ?", (key,))
+                self._conn.commit()
+            self.misses += 1
+            return None
+
+        # LRU order only needs to be roughly right, don't write on every hit
+        if now - row[2] > LAST_USED_RESOLUTION_S:
+            self._conn.execute("UPDATE extractions SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, records: List[dict]):
+        """Stores an extraction and evicts old entries if we're over budget."""
+        value = json.dumps(records, ensure_ascii=False, default=str)
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO extractions (key, value, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+            (key, value, len(value), now, now),
+        )
+        self._conn.commit()
+        self.evict()
+
+    def evict(self):
+        """Drops expired entries, then least-recently-used ones until we're under max_bytes."""
+        if self.ttl_seconds is not None:
+            self._conn.execute(
+                "DELETE FROM extractions WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+        if total > self.max_bytes:
+            rows = self._conn.execute("SELECT key, size FROM extractions ORDER BY last_used ASC").fetchall()
+            stale = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                stale.append((key,))
+                total -= size
+            self._conn.executemany("DELETE FROM extractions WHERE key = ?", stale)
+
+        self._conn.commit()
+
+    def clear(self):
+        self._conn.execute("DELETE FROM extractions")
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
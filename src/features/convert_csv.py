@@ -1,20 +1,26 @@
-import pandas as pd
+import os
+import sys
 import json
 
+# The exporters live one folder up (src/)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from exporters import export_records
+
 def create_csv(data_list, filename="results.csv"):
     if not data_list:
         print("⚠ No data to save.")
         return
 
-    # Create one master DataFrame
-    df = pd.DataFrame(data_list)
-    
-    # Save to CSV (index=False removes the 0,1,2 row numbers)
-    #df.to_csv(filename, index=False)
-    
-    #print(f"\n✅ Success! Saved {len(df)} rows to '{filename}'")
-    print("Preview:")
-    print(df.head())
+    # Streams the rows out in batches, no DataFrame of the whole list
+    # (.jsonl / .parquet filenames work too)
+    rows = export_records(data_list, filename)
 
+    print(f"\n✅ Success! Saved {rows} rows to '{filename}'")
 
 
+def json_to_csv(raw_json, filename="results.csv"):
+    """Saves the extracted_content string of a crawl result."""
+    data = json.loads(raw_json) if raw_json else []
+    if isinstance(data, dict):
+        data = [data]
+    create_csv([r for r in data if isinstance(r, dict)], filename)
@@ -1,41 +1,42 @@
+import os
+import sys
 import asyncio
-from crawl4ai import AsyncWebCrawler, CrawlerRunConfig
-from crawl4ai.deep_crawling import BestFirstCrawlingStrategy
-from crawl4ai.deep_crawling.scorers import KeywordRelevanceScorer
-from crawl4ai.content_scraping_strategy import LXMLWebScrapingStrategy
 
-import LLM_extraction
+# The deep crawler runs on src/LLM_extraction's stream_scrape, so src/ goes first
+# (the LLM_extraction in this folder is the older single-page version)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from crawl_frontier import CrawlFrontier, DeepCrawlSettings
+from deep_crawler import deep_crawl
+from browser_pool import BrowserPool
+from exporters import open_exporter
+
+START_URL = "https://filipinohomes.com/agent-list.php"
+FIELDS = ["name", "email", "phone"]
+
 
 async def main():
-    
-    scorer = KeywordRelevanceScorer(
-        keywords=["Contact","contact","find","email","phone"],
-        weight=0.7
-    )
-    
-    strategy = BestFirstCrawlingStrategy(
-        max_depth = 3,
-        include_external=False,
-        url_scorer=scorer,
-        max_pages=10
+    settings = DeepCrawlSettings(
+        max_depth=3,
+        max_pages=2000,
+        depth_budgets={1: 500},
+        keywords=["contact", "find", "email", "phone", "agent"],
     )
-    
-    config = CrawlerRunConfig(
-        deep_crawl_strategy=strategy,
-        extraction_strategy= LLM_extraction.llm_strategy,
-        verbose=True,
-    )
-
-    all_scraped_data = []
+    # Same file every run: stop it whenever, run it again to continue where it left off
+    frontier = CrawlFrontier(os.path.join("cache", "frontier-filipinohomes.db"), settings)
+    pool = BrowserPool()
 
-    async with AsyncWebCrawler() as crawler:
-        results = await crawler.arun("https://filipinohomes.com/agent-list.php", config=config)
+    # Rows are written as pages finish, a long crawl never holds them all in memory
+    exporter = open_exporter("deep_crawl.csv", append=True)
+    try:
+        async for event in deep_crawl([START_URL], FIELDS, "gpt-4o-mini", os.getenv("OPENAI_API_KEY"), frontier, pool=pool):
+            exporter.write([r for r in event["records"] if isinstance(r, dict)])
+            print(f"Done: {event['done']} | Failed: {event['failed']} | Queued: {event['pending']}")
+    finally:
+        exporter.close()
+        await pool.close()
+        frontier.close()
 
-        print(f"Crawled {len(results)} pages in total")
-        
-        for result in results[:3]:  # Show first 3 results
-            print(f"URL: {result.url}")
-            print(f"Depth: {result.metadata.get('depth', 0)}")
+    print(f"Crawled {frontier.counts()['done']} pages in total, by depth: {frontier.depth_counts()}")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -1,5 +1,4 @@
 import os
-import subprocess
 import sys
 
 import json
@@ -8,19 +7,15 @@ import LLM_extraction
 from crawl4ai import *
 from convert_csv import create_csv
 
+# The scheduler lives one folder up (src/), append so our local LLM_extraction still wins
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from domain_scheduler import DomainScheduler
+from scheduler import SchedulerSettings
+from readiness import build_readiness_script, ReadinessStats
+from fetch_profiles import FetchBlocker, get_fetch_profile
+from startup import ensure_browsers_installed
 
 
-
-
-def ensure_browsers_installed():
-    print("Checking browser components...")
-    try:
-        subprocess.run(["playwright", "--version"], check=True, stdout=subprocess.DEVNULL)
-    except (FileNotFoundError, subprocess.CalledProcessError):
-        print("First time setup: Installing browsers (this takes a minute)...")
-        subprocess.run([sys.executable, "-m", "playwright", "install"], check=True)
-        print("Browser setup complete!")
-
 async def main():
     urls = [
         "https://www.zillow.com/profile/Matt-Laricy",
@@ -37,20 +32,8 @@ async def main():
         }
     )
     
-    scroll_script = """
-        async function scrollDown() {
-            let totalHeight = 0;
-            let distance = 300; // Scroll 300px at a time
-            
-            while (totalHeight < document.body.scrollHeight) {
-                window.scrollBy(0, distance);
-                totalHeight += distance;
-                // Wait 100ms between scrolls to let the page catch up
-                await new Promise(r => setTimeout(r, 100)); 
-            }
-        }
-        await scrollDown();
-    """
+    # Scrolls and waits only until the page is stable (capped at 10s), instead of fixed sleeps
+    readiness_script = build_readiness_script(quiet_ms=500, deadline_ms=10000)
     
     run_conf = CrawlerRunConfig(
         cache_mode=CacheMode.BYPASS,
@@ -61,11 +44,11 @@ async def main():
         #word_count_threshold=10,
         page_timeout=60000,
         wait_until="domcontentloaded",
-        delay_before_return_html=5.0,
+        delay_before_return_html=0.1,
         
         # 2. CONTENT FIXES
         remove_overlay_elements=True, 
-        js_code=scroll_script,
+        js_code=readiness_script,
         
         extraction_strategy=LLM_extraction.llm_strategy,
         excluded_tags=["style", "noscript", "script", "nav", "footer"],
@@ -74,18 +57,28 @@ async def main():
     
     all_scraped_data = []
     
+    # Only the HTML matters for the markdown, skip images, video, fonts and trackers
+    blocker = FetchBlocker(get_fetch_profile("text-only"))
+
     async with AsyncWebCrawler(config=browser_conf) as crawler:
+        blocker.attach(crawler)
         print(f"Starting crawl for {len(urls)} URLs...")
         
         
+        # Caps concurrency and paces requests per host, so zillow.com doesn't block us
+        dispatcher = DomainScheduler(SchedulerSettings(max_concurrency=5, per_domain_concurrency=2, per_domain_rate=0.5))
         results = await crawler.arun_many(
             urls=urls,
-            config=run_conf
+            config=run_conf,
+            dispatcher=dispatcher
         )
 
         
+        readiness = ReadinessStats(old_fixed_delay=5.0)
         for result in results:
+            blocker.pop(result.url)
             if result.success:
+                readiness.record(result.url, result.js_execution_result)
                 clean_text = result.extracted_content
                 data = json.loads(clean_text)
                 
@@ -96,6 +89,9 @@ async def main():
             
             else:
                 print(f"Error: {result.error_message}")
+
+        readiness.print_summary()
+        blocker.print_summary()
             
     create_csv(all_scraped_data, "final_real_estate_data.csv")        
     
@@ -1,5 +1,4 @@
 import os
-import subprocess
 import sys
 
 import json
@@ -8,18 +7,14 @@ import LLM_extraction
 from crawl4ai import *
 from convert_csv import json_to_csv
 
-
-def ensure_browsers_installed():
-    """Checks if Playwright browsers are present. If not, installs them."""
-    print("Checking browser components...")
-    try:
-        # A simple check (this is a bit hacky but works for simple apps)
-        # We try to run a playwright command. If it fails, we install.
-        subprocess.run(["playwright", "--version"], check=True, stdout=subprocess.DEVNULL)
-    except (FileNotFoundError, subprocess.CalledProcessError):
-        print("First time setup: Installing browsers (this takes a minute)...")
-        subprocess.run([sys.executable, "-m", "playwright", "install"], check=True)
-        print("Browser setup complete!")
+# Shared helpers live one folder up (src/), append so our local LLM_extraction still wins
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from readiness import build_readiness_script, ReadinessStats
+from browser_pool import BrowserPool
+from fetch_profiles import FetchBlocker, get_fetch_profile
+from startup import ensure_browsers_installed
+from metrics import classify_error
+from retry_policy import RetrySettings, backoff_delay
 
 
 async def main():
@@ -31,20 +26,8 @@ async def main():
         }
     )
     
-    scroll_script = """
-        async function scrollDown() {
-            let totalHeight = 0;
-            let distance = 300; // Scroll 300px at a time
-            
-            while (totalHeight < document.body.scrollHeight) {
-                window.scrollBy(0, distance);
-                totalHeight += distance;
-                // Wait 100ms between scrolls to let the page catch up
-                await new Promise(r => setTimeout(r, 100)); 
-            }
-        }
-        await scrollDown();
-    """
+    # Scrolls and waits only until the page is stable (capped at 10s), instead of fixed sleeps
+    readiness_script = build_readiness_script(quiet_ms=500, deadline_ms=10000)
     
     run_conf = CrawlerRunConfig(
         cache_mode=CacheMode.BYPASS,
@@ -55,11 +38,11 @@ async def main():
         #word_count_threshold=10,
         page_timeout=60000,
         wait_until="domcontentloaded",
-        delay_before_return_html=5.0,
+        delay_before_return_html=0.1,
         
         # 2. CONTENT FIXES
         remove_overlay_elements=True, 
-        js_code=scroll_script,
+        js_code=readiness_script,
         
         extraction_strategy=LLM_extraction.llm_strategy,
         excluded_tags=["style", "noscript", "script", "nav", "footer"],
@@ -67,27 +50,49 @@ async def main():
     )
     
     
-    async with AsyncWebCrawler(config = browser_conf) as crawler:
-        for attempt in range(3):
-            try:
-                result = await crawler.arun(
-                    url="https://www.zillow.com/profile/Matt-Laricy",
-                    config=run_conf
-                )
-                
-                if result.success:
-                    raw_json = result.extracted_content
-                    json_to_csv(raw_json)
+    readiness = ReadinessStats(old_fixed_delay=5.0)
+
+    # Only the HTML matters for the markdown, skip images, video, fonts and trackers
+    blocker = FetchBlocker(get_fetch_profile("text-only"))
+
+    # A failed attempt gets a fresh browser instead of retrying in the same one
+    pool = BrowserPool()
+    retry = RetrySettings()
+    try:
+        for attempt in range(retry.max_attempts):
+            error = None
+            async with pool.lease(browser_conf) as lease:
+                blocker.attach(lease.crawler)
+                try:
+                    result = await lease.crawler.arun(
+                        url="https://www.zillow.com/profile/Matt-Laricy",
+                        config=run_conf
+                    )
+                    lease.pages += 1
+                    blocker.pop(result.url)
                     
-                    break
-                else:
-                    print(f"Attempt {attempt+1} failed: {result.error_message}")
-            
-            except Exception as e:
-                print(f"Crawl crashed on attempt {attempt+1}: {e}")
+                    if result.success:
+                        readiness.record(result.url, result.js_execution_result)
+                        raw_json = result.extracted_content
+                        json_to_csv(raw_json)
+                        
+                        break
+                    else:
+                        lease.mark_bad()
+                        error = result.error_message
+                        print(f"Attempt {attempt+1} failed: {error}")
+                
+                except Exception as e:
+                    lease.mark_bad()
+                    error = str(e)
+                    print(f"Crawl crashed on attempt {attempt+1}: {e}")
 
-            # cooldown
-            await asyncio.sleep(5)
+            if attempt + 1 < retry.max_attempts:
+                # Backs off harder when the site is throttling us
+                await asyncio.sleep(backoff_delay(attempt + 1, classify_error(error), retry))
+    finally:
+        blocker.print_summary()
+        await pool.close()
 
 if __name__ == "__main__":
     ensure_browsers_installed()
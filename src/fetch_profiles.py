@@ -0,0 +1,178 @@
+import time
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional
+from urllib.parse import urlsplit
+
+# Ad, analytics and tracker hosts: never part of the content, blocked in every profile but "full"
+DEFAULT_BLOCKED_DOMAINS = (
+    "doubleclick.net", "googlesyndication.com", "googleadservices.com", "adservice.google.com",
+    "google-analytics.com", "googletagmanager.com", "googletagservices.com",
+    "facebook.net", "connect.facebook.net", "analytics.tiktok.com", "snap.licdn.com", "ads.linkedin.com",
+    "hotjar.com", "clarity.ms", "segment.io", "segment.com", "mixpanel.com", "amplitude.com",
+    "scorecardresearch.com", "quantserve.com", "criteo.com", "criteo.net", "taboola.com", "outbrain.com",
+    "amazon-adsystem.com", "adnxs.com", "rubiconproject.com", "pubmatic.com", "openx.net",
+    "nr-data.net", "intercom.io", "hubspot.com", "hs-analytics.net", "zopim.com", "tawk.to",
+)
+
+# Typical transfer sizes, used for "bytes saved" until this run has seen real ones
+TYPICAL_BYTES = {
+    "image": 60_000,
+    "media": 500_000,
+    "font": 35_000,
+    "stylesheet": 20_000,
+    "script": 30_000,
+    "xhr": 5_000,
+    "fetch": 5_000,
+    "other": 5_000,
+}
+
+
+@dataclass
+class FetchProfile:
+    """
+    What the browser is allowed to download.
+    block_types: Playwright resource types to abort (image, media, font, stylesheet, script...)
+    block_trackers: abort requests to DEFAULT_BLOCKED_DOMAINS (and extra_domains)
+    """
+    name: str
+    block_types: FrozenSet[str] = frozenset()
+    block_trackers: bool = True
+    extra_domains: List[str] = field(default_factory=list)
+
+
+FETCH_PROFILES: Dict[str, FetchProfile] = {
+    # Markdown only needs the DOM: no pixels, no video, no fonts
+    "text-only": FetchProfile("text-only", frozenset({"image", "media", "font"})),
+    # For fields that depend on images being loaded (lazy galleries, srcset picked by JS)
+    "text+images": FetchProfile("text+images", frozenset({"media", "font"})),
+    # Everything, like a normal browser
+    "full": FetchProfile("full", frozenset(), block_trackers=False),
+}
+DEFAULT_FETCH_PROFILE = "text-only"
+
+
+def host_matches(host: str, domains) -> bool:
+    """True if host is one of the domains or a subdomain of one."""
+    host = host.lower()
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+@dataclass
+class PageFetchStats:
+    url: str
+    started: float = field(default_factory=time.perf_counter)
+    requests: int = 0
+    blocked: Dict[str, int] = field(default_factory=dict)
+    bytes_loaded: int = 0
+    bytes_saved: int = 0
+    elapsed_ms: float = 0.0
+
+    @property
+    def blocked_requests(self) -> int:
+        return sum(self.blocked.values())
+
+    @property
+    def render_ms_saved(self) -> float:
+        """
+        Estimate: the share of the page's load time the blocked bytes would have taken,
+        at the throughput the rest of the page loaded with. Parallel downloads make
+        the real number lower, so this is only a ballpark.
+        """
+        total = self.bytes_loaded + self.bytes_saved
+        return round(self.elapsed_ms * self.bytes_saved / total, 1) if total else 0.0
+
+
+class FetchBlocker:
+    """
+    Aborts the requests a FetchProfile doesn't want, per page, and keeps count of
+    what was blocked and what was loaded. Attach it to a crawler for the length of
+    a scrape, take each page's stats with pop(url) when its result comes in.
+    """
+
+    def __init__(self, profile: FetchProfile):
+        self.profile = profile
+        self.domains = tuple(DEFAULT_BLOCKED_DOMAINS) + tuple(profile.extra_domains) if profile.block_trackers else tuple(profile.extra_domains)
+        self._pages: Dict[str, PageFetchStats] = {}
+        # Average real size per resource type seen in this run, better than TYPICAL_BYTES
+        self._seen_bytes: Dict[str, List[int]] = {}
+        self.totals = {"pages": 0, "blocked": 0, "bytes_saved": 0, "bytes_loaded": 0, "render_ms_saved": 0.0}
+
+    @property
+    def active(self) -> bool:
+        return bool(self.profile.block_types or self.domains)
+
+    def attach(self, crawler):
+        crawler.crawler_strategy.set_hook("before_goto", self.before_goto)
+
+    @staticmethod
+    def detach(crawler):
+        crawler.crawler_strategy.set_hook("before_goto", None)
+
+    def estimated_bytes(self, resource_type: str) -> int:
+        seen = self._seen_bytes.get(resource_type)
+        if seen and seen[0]:
+            return seen[1] // seen[0]
+        return TYPICAL_BYTES.get(resource_type, TYPICAL_BYTES["other"])
+
+    def should_block(self, resource_type: str, host: str) -> bool:
+        if resource_type == "document":
+            return False
+        return resource_type in self.profile.block_types or (bool(self.domains) and host_matches(host, self.domains))
+
+    async def before_goto(self, page, context=None, url: str = None, **kwargs):
+        stats = PageFetchStats(url=url)
+        self._pages[url] = stats
+
+        async def handle(route):
+            request = route.request
+            stats.requests += 1
+            if self.should_block(request.resource_type, urlsplit(request.url).hostname or ""):
+                stats.blocked[request.resource_type] = stats.blocked.get(request.resource_type, 0) + 1
+                stats.bytes_saved += self.estimated_bytes(request.resource_type)
+                await route.abort()
+            else:
+                await route.continue_()
+
+        def on_response(response):
+            size = response.headers.get("content-length")
+            if size and size.isdigit():
+                stats.bytes_loaded += int(size)
+                seen = self._seen_bytes.setdefault(response.request.resource_type, [0, 0])
+                seen[0] += 1
+                seen[1] += int(size)
+
+        if self.active:
+            await page.route("**/*", handle)
+        page.on("response", on_response)
+        return page
+
+    def pop(self, url: str) -> Optional[PageFetchStats]:
+        stats = self._pages.pop(url, None)
+        if stats is None:
+            return None
+        stats.elapsed_ms = (time.perf_counter() - stats.started) * 1000
+        self.totals["pages"] += 1
+        self.totals["blocked"] += stats.blocked_requests
+        self.totals["bytes_saved"] += stats.bytes_saved
+        self.totals["bytes_loaded"] += stats.bytes_loaded
+        self.totals["render_ms_saved"] += stats.render_ms_saved
+        return stats
+
+    def print_summary(self):
+        t = self.totals
+        if not t["pages"] or not t["blocked"]:
+            return
+        print(
+            f"Fetch profile {self.profile.name}: {t['blocked']} requests blocked on {t['pages']} pages, "
+            f"~{t['bytes_saved'] / 1e6:.1f} MB saved ({t['bytes_loaded'] / 1e6:.1f} MB loaded), "
+            f"~{t['render_ms_saved'] / t['pages']:.0f} ms saved per page"
+        )
+
+
+def get_fetch_profile(name: str, extra_domains: List[str] = None) -> FetchProfile:
+    if name not in FETCH_PROFILES:
+        raise ValueError(f"Unknown fetch profile '{name}', use one of {', '.join(FETCH_PROFILES)}")
+    profile = FETCH_PROFILES[name]
+    if extra_domains:
+        profile = FetchProfile(profile.name, profile.block_types, profile.block_trackers, list(extra_domains))
+    return profile
@@ -1,58 +1,94 @@
+import startup  # first: starts the startup clock
 import flet as ft
-import pandas as pd
 import json
 import os
+import time
+import asyncio
 import datetime
+import threading
 
-import LLM_extraction 
+# Only light modules here, the crawler stack (LLM_extraction, crawl4ai) loads in the background
+from scheduler import SchedulerSettings
+from markdown_pruning import ChunkSettings
+from llm_batching import BatchSettings
+from template_schemas import TemplateSettings
+from near_duplicates import DedupSettings
+from fetch_profiles import DEFAULT_FETCH_PROFILE, FETCH_PROFILES
+from results_store import ResultsStore
+from job_store import JobStore
+from job_control import JobLimits, ScrapeControl, ScrapeProgress
+from browser_pool import BrowserPool
+from metrics import MetricsRecorder
+from crawl_frontier import CrawlFrontier, DeepCrawlSettings
+from deep_crawler import deep_crawl, frontier_path
+from exporters import EXPORT_FORMATS, BackgroundExporter, export_records, format_for, open_exporter
+
+PAGE_SIZE = 50
 
 def main(page: ft.Page):
-    current_data = []
+    # Results live on disk, the views only render the current page of them
+    store = ResultsStore()
+    # Every scrape is a checkpointed job, so it can be resumed after a crash or restart
+    jobs = JobStore()
+    # Chromium stays up between scrapes, only the first START SCRAPE pays for the launch
+    pool = BrowserPool()
+
+    async def shutdown_browsers(e):
+        await pool.close()
+
+    page.on_close = shutdown_browsers
+    view_state = {"view": "json", "offset": 0, "sort_by": None, "descending": False, "filter_text": "", "filter_column": None}
     
+    def export_target():
+        """(path, format) from the Export settings, a timestamped file in 'output' if no path is set."""
+        fmt = export_format.value or "csv"
+        path = (export_path_input.value or "").strip()
+        if not path:
+            timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+            path = os.path.join("output", f"scrape_{timestamp}.{fmt}")
+        return path, format_for(path, fmt)
+
     def save_file(e):
-        """Saves the current data to the 'output' folder."""
+        """Exports the stored results on a background thread, the UI stays responsive."""
         # 1. Check if we have data
-        # We access the raw data stored in a global variable (we need to create this first)
-        if not current_data: 
+        if not store.count(): 
             save_button.text = "No Data!"
             page.update()
             return
 
-        # 2. Create 'output' folder if missing
-        if not os.path.exists("output"):
-            os.makedirs("output")
+        # 2. Pick the file and format
+        path, fmt = export_target()
+        save_button.text = "Saving..."
+        save_button.disabled = True
+        page.update()
 
-        # 3. Generate Filename with Timestamp
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        
-        try:
-            # 4. Save based on current view mode
-            if "json" in btn_json.bgcolor: # If JSON view is active
-                filename = f"output/scrape_{timestamp}.json"
-                with open(filename, "w", encoding="utf-8") as f:
-                    json.dump(current_data, f, indent=2)
-                
-            else: # Default to CSV for Table/Markdown views
-                filename = f"output/scrape_{timestamp}.csv"
-                df = pd.DataFrame(current_data)
-                df.to_csv(filename, index=False)
-
-            # 5. Visual Feedback
-            save_button.text = "Saved!"
-            save_button.bgcolor = ft.Colors.GREEN_600
+        # 3. Stream rows from the store to the file, one batch at a time
+        def run_export():
+            try:
+                # Own connection, the scrape may still be writing on the main one
+                reader = ResultsStore(store.path)
+                rows = export_records(reader.iter_records(), path, fmt, append=append_checkbox.value, columns=reader.columns)
+                reader.close()
+                print(f"[EXPORT] Wrote {rows} rows to {path}")
+                if clean_checkbox.value:
+                    clean_export(path, fmt)
+
+                # 4. Visual Feedback
+                save_button.text = "Saved!"
+                save_button.bgcolor = ft.Colors.GREEN_600
+            except Exception as ex:
+                save_button.text = "Error Saving"
+                print(f"Save Error: {ex}")
+            save_button.disabled = False
             page.update()
-            
-            # Reset button after 3 seconds
-            import time
+
+            # Reset button after 3 seconds (we're on the export thread, not the UI's)
             time.sleep(3)
             save_button.text = "Save File"
             save_button.bgcolor = ft.Colors.ORANGE_600
             page.update()
 
-        except Exception as ex:
-            save_button.text = "Error Saving"
-            print(f"Save Error: {ex}")
-            page.update()
+        threading.Thread(target=run_export, daemon=True).start()
             
     page.title = "Scraper Dashboard"
     page.theme_mode = ft.ThemeMode.DARK
@@ -129,7 +165,271 @@ def main(page: ft.Page):
         on_change=update_settings
     )
 
+    # Politeness / concurrency (see scheduler.py)
+    defaults = SchedulerSettings()
+
+    max_concurrency_input = ft.TextField(
+        label="Max concurrent pages",
+        value=str(defaults.max_concurrency),
+        text_size=12,
+        border_color=ft.Colors.GREY_700,
+        keyboard_type=ft.KeyboardType.NUMBER
+    )
+
+    domain_concurrency_input = ft.TextField(
+        label="Max pages per domain",
+        value=str(defaults.per_domain_concurrency),
+        text_size=12,
+        border_color=ft.Colors.GREY_700,
+        keyboard_type=ft.KeyboardType.NUMBER
+    )
+
+    domain_rate_input = ft.TextField(
+        label="Requests/sec per domain",
+        value=str(defaults.per_domain_rate),
+        text_size=12,
+        border_color=ft.Colors.GREY_700,
+        keyboard_type=ft.KeyboardType.NUMBER
+    )
+
+    # Time limits (see job_control.py), empty means none
+    url_timeout_input = ft.TextField(
+        label="Seconds per page (load, then extract)",
+        value="",
+        text_size=12,
+        border_color=ft.Colors.GREY_700,
+        keyboard_type=ft.KeyboardType.NUMBER
+    )
+
+    job_timeout_input = ft.TextField(
+        label="Minutes for the whole job",
+        value="",
+        text_size=12,
+        border_color=ft.Colors.GREY_700,
+        keyboard_type=ft.KeyboardType.NUMBER
+    )
+
+    static_first_checkbox = ft.Checkbox(
+        label="Fast HTTP fetch first (browser only if needed)",
+        value=True,
+        label_style=ft.TextStyle(size=12)
+    )
+
+    fetch_profile_dropdown = ft.Dropdown(
+        label="Browser downloads",
+        value=DEFAULT_FETCH_PROFILE,
+        options=[ft.dropdown.Option(name) for name in FETCH_PROFILES],
+        text_size=12,
+        border_color=ft.Colors.GREY_700
+    )
+
+    token_budget_input = ft.TextField(
+        label="LLM token budget per page",
+        value=str(ChunkSettings().token_budget),
+        text_size=12,
+        border_color=ft.Colors.GREY_700,
+        keyboard_type=ft.KeyboardType.NUMBER
+    )
+
+    batch_checkbox = ft.Checkbox(
+        label="Batch small pages into one LLM call",
+        value=False,
+        label_style=ft.TextStyle(size=12)
+    )
+
+    template_checkbox = ft.Checkbox(
+        label="Learn selectors per site template",
+        value=False,
+        label_style=ft.TextStyle(size=12)
+    )
+
+    dedup_checkbox = ft.Checkbox(
+        label="Extract near-duplicate pages only once",
+        value=False,
+        label_style=ft.TextStyle(size=12)
+    )
+
+    # Deep crawl (see crawl_frontier.py)
+    crawl_defaults = DeepCrawlSettings()
+
+    deep_crawl_checkbox = ft.Checkbox(
+        label="Follow links from these pages (deep crawl)",
+        value=False,
+        label_style=ft.TextStyle(size=12)
+    )
+
+    max_pages_input = ft.TextField(
+        label="Max pages",
+        value=str(crawl_defaults.max_pages),
+        text_size=12,
+        border_color=ft.Colors.GREY_700,
+        keyboard_type=ft.KeyboardType.NUMBER
+    )
+
+    max_depth_input = ft.TextField(
+        label="Max link depth",
+        value=str(crawl_defaults.max_depth),
+        text_size=12,
+        border_color=ft.Colors.GREY_700,
+        keyboard_type=ft.KeyboardType.NUMBER
+    )
+
+    # Export
+    export_format = ft.Dropdown(
+        label="Export format",
+        value="csv",
+        options=[ft.dropdown.Option(fmt) for fmt in EXPORT_FORMATS],
+        text_size=12,
+        border_color=ft.Colors.GREY_700
+    )
+
+    export_path_input = ft.TextField(
+        label="Export file (optional)",
+        hint_text="output/leads.csv",
+        text_size=12,
+        border_color=ft.Colors.GREY_700
+    )
+
+    append_checkbox = ft.Checkbox(
+        label="Append if the file exists",
+        value=False,
+        label_style=ft.TextStyle(size=12)
+    )
+
+    live_export_checkbox = ft.Checkbox(
+        label="Write to the file while scraping",
+        value=False,
+        label_style=ft.TextStyle(size=12)
+    )
+
+    clean_checkbox = ft.Checkbox(
+        label="Clean up and merge duplicate records",
+        value=False,
+        label_style=ft.TextStyle(size=12)
+    )
+
+    def clean_export(path, fmt):
+        """Normalizes the exported file and merges duplicates across pages (see record_cleaning.py)."""
+        from record_cleaning import clean_file
+
+        before, after = clean_file(path, fmt)
+        print(f"[EXPORT] Cleaned {path}: {before} -> {after} rows")
+
+    def read_chunk_settings():
+        try:
+            budget = int(token_budget_input.value)
+        except (TypeError, ValueError):
+            budget = 0
+        return ChunkSettings(token_budget=budget) if budget > 0 else ChunkSettings()
+
+    def number(field, cast, default):
+        try:
+            value = cast(field.value)
+            return value if value > 0 else default
+        except (TypeError, ValueError):
+            return default
+
+    def read_scheduler_settings():
+        """Builds SchedulerSettings from the sidebar, falling back to defaults on bad input."""
+
+        return SchedulerSettings(
+            max_concurrency=number(max_concurrency_input, int, defaults.max_concurrency),
+            per_domain_concurrency=number(domain_concurrency_input, int, defaults.per_domain_concurrency),
+            per_domain_rate=number(domain_rate_input, float, defaults.per_domain_rate),
+            per_domain_burst=defaults.per_domain_burst,
+            memory_threshold_percent=defaults.memory_threshold_percent,
+        )
+
+    def read_job_limits():
+        minutes = number(job_timeout_input, float, None)
+        return JobLimits(
+            url_timeout=number(url_timeout_input, float, None),
+            job_timeout=minutes * 60 if minutes else None,
+        )
+
+    def read_crawl_settings():
+        return DeepCrawlSettings(
+            max_pages=number(max_pages_input, int, crawl_defaults.max_pages),
+            max_depth=number(max_depth_input, int, crawl_defaults.max_depth),
+        )
+
     # --- 3. SCRAPE LOGIC ---
+    def sort_by_column(column):
+        if view_state["sort_by"] == column:
+            view_state["descending"] = not view_state["descending"]
+        else:
+            view_state["sort_by"] = column
+            view_state["descending"] = False
+        view_state["offset"] = 0
+        render_results()
+
+    def apply_filter(e):
+        """Filter text matches any column, "column: text" matches one column."""
+        text = (filter_input.value or "").strip()
+        column = None
+        if ":" in text:
+            name, value = text.split(":", 1)
+            if name.strip() in store.columns:
+                column, text = name.strip(), value.strip()
+        view_state["filter_text"] = text
+        view_state["filter_column"] = column
+        view_state["offset"] = 0
+        render_results()
+
+    def change_page(step):
+        total = store.count(view_state["filter_text"], view_state["filter_column"])
+        offset = view_state["offset"] + step * PAGE_SIZE
+        if 0 <= offset < max(total, 1):
+            view_state["offset"] = offset
+            render_results()
+
+    def update_pager(total, shown):
+        first = view_state["offset"] + 1 if shown else 0
+        page_label.value = f"Rows {first}-{view_state['offset'] + shown} of {total}"
+        prev_button.disabled = view_state["offset"] == 0
+        next_button.disabled = view_state["offset"] + PAGE_SIZE >= total
+
+    def render_results(update=True):
+        """Renders the visible page into the active view only, the others are built when opened."""
+        total = store.count(view_state["filter_text"], view_state["filter_column"])
+        if view_state["offset"] >= total:
+            view_state["offset"] = max(0, (total - 1) // PAGE_SIZE * PAGE_SIZE)
+        rows = store.page(
+            view_state["offset"],
+            PAGE_SIZE,
+            view_state["sort_by"],
+            view_state["descending"],
+            view_state["filter_text"],
+            view_state["filter_column"],
+        )
+        update_pager(total, len(rows))
+
+        if view_state["view"] == "csv":
+            columns = store.columns
+            if columns:
+                view_csv.columns = [
+                    ft.DataColumn(
+                        ft.Text(str(col).upper(), weight="bold", color=ft.Colors.BLUE_200),
+                        on_sort=lambda e, col=col: sort_by_column(col),
+                    )
+                    for col in columns
+                ]
+                view_csv.rows = [
+                    ft.DataRow(cells=[ft.DataCell(ft.Text(str(r.get(col, "")), size=12, selectable=True)) for col in columns])
+                    for r in rows
+                ]
+                sort_by = view_state["sort_by"]
+                view_csv.sort_column_index = columns.index(sort_by) if sort_by in columns else None
+                view_csv.sort_ascending = not view_state["descending"]
+        elif view_state["view"] == "json" and rows:
+            view_json.value = json.dumps(rows, indent=2)
+        elif view_state["view"] == "markdown" and rows:
+            import pandas as pd  # loaded by the warm-up, only this view needs it
+            view_markdown.value = pd.DataFrame(rows).to_markdown(index=False)
+
+        if update:
+            page.update()
+
     async def on_click_scrape(e):
         # Validation
         if not url_input.value:
@@ -152,53 +452,148 @@ def main(page: ft.Page):
             targets = [u.strip() for u in url_input.value.split('\n') if u.strip()]
 
         fields = [f.strip() for f in data_tags_input.value.split(',') if f.strip()]
-        
+
+        job = jobs.create_job(targets, fields, model_input.value)
+        await run_job(job, job.todo_urls(), deep=deep_crawl_checkbox.value)
+
+    async def on_click_resume(e, retry_failed=False):
+        """Picks up the last unfinished job, skipping URLs that were already extracted."""
+        if not api_key_field.value:
+            api_key_field.error_text = "API Key Required!"
+            api_key_field.update()
+            return
+
+        job = jobs.latest_unfinished()
+        if job is None:
+            progress_text.value = "No unfinished job to resume."
+            page.update()
+            return
+
+        targets = job.retry_failures() if retry_failed else job.todo_urls()
+        if not targets:
+            progress_text.value = f"Job {job.id}: nothing left to resume, {job.counts()['failed']} failed URLs to retry."
+            page.update()
+            return
+
+        data_tags_input.value = ", ".join(job.fields)
+        model_input.value = job.model_id
+        # A deep crawl picks up its queue again, retries only rerun the failed pages
+        deep = not retry_failed and os.path.exists(frontier_path(job.id))
+        await run_job(job, targets, deep=deep)
+
+    async def run_job(job, targets, deep=False):
+        fields = job.fields
+        print(f"Job {job.id}: {len(targets)} {'start ' if deep else ''}URLs to scrape")
+
         # Show Loading
         scrape_button.disabled = True
+        resume_button.disabled = True
+        retry_button.disabled = True
+        stop_button.disabled = False
         scrape_button.content = ft.Row([ft.ProgressRing(width=16, height=16), ft.Text(" SCRAPING...")])
         page.update()
 
+        # Reset the result views, rows get added as each URL finishes
+        store.clear()
+        view_state.update(offset=0, sort_by=None, descending=False, filter_text="", filter_column=None)
+        filter_input.value = ""
+        page_label.value = ""
+        view_csv.columns = [ft.DataColumn(ft.Text("Status"))]
+        view_csv.rows = [ft.DataRow(cells=[ft.DataCell(ft.Text("Waiting for first result..."))])]
+        view_json.value = "Waiting for first result..."
+        view_markdown.value = "Run a scrape to see results here..."
+        progress_text.value = f"Done: 0 | Failed: 0 | Pending: {len(targets)}"
+        set_view("json")
+
+        # Rows the job already extracted before it was interrupted
+        restored = []
+        for record in job.iter_records():
+            restored.append(record)
+            if len(restored) >= 1000:
+                store.add(restored)
+                restored = []
+        store.add(restored)
+        if store.count():
+            set_view("csv")
+
+        # Usually loaded by now, the first scrape right after launch waits for the warm-up
+        LLM_extraction = await asyncio.to_thread(startup.crawler_stack)
+
+        # Per-URL timings/tokens go to output/metrics.jsonl and the stage panel
+        metrics = MetricsRecorder(provider=LLM_extraction.resolve_provider(job.model_id))
+        metrics_text.value = ""
+        metrics_panel.visible = False
+
+        # Optionally write rows to the export file as they come in
+        live_export = None
+        if live_export_checkbox.value:
+            path, fmt = export_target()
+            try:
+                live_export = BackgroundExporter(open_exporter(path, fmt, append=append_checkbox.value))
+                print(f"[EXPORT] Writing results to {path} while scraping")
+            except Exception as ex:
+                print(f"Export Error: {ex}")
+
+        options = dict(
+            scheduler_settings=read_scheduler_settings(),
+            static_first=static_first_checkbox.value,
+            chunk_settings=read_chunk_settings(),
+            batch_settings=BatchSettings() if batch_checkbox.value else None,
+            template_settings=TemplateSettings() if template_checkbox.value else None,
+            dedup_settings=DedupSettings() if dedup_checkbox.value else None,
+            fetch_profile=fetch_profile_dropdown.value,
+            job=job,
+            pool=pool,
+            metrics=metrics,
+            control=ScrapeControl(read_job_limits())
+        )
+        control = running["control"] = options["control"]
+        progress = ScrapeProgress()
+        progress.update(0, 0, len(targets))
+
+        async def tick():
+            # Elapsed time and ETA keep moving while a slow page holds up the next event
+            while True:
+                await asyncio.sleep(1)
+                progress_text.value = progress.line()
+                progress_text.update()
+
+        ticker = asyncio.create_task(tick())
+        frontier = None
+        if deep:
+            # The crawl queue is kept per job, so Resume continues the crawl
+            frontier = CrawlFrontier(frontier_path(job.id), read_crawl_settings())
+            events = deep_crawl(targets, fields, job.model_id, api_key_field.value, frontier, **options)
+        else:
+            events = LLM_extraction.stream_scrape(targets, fields, job.model_id, api_key_field.value, **options)
+
         try:
-            # CALL BACKEND
-            data = await LLM_extraction.run_scrape(
-                targets, 
-                fields, 
-                model_input.value, 
-                api_key_field.value
-            )
-            
-            current_data.clear()
-            if data:
-                current_data.extend(data)
+            # CALL BACKEND (streams one event per finished URL)
+            async for event in events:
+                progress.update(event["done"], event["failed"], event["pending"])
+                progress_text.value = progress.line()
+                if (event["done"] + event["failed"]) % 10 == 1:
+                    show_metrics(metrics)
+
+                records = [r for r in event["records"] if isinstance(r, dict)]
+                if records:
+                    before = store.count()
+                    new_columns = store.add(records)
+                    if live_export is not None:
+                        live_export.submit(records)
+                    if before == 0:
+                        # First rows are in, switch to the table
+                        set_view("csv")
+                    elif new_columns or view_state["sort_by"] or view_state["filter_text"] or before < view_state["offset"] + PAGE_SIZE:
+                        # The new rows may land on the visible page
+                        render_results(update=False)
+                    else:
+                        update_pager(before + len(records), PAGE_SIZE)
+                page.update()
 
             # Display Results
-            if data:
-                # 1. Update JSON View
-                view_json.value = json.dumps(data, indent=2)
-                
-                # 2. Update CSV/Table View
-                df = pd.DataFrame(data)
-                
-                # [SAFETY CHECK] Only build table if we actually have columns
-                if not df.empty and len(df.columns) > 0:
-                    # A. Create Columns
-                    view_csv.columns = [
-                        ft.DataColumn(ft.Text(str(col).upper(), weight="bold", color=ft.Colors.BLUE_200)) 
-                        for col in df.columns
-                    ]
-                    
-                    # B. Create Rows
-                    view_csv.rows = []
-                    for index, row in df.iterrows():
-                        cells = [ft.DataCell(ft.Text(str(row[col]), size=12, selectable=True)) for col in df.columns]
-                        view_csv.rows.append(ft.DataRow(cells=cells))
-                    
-                    # Update Markdown View
-                    view_markdown.value = df.to_markdown(index=False)
-                    
-                    # Switch to Table View
-                    set_view("csv")
-                else:
+            if store.count():
+                if not store.columns:
                     view_json.value = "Data found, but it was empty or unstructured."
                     set_view("json")
             else:
@@ -208,12 +603,48 @@ def main(page: ft.Page):
         except Exception as ex:
             view_json.value = f"Error: {str(ex)}"
             set_view("json")
+        finally:
+            ticker.cancel()
+            running["control"] = None
+
+        progress_text.value = progress.line()
+        if control.stopped:
+            # What finished is kept (and exported), the rest stays in the job for Resume
+            progress_text.value += f" | Stopped: {control.reason}, use Resume last job to finish"
+
+        if live_export is not None:
+            try:
+                rows = await asyncio.to_thread(live_export.close)
+                print(f"[EXPORT] Wrote {rows} rows to {live_export.exporter.path}")
+                if clean_checkbox.value:
+                    # Duplicates span pages, so the whole file is cleaned once the scrape is done
+                    await asyncio.to_thread(clean_export, live_export.exporter.path, format_for(live_export.exporter.path))
+            except Exception as ex:
+                print(f"Export Error: {ex}")
+
+        show_metrics(metrics)
+        metrics.close()
+        if frontier is not None:
+            frontier.close()
 
         # Reset Button
+        counts = job.counts()
+        if counts["failed"]:
+            progress_text.value += f" | Job {job.id}: {counts['failed']} failed, use Retry failed to run them again"
+        resume_button.disabled = False
+        retry_button.disabled = False
+        stop_button.disabled = True
+        stop_button.content = "Stop"
         scrape_button.disabled = False
         scrape_button.content = ft.Text("START SCRAPE")
         page.update()
 
+    def show_metrics(metrics):
+        lines = metrics.summary_lines()
+        if lines:
+            metrics_text.value = "\n".join(lines)
+            metrics_panel.visible = True
+
     scrape_button = ft.ElevatedButton(
         content=ft.Text("START SCRAPE"),
         icon="rocket_launch",
@@ -223,6 +654,25 @@ def main(page: ft.Page):
         on_click=on_click_scrape
     )
 
+    resume_button = ft.TextButton("Resume last job", icon="restore", on_click=on_click_resume)
+    async def on_click_retry(e):
+        await on_click_resume(e, retry_failed=True)
+
+    retry_button = ft.TextButton("Retry failed", icon="replay", on_click=on_click_retry)
+
+    # The scrape that's running, for the Stop button
+    running = {"control": None}
+
+    def on_click_stop(e):
+        """Cuts the scrape short: finished rows are kept, the rest can be resumed."""
+        if running["control"] is not None:
+            running["control"].cancel("stopped from the app")
+        stop_button.disabled = True
+        stop_button.content = "Stopping..."
+        page.update()
+
+    stop_button = ft.TextButton("Stop", icon="stop_circle", disabled=True, on_click=on_click_stop)
+
     # Layout
     sidebar = ft.Container(
         content=ft.Column(
@@ -237,10 +687,36 @@ def main(page: ft.Page):
                 data_tags_input,
                 ft.Divider(height=15, color=ft.Colors.TRANSPARENT),
                 scrape_button,
+                ft.Row([stop_button, resume_button, retry_button], spacing=0, wrap=True),
                 ft.Divider(height=20, color=ft.Colors.GREY_800),
                 ft.Text("AI Configuration", size=14, weight=ft.FontWeight.BOLD, color=ft.Colors.WHITE),
                 model_input,
-                api_key_field
+                api_key_field,
+                token_budget_input,
+                batch_checkbox,
+                template_checkbox,
+                dedup_checkbox,
+                ft.Divider(height=20, color=ft.Colors.GREY_800),
+                ft.Text("Politeness", size=14, weight=ft.FontWeight.BOLD, color=ft.Colors.WHITE),
+                max_concurrency_input,
+                domain_concurrency_input,
+                domain_rate_input,
+                url_timeout_input,
+                job_timeout_input,
+                static_first_checkbox,
+                fetch_profile_dropdown,
+                ft.Divider(height=20, color=ft.Colors.GREY_800),
+                ft.Text("Deep Crawl", size=14, weight=ft.FontWeight.BOLD, color=ft.Colors.WHITE),
+                deep_crawl_checkbox,
+                max_pages_input,
+                max_depth_input,
+                ft.Divider(height=20, color=ft.Colors.GREY_800),
+                ft.Text("Export", size=14, weight=ft.FontWeight.BOLD, color=ft.Colors.WHITE),
+                export_format,
+                export_path_input,
+                append_checkbox,
+                live_export_checkbox,
+                clean_checkbox
             ],
             scroll=ft.ScrollMode.AUTO
         ),
@@ -252,6 +728,7 @@ def main(page: ft.Page):
     )
     
     # Results Area
+    progress_text = ft.Text("", size=12, color=ft.Colors.GREY_400)
     view_markdown = ft.Markdown("Run a scrape to see results here...")
     view_json = ft.Text("Waiting for data...", font_family="Consolas", color=ft.Colors.GREEN_400, selectable=True)
     view_csv = ft.DataTable(
@@ -274,6 +751,7 @@ def main(page: ft.Page):
     )
 
     def set_view(view_type):
+        view_state["view"] = view_type
         if view_type == "markdown": content_area.content = ft.Column([view_markdown], scroll=ft.ScrollMode.AUTO)
         elif view_type == "json": content_area.content = ft.Column([view_json], scroll=ft.ScrollMode.AUTO)
         elif view_type == "csv": 
@@ -290,6 +768,8 @@ def main(page: ft.Page):
         btn_json.bgcolor = ft.Colors.BLUE_600 if view_type == "json" else ft.Colors.GREY_800
         btn_csv.bgcolor = ft.Colors.BLUE_600 if view_type == "csv" else ft.Colors.GREY_800
         
+        if store.count():
+            render_results(update=False)
         page.update()
 
     btn_markdown = ft.ElevatedButton("Markdown", on_click=lambda _: set_view("markdown"), bgcolor=ft.Colors.GREY_800, color=ft.Colors.WHITE, style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=0)))
@@ -309,11 +789,40 @@ def main(page: ft.Page):
         spacing=0
     )
 
+    # Paging / filtering, both run against the results store
+    page_label = ft.Text("", size=12, color=ft.Colors.GREY_400)
+    prev_button = ft.IconButton(icon="chevron_left", tooltip="Previous page", disabled=True, on_click=lambda _: change_page(-1))
+    next_button = ft.IconButton(icon="chevron_right", tooltip="Next page", disabled=True, on_click=lambda _: change_page(1))
+    filter_input = ft.TextField(
+        label="Filter rows",
+        hint_text="text, or column: text",
+        text_size=12,
+        width=260,
+        border_color=ft.Colors.GREY_700,
+        on_submit=apply_filter
+    )
+    pager_row = ft.Row([prev_button, page_label, next_button, filter_input], spacing=10)
+
+    # Where the time goes, per stage (see metrics.py)
+    metrics_text = ft.Text("", size=11, font_family="Consolas", color=ft.Colors.GREY_300, selectable=True)
+    metrics_panel = ft.Container(
+        content=ft.Column([
+            ft.Text("Stage timings (p50 / p95)", size=12, weight=ft.FontWeight.BOLD, color=ft.Colors.WHITE),
+            metrics_text
+        ], spacing=4),
+        padding=10,
+        border=ft.border.all(1, ft.Colors.GREY_800),
+        visible=False
+    )
+
     main_content = ft.Container(
         content=ft.Column([
             ft.Text("Results Dashboard", size=30, weight=ft.FontWeight.W_100),
             ft.Divider(color=ft.Colors.TRANSPARENT, height=10),
             toggle_row,
+            pager_row,
+            progress_text,
+            metrics_panel,
             content_area
         ]),
         expand=True,
@@ -324,5 +833,9 @@ def main(page: ft.Page):
 
     page.add(ft.Row([sidebar, main_content], expand=True, spacing=0))
 
+    # The window is usable now, load crawl4ai/Playwright/litellm (and check the browsers) meanwhile
+    startup.PROFILE.mark("window ready")
+    startup.warm_up(startup.CRAWLER_MODULES + ("pandas",))
+
 if __name__ == "__main__":
     ft.app(target=main)
\ No newline at end of file
@@ -0,0 +1,174 @@
+import time
+import asyncio
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Optional
+
+# Errors that start with this are final: the URL used up its time budget, retrying won't help
+DEADLINE_PREFIX = "Deadline"
+# Seconds of finished URLs the throughput is measured over
+RATE_WINDOW = 60.0
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+@dataclass
+class JobLimits:
+    """
+    url_timeout: seconds a page may take to load, and again to be extracted (LLM calls included).
+        Pages over it fail with a Deadline error instead of holding up the batch.
+    job_timeout: seconds for the whole scrape, after that it stops like a cancel does.
+    None means no limit.
+    """
+    url_timeout: Optional[float] = None
+    job_timeout: Optional[float] = None
+
+
+class ScrapeControl:
+    """
+    Stop button for a running scrape, shared by whoever starts it and stream_scrape.
+    cancel() can be called from any thread (UI handlers, signal handlers). The scrape
+    stops taking new pages, cancels the pages and LLM calls in flight, gives the
+    browser back and ends its stream; everything yielded until then is kept.
+    With a job, the URLs it didn't get to stay pending, so the job can be resumed.
+    """
+
+    def __init__(self, limits: JobLimits = None):
+        self.limits = limits or JobLimits()
+        self.reason: Optional[str] = None
+        self.started: Optional[float] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._event: Optional[asyncio.Event] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Called by stream_scrape. The job clock starts at the first call, later chunks share it."""
+        with self._lock:
+            if self.started is None:
+                self.started = time.monotonic()
+            self._loop = asyncio.get_running_loop()
+            self._event = asyncio.Event()
+            if self.reason is not None:
+                self._event.set()
+
+    @property
+    def deadline(self) -> Optional[float]:
+        if self.started is None or self.limits.job_timeout is None:
+            return None
+        return self.started + self.limits.job_timeout
+
+    def check_deadline(self):
+        if self.reason is None and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel(f"job time limit of {self.limits.job_timeout:g}s reached")
+
+    @property
+    def stopped(self) -> bool:
+        self.check_deadline()
+        return self.reason is not None
+
+    def cancel(self, reason: str = "cancelled"):
+        with self._lock:
+            if self.reason is not None:
+                return
+            self.reason = reason
+            if self._loop is not None and not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(self._event.set)
+
+    async def race(self, awaitable: Awaitable):
+        """
+        Awaits `awaitable` unless the scrape is stopped first (cancel or job deadline).
+        Returns (True, result), or (False, None) with the awaitable cancelled.
+        """
+        task = asyncio.ensure_future(awaitable)
+        if self.stopped:
+            task.cancel()
+            return False, None
+        stop = asyncio.ensure_future(self._event.wait())
+        timeout = None if self.deadline is None else max(self.deadline - time.monotonic(), 0)
+        try:
+            await asyncio.wait({task, stop}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stop.cancel()
+        if task.done():
+            return True, task.result()
+        task.cancel()
+        # The deadline may be what woke us
+        self.check_deadline()
+        return False, None
+
+    async def within_url_budget(self, awaitable: Awaitable, what: str):
+        """Awaits `awaitable` with the per-URL budget, raising DeadlineExceeded past it."""
+        if self.limits.url_timeout is None:
+            return await awaitable
+        try:
+            return await asyncio.wait_for(awaitable, self.limits.url_timeout)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"{DEADLINE_PREFIX}: {what} took over {self.limits.url_timeout:g}s") from None
+
+
+class ScrapeProgress:
+    """
+    Throughput and ETA from the done/failed/pending counts of a scrape (the ones in
+    stream_scrape events, or totals across several scrapes).
+    The rate is over the last RATE_WINDOW seconds, so it follows the scrape as it speeds up
+    or slows down (a slow tail) rather than averaging over the whole run.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.done = 0
+        self.failed = 0
+        self.pending: Optional[int] = 0
+        self._finished = deque()
+
+    def update(self, done: int, failed: int, pending: Optional[int]):
+        """pending is None when the total isn't known (URLs streamed from stdin)."""
+        now = time.monotonic()
+        for _ in range(max(done + failed - self.done - self.failed, 0)):
+            self._finished.append(now)
+        self.done, self.failed, self.pending = done, failed, pending
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self) -> float:
+        """URLs finished per second."""
+        now = time.monotonic()
+        while self._finished and now - self._finished[0] > RATE_WINDOW:
+            self._finished.popleft()
+        if not self._finished:
+            return 0.0
+        return len(self._finished) / max(min(self.elapsed, RATE_WINDOW), 1.0)
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Seconds left at the current rate, None if unknown."""
+        if self.pending is None:
+            return None
+        if not self.pending:
+            return 0.0
+        rate = self.rate
+        return self.pending / rate if rate else None
+
+    def line(self) -> str:
+        eta = self.eta
+        eta_text = "ETA --" if eta is None else f"ETA {format_duration(eta)}"
+        pending = "?" if self.pending is None else self.pending
+        return (
+            f"Done: {self.done} | Failed: {self.failed} | Pending: {pending} | "
+            f"{self.rate * 60:.1f} URLs/min | {eta_text} | {format_duration(self.elapsed)} elapsed"
+        )
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
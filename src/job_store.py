@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+from typing import Dict, Iterable, Iterator, List, Optional
+
+DEFAULT_JOBS_PATH = os.path.join("cache", "jobs.db")
+
+# pending -> fetched -> extracted, or -> failed at any step
+URL_STATES = ("pending", "fetched", "extracted", "failed")
+
+
+class ScrapeJob:
+    """
+    One scrape and the state of each of its URLs.
+    Every state change is committed right away, so a crash loses at most the URLs in flight.
+    """
+
+    def __init__(self, store: "JobStore", job_id: str, fields: List[str], model_id: str, created_at: float):
+        self.store = store
+        self.id = job_id
+        self.fields = fields
+        self.model_id = model_id
+        self.created_at = created_at
+
+    def _set_state(self, url: str, state: str, records: List[dict] = None, error: str = None):
+        self.store._conn.execute(
+            "UPDATE job_urls SET state = ?, records = COALESCE(?, records), error = ?, updated_at = ? WHERE job_id = ? AND url = ?",
+            (
+                state,
+                json.dumps(records, ensure_ascii=False, default=str) if records is not None else None,
+                error,
+                time.time(),
+                self.id,
+                url,
+            ),
+        )
+        self.store._conn.commit()
+
+    def mark_fetched(self, url: str):
+        self._set_state(url, "fetched")
+
+    def mark_extracted(self, url: str, records: List[dict]):
+        self._set_state(url, "extracted", records)
+
+    def mark_failed(self, url: str, error: str):
+        self._set_state(url, "failed", error=error)
+
+    def add_urls(self, urls: Iterable[str]):
+        """Appends URLs found while the job runs (deep crawls). Ones already in the job are kept as they are."""
+        start = self.store._conn.execute(
+            "SELECT COALESCE(MAX(position), -1) + 1 FROM job_urls WHERE job_id = ?", (self.id,)
+        ).fetchone()[0]
+        now = time.time()
+        self.store._conn.executemany(
+            "INSERT OR IGNORE INTO job_urls (job_id, position, url, updated_at) VALUES (?, ?, ?, ?)",
+            [(self.id, start + i, url, now) for i, url in enumerate(urls)],
+        )
+        self.store._conn.commit()
+
+    def counts(self) -> Dict[str, int]:
+        rows = self.store._conn.execute(
+            "SELECT state, COUNT(*) FROM job_urls WHERE job_id = ? GROUP BY state", (self.id,)
+        ).fetchall()
+        counts = {state: 0 for state in URL_STATES}
+        counts.update(dict(rows))
+        return counts
+
+    def urls(self, states: Iterable[str]) -> List[str]:
+        states = list(states)
+        marks = ", ".join("?" for _ in states)
+        rows = self.store._conn.execute(
+            f"SELECT url FROM job_urls WHERE job_id = ? AND state IN ({marks}) ORDER BY position",
+            [self.id] + states,
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def todo_urls(self, include_failed: bool = False) -> List[str]:
+        """
+        URLs a resume still has to scrape. 'fetched' ones are included: the
+        crawl finished but the extraction didn't (the extraction cache makes
+        re-running them cheap when the LLM call did go through).
+        """
+        states = ["pending", "fetched"] + (["failed"] if include_failed else [])
+        return self.urls(states)
+
+    def retry_failures(self) -> List[str]:
+        """Puts failed URLs back to pending and returns them."""
+        urls = self.urls(["failed"])
+        self.store._conn.execute(
+            "UPDATE job_urls SET state = 'pending', error = NULL, updated_at = ? WHERE job_id = ? AND state = 'failed'",
+            (time.time(), self.id),
+        )
+        self.store._conn.commit()
+        return urls
+
+    def iter_records(self) -> Iterator[dict]:
+        """Records of the extracted URLs, in the job's URL order."""
+        cursor = self.store._conn.execute(
+            "SELECT records FROM job_urls WHERE job_id = ? AND state = 'extracted' ORDER BY position", (self.id,)
+        )
+        for (records,) in cursor:
+            yield from json.loads(records or "[]")
+
+    def is_finished(self) -> bool:
+        counts = self.counts()
+        return counts["pending"] == 0 and counts["fetched"] == 0
+
+
+class JobStore:
+    """Scrape jobs and per-URL progress in SQLite, so an interrupted job can be resumed."""
+
+    def __init__(self, path: str = DEFAULT_JOBS_PATH):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                fields TEXT NOT NULL,
+                model TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS job_urls (
+                job_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                records TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (job_id, url)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_job_state ON job_urls(job_id, state, position)")
+        self._conn.commit()
+
+    def create_job(self, urls: Iterable[str], fields: List[str], model_id: str, job_id: str = None) -> ScrapeJob:
+        """Registers a job. `urls` can be any iterable, it's inserted in batches. Duplicate URLs are kept once."""
+        job_id = job_id or time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        now = time.time()
+        self._conn.execute(
+            "INSERT INTO jobs (id, fields, model, created_at) VALUES (?, ?, ?, ?)",
+            (job_id, json.dumps(fields), model_id, now),
+        )
+
+        batch = []
+        for position, url in enumerate(urls):
+            batch.append((job_id, position, url, now))
+            if len(batch) >= 1000:
+                self._conn.executemany("INSERT OR IGNORE INTO job_urls (job_id, position, url, updated_at) VALUES (?, ?, ?, ?)", batch)
+                batch = []
+        self._conn.executemany("INSERT OR IGNORE INTO job_urls (job_id, position, url, updated_at) VALUES (?, ?, ?, ?)", batch)
+        self._conn.commit()
+        return ScrapeJob(self, job_id, fields, model_id, now)
+
+    def get_job(self, job_id: str) -> Optional[ScrapeJob]:
+        row = self._conn.execute("SELECT id, fields, model, created_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return ScrapeJob(self, row[0], json.loads(row[1]), row[2], row[3])
+
+    def latest_unfinished(self) -> Optional[ScrapeJob]:
+        """Most recent job that still has pending, fetched or failed URLs."""
+        row = self._conn.execute(
+            """
+            SELECT jobs.id FROM jobs
+            WHERE EXISTS (SELECT 1 FROM job_urls WHERE job_id = jobs.id AND state != 'extracted')
+            ORDER BY created_at DESC LIMIT 1
+            """
+        ).fetchone()
+        return self.get_job(row[0]) if row else None
+
+    def list_jobs(self) -> List[dict]:
+        jobs = []
+        for (job_id,) in self._conn.execute("SELECT id FROM jobs ORDER BY created_at DESC").fetchall():
+            job = self.get_job(job_id)
+            jobs.append({"id": job.id, "fields": job.fields, "model": job.model_id, "created_at": job.created_at, **job.counts()})
+        return jobs
+
+    def delete_job(self, job_id: str):
+        self._conn.execute("DELETE FROM job_urls WHERE job_id = ?", (job_id,))
+        self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
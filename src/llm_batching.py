@@ -0,0 +1,196 @@
+import json
+import time
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from markdown_pruning import estimate_tokens
+from structured_output import read_json_reply, validate_records
+from metrics import current_metrics
+
+BATCH_PROMPT = """You are extracting structured data from several web pages at once.
+{instruction}
+
+Every record must follow this JSON schema:
+{schema}
+
+Each page is wrapped in <page id="N" url="..."> ... </page>. Treat every page on its own,
+never mix data between pages.
+
+{pages}
+
+Return ONLY a JSON object. Its keys are the page ids as strings ("1", "2", ...) and each value
+is a list of records found on that page. Include every page id, use [] if a page has nothing."""
+
+
+@dataclass
+class BatchSettings:
+    """
+    Packs several small pages into one LLM request.
+    Only pages under small_page_tokens are batched, a batch is sent once it reaches
+    token_budget / max_pages, or after linger_seconds with whatever has arrived.
+    """
+    token_budget: int = 8000
+    max_pages: int = 10
+    small_page_tokens: int = 1500
+    linger_seconds: float = 0.5
+
+
+class PageBatcher:
+    """
+    Collects pages from concurrent extract calls and sends them to the LLM together.
+    submit() resolves to that page's records, or None if its part of the batch
+    was missing or malformed (the caller then retries the page on its own).
+    With the schema's pydantic model, records are validated like single-page ones
+    (see structured_output.validate_records), so they come out the same shape.
+    """
+
+    def __init__(self, llm_config, schema: dict, instruction: str, settings: BatchSettings = None, model=None):
+        self.llm_config = llm_config
+        self.schema = schema
+        self.instruction = instruction
+        self.settings = settings or BatchSettings()
+        self.model = model
+        self._pending: List[tuple] = []
+        self._pending_tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight = set()
+        # Keyed by the page's future, the same URL can be in two batches at once
+        self._usage: Dict[asyncio.Future, tuple] = {}
+        self.batches_sent = 0
+        self.pages_sent = 0
+
+    def accepts(self, markdown: str) -> bool:
+        return estimate_tokens(markdown) <= self.settings.small_page_tokens
+
+    async def submit(self, url: str, markdown: str) -> Optional[List[dict]]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        tokens = estimate_tokens(markdown)
+
+        # Flush first if this page wouldn't fit in the current batch
+        if self._pending and self._pending_tokens + tokens > self.settings.token_budget:
+            self._flush()
+
+        self._pending.append((url, markdown, future))
+        self._pending_tokens += tokens
+
+        if len(self._pending) >= self.settings.max_pages or self._pending_tokens >= self.settings.token_budget:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.settings.linger_seconds, self._flush)
+
+        records = await future
+
+        # The batch call ran outside this page's task, hand it its share of the cost
+        share = self._usage.pop(future, None)
+        metrics = current_metrics()
+        if metrics is not None and share is not None:
+            prompt_tokens, completion_tokens, llm_ms, parse_ms = share
+            metrics.add_llm(prompt_tokens, completion_tokens)
+            metrics.add_stage("llm", llm_ms)
+            metrics.add_stage("parse", parse_ms)
+            metrics.source = "batch"
+        return records
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        task = asyncio.ensure_future(self._send(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    def cancel(self):
+        """Drops the pages waiting for a batch and cancels the batch calls in flight."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for _, _, future in self._pending:
+            future.cancel()
+        self._pending, self._pending_tokens = [], 0
+        for task in list(self._inflight):
+            task.cancel()
+
+    def build_prompt(self, batch: List[tuple]) -> str:
+        pages = []
+        for i, (url, markdown, _) in enumerate(batch, start=1):
+            body = markdown.replace("</page", "< /page")
+            pages.append(f'<page id="{i}" url="{url}">\n{body}\n</page>')
+        return BATCH_PROMPT.format(
+            instruction=self.instruction or "",
+            schema=json.dumps(self.schema, indent=2),
+            pages="\n\n".join(pages),
+        )
+
+    async def _send(self, batch: List[tuple]):
+        self.batches_sent += 1
+        self.pages_sent += len(batch)
+        print(f"[BATCH] 1 LLM call for {len(batch)} pages")
+
+        # Loaded on first use, importing the settings shouldn't pull in crawl4ai and litellm
+        from crawl4ai.utils import aperform_completion_with_backoff
+
+        start = time.perf_counter()
+        llm_ms = parse_ms = 0.0
+        try:
+            response = await aperform_completion_with_backoff(
+                self.llm_config.provider,
+                self.build_prompt(batch),
+                self.llm_config.api_token,
+                base_url=self.llm_config.base_url,
+            )
+            llm_ms = (time.perf_counter() - start) * 1000
+            by_page = parse_batch_response(response.choices[0].message.content)
+            parse_ms = (time.perf_counter() - start) * 1000 - llm_ms
+
+            usage = getattr(response, "usage", None)
+            n = len(batch)
+            for _, _, future in batch:
+                if future.done():
+                    # Cancelled, nobody would collect it
+                    continue
+                self._usage[future] = (
+                    (getattr(usage, "prompt_tokens", 0) or 0) // n,
+                    (getattr(usage, "completion_tokens", 0) or 0) // n,
+                    llm_ms / n,
+                    parse_ms / n,
+                )
+        except Exception as e:
+            print(f"[BATCH] Batch failed, retrying pages one by one: {e}")
+            by_page = {}
+
+        fields = list(self.schema.get("properties", {}))
+        for i, (url, _, future) in enumerate(batch, start=1):
+            if future.done():
+                continue
+            records = by_page.get(str(i))
+            if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+                future.set_result(None)
+                continue
+            if self.model is not None:
+                records = validate_records(records, self.model, fields)
+            for record in records:
+                record["URL"] = url
+                record.setdefault("error", False)
+            future.set_result(records)
+
+
+def parse_batch_response(content: str) -> Dict[str, list]:
+    """
+    Parses the {"1": [...], "2": [...]} reply, tolerating code fences, chatter around it
+    and a cut-off reply (the pages that made it in are kept, the others retried alone).
+    """
+    data, _, last_cut = read_json_reply(content)
+    if not isinstance(data, dict):
+        return {}
+    if last_cut and data:
+        # The reply ended inside the last page, its records may be missing some
+        data.pop(list(data)[-1])
+
+    # A single dict per page is fine too
+    return {str(k): (v if isinstance(v, list) else [v]) for k, v in data.items()}
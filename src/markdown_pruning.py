@@ -0,0 +1,182 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, List
+
+MISSING_VALUES = {"", "n/a", "na", "none", "null", "not found", "unknown"}
+
+LINK_RE = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Hints for common fields whose names rarely appear in the page text itself
+FIELD_HINTS = {
+    "email": [re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+")],
+    "phone": [re.compile(r"\+?\d[\d\s().-]{7,}\d")],
+    "price": [re.compile(r"[$€£₱]\s?\d|\d[\d,]*\.\d{2}")],
+    "address": [re.compile(r"\d+\s+\w+\s+(st|street|ave|avenue|rd|road|blvd|drive|dr|lane|ln)\b", re.I)],
+    "date": [re.compile(r"\d{4}-\d{2}-\d{2}|\d{1,2}/\d{1,2}/\d{2,4}")],
+}
+
+
+@dataclass
+class ChunkSettings:
+    """
+    How much of the page goes to the LLM.
+    token_budget caps the total tokens sent per page, chunk_tokens is the size of
+    each parallel LLM call. Set enabled=False to send the whole page like before.
+    """
+    token_budget: int = 16000
+    chunk_tokens: int = 4000
+    enabled: bool = True
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for English markdown
+    return len(text) // 4 + 1
+
+
+def prune_markdown(markdown: str) -> List[str]:
+    """
+    Splits markdown into blocks and drops the low-value ones:
+    link lists/nav, image-only blocks, and repeated blocks (same card/footer again).
+    """
+    blocks = []
+    seen = set()
+    for block in re.split(r"\n\s*\n", markdown):
+        block = block.strip()
+        if not block:
+            continue
+
+        # Text left once links and images are removed
+        plain = LINK_RE.sub(lambda m: m.group(1), block)
+        visible = LINK_RE.sub("", block)
+        if not plain.strip():
+            continue
+
+        links = LINK_RE.findall(block)
+        if len(links) >= 3 and len(visible.strip(" -*|\n")) < 0.2 * len(plain):
+            continue
+
+        key = re.sub(r"\s+", " ", plain.lower())
+        if key in seen:
+            continue
+        seen.add(key)
+        blocks.append(block)
+    return blocks
+
+
+def field_terms(field_names: List[str]) -> Dict[str, List[str]]:
+    return {name: WORD_RE.findall(name.lower().replace("_", " ")) for name in field_names}
+
+
+def score_text(text: str, terms: Dict[str, List[str]]) -> float:
+    """How many of the requested fields this text looks relevant to."""
+    lowered = text.lower()
+    words = set(WORD_RE.findall(lowered))
+    score = 0.0
+    for name, parts in terms.items():
+        if parts and any(p in words for p in parts):
+            score += 1.0
+        for hint_name, patterns in FIELD_HINTS.items():
+            if hint_name in parts and any(p.search(text) for p in patterns):
+                score += 1.0
+    return score
+
+
+def select_chunks(markdown: str, field_names: List[str], settings: ChunkSettings) -> List[str]:
+    """
+    Prunes the page, packs the remaining blocks into chunks of ~chunk_tokens,
+    and keeps the best scoring chunks until token_budget is used up.
+    Chunks come back in page order so the LLM still sees a coherent document.
+    """
+    blocks = prune_markdown(markdown)
+    if not blocks:
+        return [markdown] if markdown.strip() else []
+
+    chunks = []
+    current, current_tokens = [], 0
+    for block in blocks:
+        tokens = estimate_tokens(block)
+        if current and current_tokens + tokens > settings.chunk_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(block)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+
+    total = sum(estimate_tokens(c) for c in chunks)
+    if total <= settings.token_budget:
+        return chunks
+
+    terms = field_terms(field_names)
+    ranked = sorted(range(len(chunks)), key=lambda i: (-score_text(chunks[i], terms), i))
+
+    chosen, used = [], 0
+    for i in ranked:
+        tokens = estimate_tokens(chunks[i])
+        if chosen and used + tokens > settings.token_budget:
+            continue
+        chosen.append(i)
+        used += tokens
+    return [chunks[i] for i in sorted(chosen)]
+
+
+def _has_value(value) -> bool:
+    return value is not None and str(value).strip().lower() not in MISSING_VALUES
+
+
+def _same(a, b) -> bool:
+    return str(a).strip().lower() == str(b).strip().lower()
+
+
+def merge_chunk_records(chunk_records: List[List[dict]], field_names: List[str]) -> List[dict]:
+    """
+    Merges records extracted from different chunks of the same page (one list per chunk,
+    in page order). Empty (all N/A) records are dropped. A record is folded into one from
+    another chunk when they don't disagree on any field and either share a value (same
+    name, same email) or meet at the chunk boundary: the last record of a chunk and the
+    first of the next. So a profile split over 2 chunks becomes 1 record, while different
+    people on a listing page, in the same chunk or not, stay separate.
+    """
+    merged: List[dict] = []
+    origins: List[set] = []
+    last_of_chunk: Dict[int, int] = {}
+    for ix, records in enumerate(chunk_records):
+        first = True
+        for record in records:
+            if not isinstance(record, dict):
+                continue
+            if not record.get("error") and not any(_has_value(record.get(f)) for f in field_names):
+                continue
+
+            target = None
+            for m, existing in enumerate(merged):
+                if existing.get("error") or record.get("error") or ix in origins[m]:
+                    continue
+                filled = [f for f in field_names if _has_value(existing.get(f)) and _has_value(record.get(f))]
+                if any(not _same(existing[f], record[f]) for f in filled):
+                    continue
+                if filled or (first and last_of_chunk.get(ix - 1) == m):
+                    target = m
+                    break
+
+            if target is None:
+                merged.append(dict(record))
+                origins.append({ix})
+                target = len(merged) - 1
+            else:
+                existing = merged[target]
+                for f in field_names:
+                    if not _has_value(existing.get(f)) and _has_value(record.get(f)):
+                        existing[f] = record[f]
+                origins[target].add(ix)
+            last_of_chunk[ix] = target
+            first = False
+
+    # Nothing found anywhere, keep one N/A record so the page still shows up
+    if not merged:
+        for records in chunk_records:
+            if records:
+                merged.append(records[0])
+                break
+    return merged
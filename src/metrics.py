@@ -0,0 +1,340 @@
+import os
+import json
+import asyncio
+import math
+import time
+import threading
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Deque, Dict, List, Optional
+
+from readiness import readiness_from_result
+
+DEFAULT_METRICS_PATH = os.path.join("output", "metrics.jsonl")
+
+# fetch: crawl incl. navigation, as timed by the dispatcher
+# readiness: our scroll/settle script (part of fetch)
+# markdown: HTML -> markdown (part of fetch)
+# extract: whole extraction, llm and parse are part of it
+# fallback: the HTTP tier's attempt at a page it then handed to the browser (not part of fetch)
+STAGES = ("fetch", "readiness", "markdown", "extract", "llm", "parse", "fallback")
+
+
+@dataclass
+class UrlMetrics:
+    url: str
+    tier: str = ""
+    fell_back: bool = False  # fetched over HTTP first, then again in the browser
+    stages_ms: Dict[str, float] = field(default_factory=dict)
+    page_bytes: int = 0
+    blocked_requests: int = 0
+    bytes_saved: int = 0  # estimated, see fetch_profiles.py
+    render_ms_saved: float = 0.0  # estimated
+    markdown_tokens: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    llm_calls: int = 0
+    cost_usd: Optional[float] = None
+    retries: int = 0  # crawls and extractions the retry policy ran again
+    source: str = ""  # where the records came from: llm, batch, cache, pre_extract, template, duplicate
+    success: bool = False
+    error_class: Optional[str] = None
+
+    def add_stage(self, stage: str, ms: float):
+        self.stages_ms[stage] = round(self.stages_ms.get(stage, 0) + ms, 1)
+
+    @contextmanager
+    def stage(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(stage, (time.perf_counter() - start) * 1000)
+
+    def add_llm(self, prompt_tokens: int, completion_tokens: int, calls: int = 1):
+        self.prompt_tokens += prompt_tokens or 0
+        self.completion_tokens += completion_tokens or 0
+        self.llm_calls += calls
+
+
+# The page being extracted in the current task. Set in stream_scrape, read by the
+# extractor, batcher and template learner so they don't need it passed around.
+_current: ContextVar[Optional[UrlMetrics]] = ContextVar("url_metrics", default=None)
+
+
+def current_metrics() -> Optional[UrlMetrics]:
+    return _current.get()
+
+
+def set_current_metrics(metrics: Optional[UrlMetrics]):
+    _current.set(metrics)
+
+
+def classify_error(message: Optional[str]) -> Optional[str]:
+    """Buckets crawl/extraction error messages into a few classes."""
+    if not message:
+        return None
+    text = message.lower()
+    if text.startswith("circuit open"):
+        return "circuit_open"
+    if text.startswith("deadline"):
+        # Over the per-URL time budget (job_control.JobLimits)
+        return "deadline"
+    if text.startswith("error extracting"):
+        # LLM side, the page itself was fetched fine
+        if "429" in text or "rate limit" in text or "ratelimit" in text:
+            return "llm_rate_limited"
+        if "json" in text or "parse" in text:
+            return "parse"
+        return "extraction"
+    if "timeout" in text or "timed out" in text:
+        return "timeout"
+    if "429" in text or "too many requests" in text or "rate limit" in text:
+        return "rate_limited"
+    if "403" in text or "captcha" in text or "access denied" in text or "cloudflare" in text:
+        return "blocked"
+    if "net::err" in text or "connection" in text or "dns" in text or "name resolution" in text:
+        return "network"
+    for code in ("404", "410", "400", "401"):
+        if code in text:
+            return "http_4xx"
+    for code in ("500", "502", "503", "504"):
+        if code in text:
+            return "http_5xx"
+    return "other"
+
+
+def load_cost_function() -> Optional[Callable]:
+    """litellm's cost_per_token, None without litellm. Importing litellm takes seconds, keep it off the event loop."""
+    try:
+        import litellm
+        return litellm.cost_per_token
+    except Exception:
+        return None
+
+
+def estimate_cost(cost_per_token: Optional[Callable], provider: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """USD from litellm's price table (see load_cost_function), None for models it doesn't know."""
+    if not prompt_tokens and not completion_tokens:
+        return 0.0
+    if cost_per_token is None:
+        return None
+    try:
+        prompt_cost, completion_cost = cost_per_token(
+            model=provider, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens
+        )
+        return round(prompt_cost + completion_cost, 6)
+    except Exception:
+        return None
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile, q in 0..100."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class MetricsRecorder:
+    """
+    Per-URL metrics for a scrape: stage timings, sizes, tokens, cost, retries, errors.
+    Every finished URL is appended to a JSONL file. The last `window` timings per
+    stage are kept for the p50/p95 summary and the optional Prometheus endpoint.
+    Cost needs litellm's price table: await load_pricing() before the scrape, it is
+    None per URL without it.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_METRICS_PATH, provider: str = "", window: int = 10000):
+        self.path = path
+        self.provider = provider
+        self.cost_per_token: Optional[Callable] = None
+        self._urls: Dict[str, UrlMetrics] = {}
+        self._markdown_ms: "OrderedDict[str, float]" = OrderedDict()
+        self._samples: Dict[str, Deque[float]] = {stage: deque(maxlen=window) for stage in STAGES}
+        self._errors: Counter = Counter()
+        self._totals = Counter()
+        self._lock = threading.Lock()
+        self._server = None
+        self._file = None
+        if path:
+            folder = os.path.dirname(path)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder)
+            self._file = open(path, "a", encoding="utf-8")
+
+    async def load_pricing(self):
+        if self.cost_per_token is None:
+            self.cost_per_token = await asyncio.to_thread(load_cost_function)
+
+    def for_url(self, url: str) -> UrlMetrics:
+        if url not in self._urls:
+            self._urls[url] = UrlMetrics(url=url)
+        return self._urls[url]
+
+    def note_markdown(self, url: str, ms: float):
+        self._markdown_ms[url] = ms
+        # Redirected URLs never get picked up, don't let them pile up
+        while len(self._markdown_ms) > 1000:
+            self._markdown_ms.popitem(last=False)
+
+    def record_crawl(self, res, tier: str, fetch_stats=None) -> UrlMetrics:
+        """
+        Fills in what the crawl result tells us: fetch time, size, readiness, markdown time,
+        and with fetch_stats (fetch_profiles.PageFetchStats) what the fetch profile blocked.
+        """
+        m = self.for_url(res.url)
+        if m.tier == "static" and tier == "browser":
+            # The HTTP attempt's time is the fallback's cost, fetch is the browser's alone
+            m.fell_back = True
+            m.add_stage("fallback", m.stages_ms.pop("fetch", 0) + m.stages_ms.pop("markdown", 0))
+        m.tier = tier
+
+        dispatch = getattr(res, "dispatch_result", None)
+        if dispatch is not None and dispatch.end_time and dispatch.start_time:
+            m.add_stage("fetch", (dispatch.end_time - dispatch.start_time) * 1000)
+        m.page_bytes = len(res.html or "")
+        if fetch_stats is not None:
+            m.blocked_requests += fetch_stats.blocked_requests
+            m.bytes_saved += fetch_stats.bytes_saved
+            m.render_ms_saved = round(m.render_ms_saved + fetch_stats.render_ms_saved, 1)
+
+        report = readiness_from_result(getattr(res, "js_execution_result", None))
+        if report is not None:
+            m.add_stage("readiness", report.get("ready_ms", 0))
+
+        for url in (getattr(res, "redirected_url", None), res.url):
+            if url and url in self._markdown_ms:
+                m.add_stage("markdown", self._markdown_ms.pop(url))
+                break
+        return m
+
+    def record_retry(self, url: str):
+        """The retry policy queued the URL for another crawl."""
+        self.for_url(url).retries += 1
+
+    def finish(self, url: str, success: bool, error: Optional[str] = None) -> UrlMetrics:
+        m = self._urls.pop(url, None) or UrlMetrics(url=url)
+        m.success = success
+        m.error_class = classify_error(error) if not success else None
+        m.cost_usd = estimate_cost(self.cost_per_token, self.provider, m.prompt_tokens, m.completion_tokens)
+
+        with self._lock:
+            for stage, ms in m.stages_ms.items():
+                if stage in self._samples:
+                    self._samples[stage].append(ms)
+            self._totals["pages"] += 1
+            self._totals["failed"] += 0 if success else 1
+            self._totals["retries"] += m.retries
+            self._totals["fallbacks"] += 1 if m.fell_back else 0
+            self._totals["prompt_tokens"] += m.prompt_tokens
+            self._totals["completion_tokens"] += m.completion_tokens
+            self._totals["llm_calls"] += m.llm_calls
+            self._totals["page_bytes"] += m.page_bytes
+            self._totals["blocked_requests"] += m.blocked_requests
+            self._totals["bytes_saved"] += m.bytes_saved
+            if m.cost_usd:
+                self._totals["cost_usd"] += m.cost_usd
+            if m.error_class:
+                self._errors[m.error_class] += 1
+
+        if self._file is not None:
+            self._file.write(json.dumps(dict(asdict(m), ts=time.time()), ensure_ascii=False) + "\n")
+            self._file.flush()
+        return m
+
+    def summary(self) -> dict:
+        with self._lock:
+            stages = {
+                stage: {
+                    "count": len(values),
+                    "p50_ms": round(percentile(list(values), 50), 1),
+                    "p95_ms": round(percentile(list(values), 95), 1),
+                }
+                for stage, values in self._samples.items()
+                if values
+            }
+            totals = dict(self._totals)
+            totals["cost_usd"] = round(totals.get("cost_usd", 0), 4)
+            return {"totals": totals, "stages": stages, "errors": dict(self._errors)}
+
+    def summary_lines(self) -> List[str]:
+        summary = self.summary()
+        lines = [
+            f"{stage:<10} p50 {s['p50_ms']:>8.0f} ms   p95 {s['p95_ms']:>8.0f} ms   (n={s['count']})"
+            for stage, s in summary["stages"].items()
+        ]
+        totals = summary["totals"]
+        if totals:
+            lines.append(
+                f"tokens {totals.get('prompt_tokens', 0)} in / {totals.get('completion_tokens', 0)} out, "
+                f"{totals.get('llm_calls', 0)} LLM calls, ~${totals['cost_usd']}"
+            )
+        if totals.get("fallbacks") or totals.get("retries"):
+            lines.append(f"{totals.get('fallbacks', 0)} pages fell back to the browser, {totals.get('retries', 0)} retries")
+        if totals.get("blocked_requests"):
+            lines.append(f"blocked {totals['blocked_requests']} requests, ~{totals['bytes_saved'] / 1e6:.1f} MB saved")
+        if summary["errors"]:
+            lines.append("errors " + ", ".join(f"{k}: {v}" for k, v in summary["errors"].items()))
+        return lines
+
+    def print_summary(self):
+        lines = self.summary_lines()
+        if lines:
+            print("Stage timings:")
+            for line in lines:
+                print("  " + line)
+
+    def prometheus_text(self) -> str:
+        """Prometheus text exposition of the summary."""
+        summary = self.summary()
+        out = [
+            "# HELP webbyscraper_stage_ms Per-URL stage duration in milliseconds",
+            "# TYPE webbyscraper_stage_ms summary",
+        ]
+        for stage, s in summary["stages"].items():
+            out.append(f'webbyscraper_stage_ms{{stage="{stage}",quantile="0.5"}} {s["p50_ms"]}')
+            out.append(f'webbyscraper_stage_ms{{stage="{stage}",quantile="0.95"}} {s["p95_ms"]}')
+            out.append(f'webbyscraper_stage_ms_count{{stage="{stage}"}} {s["count"]}')
+        for name, value in summary["totals"].items():
+            out.append(f"# TYPE webbyscraper_{name}_total counter")
+            out.append(f"webbyscraper_{name}_total {value}")
+        out.append("# TYPE webbyscraper_errors_total counter")
+        for error_class, value in summary["errors"].items():
+            out.append(f'webbyscraper_errors_total{{class="{error_class}"}} {value}')
+        return "\n".join(out) + "\n"
+
+    def serve(self, port: int = 9108, host: str = "127.0.0.1"):
+        """Serves /metrics for Prometheus on a background thread."""
+        recorder = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") not in ("", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = recorder.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        print(f"[METRICS] Prometheus endpoint on http://{host}:{port}/metrics")
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,178 @@
+import re
+import copy
+import asyncio
+import hashlib
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, FrozenSet, List, Optional, Tuple
+
+from markdown_pruning import LINK_RE, WORD_RE, prune_markdown
+from pre_extractors import EMAIL_RE
+
+HEADING_RE = re.compile(r"^#{1,3}\s+(.+)$", re.M)
+DIGITS_RE = re.compile(r"\d[\d,.]*")
+
+
+@dataclass
+class DedupSettings:
+    """
+    Reuses one extraction for pages with (nearly) the same content.
+    max_distance: differing bits out of 64 in the SimHash, 0 means identical text only.
+        Unrelated pages are 20+ bits apart, a few edited words on a 300-word page about 5.
+    shingle_words: words per shingle, longer shingles are stricter about word order
+    min_words: shorter pages are always extracted, there's too little text to compare
+    max_pages: fingerprints kept for matching, the oldest are dropped past that
+    """
+    max_distance: int = 6
+    shingle_words: int = 4
+    min_words: int = 40
+    max_pages: int = 100_000
+
+
+def page_words(markdown: str) -> List[str]:
+    """Words of the page's content blocks, link targets and repeated nav/footer blocks dropped."""
+    text = "\n\n".join(prune_markdown(markdown or ""))
+    text = LINK_RE.sub(r"\1", text)
+    return WORD_RE.findall(text.lower())
+
+
+def simhash(words: List[str], shingle_words: int = 4) -> int:
+    """64-bit SimHash over word shingles: similar texts get fingerprints a few bits apart."""
+    hashes = [
+        format(int.from_bytes(hashlib.blake2b(" ".join(words[i:i + shingle_words]).encode("utf-8"), digest_size=8).digest(), "little"), "064b")
+        for i in range(max(len(words) - shingle_words + 1, 1))
+    ]
+    # Each bit is set when most shingle hashes have it set (columns of the bit strings)
+    half = len(hashes) / 2
+    return int("".join("1" if column.count("1") > half else "0" for column in zip(*hashes)), 2)
+
+
+def page_facts(markdown: str) -> FrozenSet[str]:
+    """
+    What must be identical for two pages to share records: emails, numbers (phones,
+    prices, ids) and the main heading. Two profiles built on the same template
+    only differ in these, so they are never merged even if their text is close.
+    """
+    markdown = markdown or ""
+    facts = {m.lower() for m in EMAIL_RE.findall(markdown)}
+    facts.update(re.sub(r"\D", "", m) for m in DIGITS_RE.findall(LINK_RE.sub(r"\1", markdown)))
+    heading = HEADING_RE.search(markdown)
+    if heading:
+        facts.add("#" + heading.group(1).strip().lower())
+    return frozenset(facts)
+
+
+class _Original:
+    def __init__(self, url: str, fingerprint: int, facts: FrozenSet[str], key: tuple):
+        self.url = url
+        self.fingerprint = fingerprint
+        self.facts = facts
+        self.key = key
+        self.records: "asyncio.Future" = asyncio.get_running_loop().create_future()
+        self.duplicates: List[str] = []
+
+
+class NearDuplicateIndex:
+    """
+    Within-run dedup for the extractor.
+    The first page of a kind is extracted, later pages whose fingerprint is within
+    max_distance bits (and whose facts match) get a copy of its records, waiting
+    for it if its extraction is still running.
+    Lookups split the 64-bit fingerprint into max_distance + 1 bands: two fingerprints
+    that close always share at least one band exactly, so only those are compared.
+    url_timeout is the per-URL budget extractions run under: a duplicate waits at most
+    half of it for its original, then extracts itself with the time it has left.
+    """
+
+    def __init__(self, settings: DedupSettings = None, url_timeout: Optional[float] = None):
+        self.settings = settings or DedupSettings()
+        self.max_wait = url_timeout / 2 if url_timeout else None
+        self.bands = self.settings.max_distance + 1
+        self._band_bits = -(-64 // self.bands)
+        self._originals: Deque[_Original] = deque()
+        self._buckets: Dict[Tuple[int, int], List[_Original]] = {}
+        self.clusters: Dict[str, List[str]] = {}
+        self.reused = 0
+        self.waits_expired = 0
+
+    def _band_keys(self, fingerprint: int) -> List[Tuple[int, int]]:
+        mask = (1 << self._band_bits) - 1
+        return [(band, fingerprint >> (band * self._band_bits) & mask) for band in range(self.bands)]
+
+    def _find(self, fingerprint: int, facts: FrozenSet[str], key: tuple) -> Optional[_Original]:
+        for band_key in self._band_keys(fingerprint):
+            for original in self._buckets.get(band_key, []):
+                if (
+                    original.key == key
+                    and original.facts == facts
+                    and bin(original.fingerprint ^ fingerprint).count("1") <= self.settings.max_distance
+                ):
+                    return original
+        return None
+
+    def _add(self, original: _Original):
+        self._originals.append(original)
+        for band_key in self._band_keys(original.fingerprint):
+            self._buckets.setdefault(band_key, []).append(original)
+        while len(self._originals) > self.settings.max_pages:
+            old = self._originals.popleft()
+            for band_key in self._band_keys(old.fingerprint):
+                self._buckets[band_key].remove(old)
+
+    async def extract(self, url: str, markdown: str, key: tuple, run: Callable[[], Awaitable[list]]) -> Tuple[list, Optional[str]]:
+        """
+        Runs `run()` for the first page of its kind, or reuses that page's records.
+        `key` must hold whatever else decides the records (e.g. the fields asked for).
+        Returns (records, url of the original or None).
+        """
+        words = page_words(markdown)
+        if len(words) < self.settings.min_words:
+            return await run(), None
+
+        fingerprint = simhash(words, self.settings.shingle_words)
+        facts = page_facts(markdown)
+        original = self._find(fingerprint, facts, key)
+
+        if original is not None and original.url != url:
+            try:
+                # Shielded: giving up on it doesn't cancel the original's result
+                records = await asyncio.wait_for(asyncio.shield(original.records), self.max_wait)
+            except asyncio.TimeoutError:
+                self.waits_expired += 1
+                print(f"[DEDUP] {url}: {original.url} still extracting after {self.max_wait:g}s, extracting it separately")
+                records = None
+            # A failed original doesn't make the copies fail, they try for themselves
+            if records and not any(isinstance(r, dict) and r.get("error") for r in records):
+                original.duplicates.append(url)
+                self.clusters[original.url] = original.duplicates
+                self.reused += 1
+                print(f"[DEDUP] {url}: same content as {original.url}, reusing its extraction")
+                return copy.deepcopy(records), original.url
+
+        mine = _Original(url, fingerprint, facts, key)
+        if original is None:
+            self._add(mine)
+        try:
+            records = await run()
+        except BaseException:
+            if not mine.records.done():
+                mine.records.set_result(None)
+            raise
+        if not mine.records.done():
+            mine.records.set_result(copy.deepcopy(records))
+        return records, None
+
+    def summary_lines(self, top: int = 5) -> List[str]:
+        if not self.reused:
+            return []
+        lines = [f"Near-duplicates: {self.reused} pages reused the extraction of {len(self.clusters)} others"]
+        if self.waits_expired:
+            lines.append(f"  {self.waits_expired} more were extracted separately, their original took too long")
+        biggest = sorted(self.clusters.items(), key=lambda item: len(item[1]), reverse=True)[:top]
+        for url, duplicates in biggest:
+            lines.append(f"  {url} <- {len(duplicates)} duplicates, e.g. {duplicates[0]}")
+        return lines
+
+    def print_summary(self):
+        for line in self.summary_lines():
+            print(line)
@@ -0,0 +1,301 @@
+import re
+import json
+from typing import Callable, Dict, List, Optional, Tuple
+
+from markdown_pruning import MISSING_VALUES
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[a-z]{2,}", re.I)
+PHONE_RE = re.compile(r"(?<![\w/])\+?\d[\d\s().-]{7,}\d(?![\w/])")
+PRICE_RE = re.compile(r"[$€£₱]\s?\d[\d,]*(?:\.\d{1,2})?")
+DATE_RE = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+MAILTO_RE = re.compile(r"mailto:([^)\s\"'?>]+)", re.I)
+TEL_RE = re.compile(r"tel:([^)\s\"'>]+)", re.I)
+JSONLD_RE = re.compile(r'<script[^>]+type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.I | re.S)
+
+# Requested field name -> the kind of value it is
+FIELD_KINDS = {
+    "email": "email", "email_address": "email", "e_mail": "email",
+    "phone": "phone", "phone_number": "phone", "mobile": "phone", "cell": "phone",
+    "telephone": "phone", "contact_number": "phone", "mobile_number": "phone",
+    "url": "url", "page_url": "url", "source_url": "url",
+    "price": "price", "cost": "price",
+    "date": "date", "published_date": "date", "date_published": "date",
+}
+
+# Requested field name -> schema.org property names to look for
+SCHEMA_ORG_ALIASES = {
+    "phone": ["telephone"], "phone_number": ["telephone"], "mobile": ["telephone"],
+    "email_address": ["email"],
+    "title": ["jobTitle"], "job_title": ["jobTitle"],
+    "full_name": ["name"],
+    "first_name": ["givenName"], "last_name": ["familyName"],
+    "company": ["worksFor", "affiliation"],
+    "date": ["datePublished", "dateCreated"], "published_date": ["datePublished"],
+    "address": ["address"],
+    "price": ["price"],
+}
+
+
+# The kinds of thing a scrape is after. Structured data only counts when it comes from one of
+# these, a site-wide Organization/WebSite node (footer contacts, the publisher) describes the site
+ENTITY_TYPES = {
+    "Person", "Product", "JobPosting", "Event", "Article", "NewsArticle", "BlogPosting",
+    "RealEstateListing", "Residence", "SingleFamilyResidence", "Apartment", "House", "Book", "Course", "Recipe",
+}
+# Value objects that belong to the entity they're nested in (its price, its address...)
+NESTED_TYPES = {"Offer", "AggregateOffer", "PostalAddress", "ContactPoint", "PropertyValue", "MonetaryAmount", "PriceSpecification", "QuantitativeValue"}
+# Links from a node to other things, never part of it
+SKIP_KEYS = {"publisher", "potentialAction", "breadcrumb", "isPartOf", "author", "creator", "contributor", "editor", "seller", "brand"}
+ITEMTYPE_RE = re.compile(r"[^/#\s]+$")
+
+
+class PageContext:
+    """What the extractors look at. Structured data is parsed lazily, once."""
+
+    def __init__(self, url: str, markdown: str, html: Optional[str]):
+        self.url = url
+        self.markdown = markdown or ""
+        self.html = html or ""
+        self._entities = None
+        self._structured = None
+
+    @property
+    def entities(self) -> List[Dict[str, List[str]]]:
+        """One property bag (name -> distinct values) per ENTITY_TYPES node in JSON-LD and microdata."""
+        if self._entities is None:
+            entities: List[Dict[str, List[str]]] = []
+            for item in _jsonld_items(self.html):
+                _find_entities(item, entities)
+            if "itemscope" in self.html:
+                entities.extend(_microdata_entities(self.html))
+            self._entities = entities
+        return self._entities
+
+    @property
+    def structured(self) -> Dict[str, List[str]]:
+        """schema.org properties of the page's entities: name -> distinct values."""
+        if self._structured is None:
+            found: Dict[str, List[str]] = {}
+            for entity in self.entities:
+                for key, values in entity.items():
+                    for value in values:
+                        _add(found, key, value)
+            self._structured = found
+        return self._structured
+
+    @property
+    def single_entity(self) -> bool:
+        """True when the structured data describes exactly one thing, so page-wide values are its values."""
+        return len(self.entities) == 1
+
+
+def _types(node: dict) -> List[str]:
+    types = node.get("@type")
+    return [str(t).split("/")[-1] for t in (types if isinstance(types, list) else [types]) if t]
+
+
+def _add(found: Dict[str, List[str]], key: str, value):
+    value = " ".join(str(value).split())
+    if value and value not in found.setdefault(key, []):
+        found[key].append(value)
+
+
+def _find_entities(node, entities: List[Dict[str, List[str]]]):
+    """Collects the ENTITY_TYPES nodes anywhere in a JSON-LD tree (a @graph, an ItemList, a WebPage's mainEntity)."""
+    if isinstance(node, list):
+        for child in node:
+            _find_entities(child, entities)
+    elif isinstance(node, dict):
+        if any(t in ENTITY_TYPES for t in _types(node)):
+            bag: Dict[str, List[str]] = {}
+            _collect(node, bag)
+            entities.append(bag)
+            return
+        for key, value in node.items():
+            if not key.startswith("@") and key not in SKIP_KEYS:
+                _find_entities(value, entities)
+
+
+def _collect(node: dict, bag: Dict[str, List[str]]):
+    """The properties of one entity, with those of its value objects (offers, address) folded in."""
+    for key, value in node.items():
+        if key.startswith("@") or key in SKIP_KEYS:
+            continue
+        for item in value if isinstance(value, list) else [value]:
+            if not isinstance(item, dict):
+                _add(bag, key, item)
+            elif key == "address":
+                parts = [item.get(k) for k in ("streetAddress", "addressLocality", "addressRegion", "postalCode", "addressCountry")]
+                _add(bag, key, ", ".join(str(p) for p in parts if p))
+            elif key in ("worksFor", "affiliation"):
+                if "name" in item:
+                    _add(bag, key, item["name"])
+            elif not _types(item) or any(t in NESTED_TYPES for t in _types(item)):
+                _collect(item, bag)
+
+
+def _item_type(element) -> str:
+    match = ITEMTYPE_RE.search((element.get("itemtype") or "").strip().split(" ")[0])
+    return match.group() if match else ""
+
+
+def _microdata_entities(html: str) -> List[Dict[str, List[str]]]:
+    """Same as the JSON-LD lookup, for itemscope/itemprop markup."""
+    from lxml import etree, html as lxml_html
+
+    try:
+        tree = lxml_html.fromstring(html)
+    except (ValueError, etree.ParserError):
+        return []
+    entities = []
+    for scope in tree.iter():
+        if not isinstance(scope.tag, str) or scope.get("itemscope") is None or _item_type(scope) not in ENTITY_TYPES:
+            continue
+        # Nested in another entity (a Person in an Article): part of that one
+        if any(a.get("itemscope") is not None and _item_type(a) in ENTITY_TYPES for a in scope.iterancestors()):
+            continue
+        bag: Dict[str, List[str]] = {}
+        for prop in scope.iterdescendants():
+            if not isinstance(prop.tag, str) or not prop.get("itemprop") or not _owned_by(prop, scope):
+                continue
+            key = prop.get("itemprop").split()[0]
+            if prop.get("itemscope") is not None:
+                # A nested item is only a value when it's an address, its own props come next
+                if key == "address":
+                    _add(bag, key, prop.text_content())
+                continue
+            if prop.tag in ("meta", "link"):
+                value = prop.get("content") or prop.get("href")
+            else:
+                value = prop.get("content") or prop.text_content()
+            _add(bag, key, value or "")
+        entities.append(bag)
+    return entities
+
+
+def _owned_by(prop, scope) -> bool:
+    """True if prop belongs to scope, directly or through value objects (Offer, PostalAddress)."""
+    for ancestor in prop.iterancestors():
+        if ancestor is scope:
+            return True
+        if ancestor.get("itemscope") is not None and _item_type(ancestor) not in NESTED_TYPES:
+            return False
+    return False
+
+
+def _jsonld_items(html: str) -> list:
+    items = []
+    for raw in JSONLD_RE.findall(html):
+        try:
+            data = json.loads(raw.strip())
+        except ValueError:
+            continue
+        if isinstance(data, dict) and "@graph" in data:
+            data = data["@graph"]
+        items.append(data)
+    return items
+
+
+def _unique(values) -> Optional[str]:
+    """A value only counts if the page has exactly one, otherwise it's the LLM's call."""
+    distinct = []
+    for v in values:
+        v = v.strip()
+        if v and v.lower() not in MISSING_VALUES and v not in distinct:
+            distinct.append(v)
+    return distinct[0] if len(distinct) == 1 else None
+
+
+# --- Registry -------------------------------------------------------------
+# kind -> extractors, tried in order. Each takes (PageContext, field_name) and returns a value or None.
+EXTRACTORS: Dict[str, List[Callable[[PageContext, str], Optional[str]]]] = {}
+
+
+def register(kind: str):
+    def wrap(func):
+        EXTRACTORS.setdefault(kind, []).append(func)
+        return func
+    return wrap
+
+
+@register("schema_org")
+def from_structured_data(page: PageContext, field: str) -> Optional[str]:
+    for prop in SCHEMA_ORG_ALIASES.get(field, []) + [field]:
+        value = _unique(page.structured.get(prop, []))
+        if value:
+            return value
+    return None
+
+
+@register("email")
+def email_from_links(page: PageContext, field: str) -> Optional[str]:
+    return _unique(m.lower() for m in MAILTO_RE.findall(page.markdown + page.html))
+
+
+@register("email")
+def email_from_text(page: PageContext, field: str) -> Optional[str]:
+    return _unique(m.lower() for m in EMAIL_RE.findall(page.markdown))
+
+
+@register("phone")
+def phone_from_links(page: PageContext, field: str) -> Optional[str]:
+    return _unique(re.sub(r"[^\d+]", "", m) for m in TEL_RE.findall(page.markdown + page.html))
+
+
+@register("phone")
+def phone_from_text(page: PageContext, field: str) -> Optional[str]:
+    # Skip things that are just long numbers (ids, zip+4...) by requiring some separator or a +
+    matches = [m for m in PHONE_RE.findall(page.markdown) if re.search(r"[\s().+-]", m)]
+    return _unique(re.sub(r"[^\d+]", "", m) for m in matches)
+
+
+@register("url")
+def page_url(page: PageContext, field: str) -> Optional[str]:
+    return page.url
+
+
+@register("price")
+def price_from_text(page: PageContext, field: str) -> Optional[str]:
+    return _unique(PRICE_RE.findall(page.markdown))
+
+
+@register("date")
+def date_from_text(page: PageContext, field: str) -> Optional[str]:
+    return _unique(DATE_RE.findall(page.markdown))
+
+
+def pre_extract(url: str, markdown: str, html: Optional[str], field_names: List[str]) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Runs the deterministic extractors over a page.
+    Returns (resolved field -> value, fields still left for the LLM).
+    A value found once on the page is only the record's value when the page is about a
+    single entity (one Person, one Product... in its structured data). On other pages,
+    a listing with one footer email say, those fields still go to the LLM and the
+    resolved values only fill in what it leaves empty.
+    """
+    page = PageContext(url, markdown, html)
+    resolved: Dict[str, str] = {}
+    remaining: List[str] = []
+
+    for field in field_names:
+        value = None
+        kind = FIELD_KINDS.get(field.lower())
+        for extractor in EXTRACTORS.get("schema_org", []) + EXTRACTORS.get(kind, []):
+            value = extractor(page, field)
+            if value:
+                break
+        if value:
+            resolved[field] = value
+        # The page URL is the URL of every record on it
+        if not value or (kind != "url" and not page.single_entity):
+            remaining.append(field)
+    return resolved, remaining
+
+
+def reduce_schema(schema: dict, fields: List[str]) -> dict:
+    """Copy of a JSON schema with only `fields` left in it."""
+    reduced = dict(schema)
+    reduced["properties"] = {k: v for k, v in schema.get("properties", {}).items() if k in fields}
+    if "required" in schema:
+        reduced["required"] = [k for k in schema["required"] if k in fields]
+    return reduced
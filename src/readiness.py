@@ -0,0 +1,128 @@
+import math
+from typing import Dict, List, Optional
+
+# Injected as js_code. Scrolls a viewport at a time and returns as soon as the page is stable:
+#   - no DOM mutations for QUIET_MS
+#   - no fetch/XHR in flight and no resource finished loading for QUIET_MS
+#   - scroll height stopped growing for QUIET_MS and we're at the bottom
+# DEADLINE_MS is a hard cap, the page is returned as-is once it's hit.
+READINESS_SCRIPT = """
+    const QUIET_MS = __QUIET_MS__, DEADLINE_MS = __DEADLINE_MS__, POLL_MS = __POLL_MS__;
+    const start = performance.now();
+    const root = () => document.scrollingElement || document.documentElement;
+
+    let lastMutation = start;
+    const observer = new MutationObserver(() => { lastMutation = performance.now(); });
+    observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+
+    // Count requests started from now on, resource timing covers the ones that already finished
+    let inFlight = 0, lastRequestEnd = start;
+    const origFetch = window.fetch;
+    window.fetch = function(...args) {
+        inFlight++;
+        return origFetch.apply(this, args).finally(() => { inFlight--; lastRequestEnd = performance.now(); });
+    };
+    const origSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function(...args) {
+        inFlight++;
+        this.addEventListener("loadend", () => { inFlight--; lastRequestEnd = performance.now(); });
+        return origSend.apply(this, args);
+    };
+    const lastResource = () => {
+        const entries = performance.getEntriesByType("resource").slice(-50);
+        return entries.length ? Math.max(...entries.map(e => e.responseEnd || e.startTime)) : 0;
+    };
+
+    let lastHeight = root().scrollHeight, heightChanged = start, steps = 0, reason = "deadline";
+    while (performance.now() - start < DEADLINE_MS) {
+        if (window.scrollY + window.innerHeight < root().scrollHeight - 2) {
+            window.scrollBy(0, window.innerHeight);
+            steps++;
+        }
+        await new Promise(r => setTimeout(r, POLL_MS));
+
+        const now = performance.now();
+        const height = root().scrollHeight;
+        if (height !== lastHeight) { lastHeight = height; heightChanged = now; }
+
+        const atBottom = window.scrollY + window.innerHeight >= height - 2;
+        const domQuiet = now - lastMutation >= QUIET_MS;
+        const networkQuiet = inFlight === 0 && now - Math.max(lastResource(), lastRequestEnd) >= QUIET_MS;
+        const heightStable = now - heightChanged >= QUIET_MS;
+        if (atBottom && domQuiet && networkQuiet && heightStable) { reason = "stable"; break; }
+    }
+
+    observer.disconnect();
+    window.fetch = origFetch;
+    XMLHttpRequest.prototype.send = origSend;
+    return {readiness: true, ready_ms: Math.round(performance.now() - start), reason: reason, scroll_steps: steps, scroll_height: lastHeight};
+"""
+
+
+def build_readiness_script(quiet_ms: int = 500, deadline_ms: int = 10000, poll_ms: int = 100) -> str:
+    """
+    Returns the readiness js_code for CrawlerRunConfig.
+    Use together with a tiny delay_before_return_html, the script does the waiting.
+    """
+    return (
+        READINESS_SCRIPT
+        .replace("__QUIET_MS__", str(int(quiet_ms)))
+        .replace("__DEADLINE_MS__", str(int(deadline_ms)))
+        .replace("__POLL_MS__", str(int(poll_ms)))
+    )
+
+
+def readiness_from_result(js_execution_result: Optional[dict]) -> Optional[dict]:
+    """Pulls our readiness report out of CrawlResult.js_execution_result."""
+    if not js_execution_result:
+        return None
+    for item in js_execution_result.get("results") or []:
+        if isinstance(item, dict) and item.get("readiness"):
+            return item
+    return None
+
+
+class ReadinessStats:
+    """
+    Collects per-page readiness timings over a batch and prints them.
+    Savings are estimated against the old fixed approach:
+    300px scroll steps with 100ms sleeps, then a flat delay_before_return_html.
+    """
+
+    def __init__(self, old_fixed_delay: float = 3.0):
+        self.old_fixed_delay = old_fixed_delay
+        self.pages: List[Dict] = []
+
+    def record(self, url: str, js_execution_result: Optional[dict]) -> Optional[dict]:
+        report = readiness_from_result(js_execution_result)
+        if report is None:
+            return None
+
+        ready_s = report.get("ready_ms", 0) / 1000
+        old_s = math.ceil(report.get("scroll_height", 0) / 300) * 0.1 + self.old_fixed_delay
+        page = {"url": url, "ready_s": ready_s, "old_s": old_s, "reason": report.get("reason")}
+        self.pages.append(page)
+
+        print(f"[READY] {url} in {ready_s:.2f}s ({page['reason']}, {report.get('scroll_steps', 0)} scrolls, was ~{old_s:.1f}s)")
+        return page
+
+    def summary(self) -> Dict:
+        if not self.pages:
+            return {}
+        waited = sum(p["ready_s"] for p in self.pages)
+        old = sum(p["old_s"] for p in self.pages)
+        return {
+            "pages": len(self.pages),
+            "total_wait_s": round(waited, 2),
+            "avg_wait_s": round(waited / len(self.pages), 2),
+            "deadline_hits": sum(1 for p in self.pages if p["reason"] == "deadline"),
+            "estimated_saved_s": round(old - waited, 2),
+        }
+
+    def print_summary(self):
+        stats = self.summary()
+        if stats:
+            print(
+                f"Readiness: {stats['pages']} pages, avg wait {stats['avg_wait_s']}s, "
+                f"{stats['deadline_hits']} hit the deadline, ~{stats['estimated_saved_s']}s saved vs fixed delays"
+            )
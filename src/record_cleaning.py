@@ -0,0 +1,340 @@
+"""
+Post-processing for scraped records: normalize, type-coerce, dedupe and merge.
+
+Everything runs column-wise in pandas (Arrow-backed strings when pyarrow is
+installed), never row by row in Python, so millions of rows take seconds.
+
+    python src/record_cleaning.py leads.csv -o leads.clean.csv
+    python src/record_cleaning.py leads.jsonl --key email --key phone --key name,url
+"""
+import os
+import re
+import sys
+import time
+import argparse
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from markdown_pruning import MISSING_VALUES
+from pre_extractors import EMAIL_RE, FIELD_KINDS, PHONE_RE
+
+# What LLMs write instead of leaving a field empty
+MISSING_VARIANTS = sorted(MISSING_VALUES | {"n.a.", "n/a.", "-", "--", "—", "nan", "nil", "not available", "not provided", "not specified", "not listed"})
+# crawl4ai's bookkeeping, not data
+DROP_COLUMNS = ("error",)
+NUMBER_RE = r"^-?(?:0|[1-9]\d*)(?:\.\d+)?$"
+
+
+@dataclass
+class CleanSettings:
+    """
+    keys: groups of columns that identify a record. Two records are the same if
+        they match on any group (same email, or same name + url), also transitively.
+        Records never merge when they hold different values in the first one-column
+        key (two emails). Groups with a column the data doesn't have are skipped.
+        Phone is not a key by default: a shared switchboard number would merge
+        everyone in an office. Add ("phone",) when phones are personal.
+    merge: fill a merged record's empty fields from its duplicates, else keep the first as is
+    default_country_code: turns national phone numbers ("0917...") into +<code>917...
+    coerce_numbers: columns holding only plain numbers become numeric
+    drop_empty: drop records with no value in any field
+    """
+    keys: List[Tuple[str, ...]] = field(default_factory=lambda: [("email",), ("name", "url")])
+    merge: bool = True
+    default_country_code: Optional[str] = None
+    coerce_numbers: bool = True
+    drop_empty: bool = True
+
+
+def string_dtype():
+    """Arrow-backed strings are several times faster for the str ops below, if pyarrow is there."""
+    try:
+        import pyarrow  # noqa: F401
+        return pd.StringDtype("pyarrow")
+    except ImportError:
+        return pd.StringDtype("python")
+
+
+def column_name(name) -> str:
+    """'E-mail Address ' -> 'e_mail_address'"""
+    return re.sub(r"\W+", "_", str(name).strip().lower()).strip("_") or "column"
+
+
+def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """snake_case column names. Columns that end up with the same name are combined, first non-empty wins."""
+    names = [column_name(c) for c in df.columns]
+    if len(set(names)) == len(names):
+        df.columns = names
+        return df
+    combined = {}
+    for name, column in zip(names, df.columns):
+        series = df[column]
+        combined[name] = series if name not in combined else combined[name].fillna(series)
+    return pd.DataFrame(combined, index=df.index)
+
+
+def clean_text(series: pd.Series) -> pd.Series:
+    """Strings, trimmed, inner whitespace collapsed, 'N/A' and friends -> missing."""
+    text = series.astype(string_dtype()).str.strip().str.replace(r"\s+", " ", regex=True)
+    return text.mask(text.str.lower().isin(MISSING_VARIANTS))
+
+
+def clean_email(series: pd.Series) -> pd.Series:
+    return series.str.lower().str.extract(f"({EMAIL_RE.pattern})", flags=re.I, expand=False)
+
+
+def clean_phone(series: pd.Series, default_country_code: Optional[str] = None) -> pd.Series:
+    """The first phone number in the value, as digits with a leading + when international."""
+    phone = series.str.extract(f"({PHONE_RE.pattern})", expand=False)
+    international = phone.str.startswith("+") | phone.str.startswith("00")
+    digits = phone.str.replace(r"\D", "", regex=True)
+    digits = digits.mask(phone.str.startswith("00"), digits.str.slice(2))
+    if default_country_code:
+        national = ~international & digits.str.startswith("0")
+        digits = digits.mask(national, default_country_code.lstrip("+") + digits.str.slice(1))
+        international = international | national
+    digits = digits.mask(~digits.str.len().between(7, 15))
+    return digits.mask(international & digits.notna(), "+" + digits)
+
+
+def clean_price(series: pd.Series) -> pd.Series:
+    return pd.to_numeric(series.str.replace(r"[^\d.\-]", "", regex=True), errors="coerce")
+
+
+def clean_date(series: pd.Series) -> pd.Series:
+    dates = pd.to_datetime(series, errors="coerce", format="mixed")
+    return dates.dt.strftime("%Y-%m-%d").astype(series.dtype)
+
+
+def coerce_number(series: pd.Series) -> pd.Series:
+    """A column of plain numbers (no leading zeros, which are ids/zip codes) becomes numeric."""
+    values = series.dropna()
+    if values.empty or not values.str.fullmatch(NUMBER_RE).all():
+        return series
+    numbers = pd.to_numeric(series, errors="coerce")
+    return numbers.astype("Int64") if not values.str.contains(".", regex=False).any() else numbers
+
+
+def clean_column(series: pd.Series, name: str, settings: CleanSettings) -> pd.Series:
+    series = clean_text(series)
+    kind = FIELD_KINDS.get(name)
+    if kind == "email":
+        return clean_email(series)
+    if kind == "phone":
+        return clean_phone(series, settings.default_country_code)
+    if kind == "price":
+        return clean_price(series)
+    if kind == "date":
+        return clean_date(series)
+    if settings.coerce_numbers and kind is None:
+        return coerce_number(series)
+    return series
+
+
+def normalize_frame(df: pd.DataFrame, settings: CleanSettings = None) -> pd.DataFrame:
+    """Column names, missing values, and per-kind formats (see pre_extractors.FIELD_KINDS)."""
+    settings = settings or CleanSettings()
+    if "error" in df.columns:
+        # crawl4ai's error blocks aren't records
+        df = df[df["error"].astype(str).str.lower() != "true"]
+    df = normalize_columns(df.drop(columns=[c for c in DROP_COLUMNS if c in df.columns]).copy())
+
+    for name in df.columns:
+        # Scraped columns repeat a lot (same agent on many pages, "N/A" everywhere):
+        # clean each distinct value once and spread the results back out
+        codes, uniques = pd.factorize(df[name].astype(str).where(df[name].notna()), use_na_sentinel=True)
+        cleaned = clean_column(pd.Series(uniques), name, settings)
+        df[name] = pd.Series(pd.api.extensions.take(cleaned.array, codes, allow_fill=True), index=df.index)
+
+    if settings.drop_empty and len(df.columns):
+        df = df[df.notna().any(axis=1)]
+    return df.reset_index(drop=True)
+
+
+def key_codes(df: pd.DataFrame, key: Sequence[str]) -> np.ndarray:
+    """Group number per row for one key group, compared case-insensitively. Rows missing part of the key get -1."""
+    joined = df[key[0]].astype(string_dtype()).str.lower()
+    for column in key[1:]:
+        joined = joined + "\x1f" + df[column].astype(string_dtype()).str.lower()
+    group, _ = pd.factorize(joined, use_na_sentinel=True)
+    return group
+
+
+def split_conflicts(labels: np.ndarray, group: np.ndarray) -> np.ndarray:
+    """
+    Clusters holding more than one value of an identifier (two emails) are split by
+    that value; their rows without one stay on their own.
+    """
+    rows = group >= 0
+    pairs, _ = pd.factorize(labels[rows].astype(np.int64) * (group.max() + 1) + group[rows])
+    values_per_cluster = pd.Series(group[rows]).groupby(labels[rows]).nunique()
+    conflicted = np.isin(labels, values_per_cluster.index[values_per_cluster.to_numpy() > 1])
+    if not conflicted.any():
+        return labels
+    labels = labels.copy()
+    split = conflicted & ~rows
+    labels[split] = np.flatnonzero(split)
+    # First row of every (cluster, value) pair
+    first = np.full(pairs.max() + 1, len(labels))
+    index = np.flatnonzero(rows)
+    np.minimum.at(first, pairs, index)
+    mine = conflicted[rows]
+    labels[index[mine]] = first[pairs[mine]]
+    return labels
+
+
+def duplicate_groups(df: pd.DataFrame, keys: Sequence[Sequence[str]]) -> np.ndarray:
+    """
+    A cluster id per row: rows sharing any key group end up in the same cluster,
+    transitively (a shares an email with b, b a name + url with c -> a, b, c).
+    Min-label propagation over the key groups, all in numpy, until nothing changes.
+    A cluster that ends up with two values of the first one-column key (two emails) is
+    split by that value, so no merged record is built from two people's fields.
+    """
+    labels = np.arange(len(df))
+    codes = []
+    identifier = None
+    for key in keys:
+        if not key or any(column not in df.columns for column in key):
+            continue
+        group = key_codes(df, key)
+        if (group >= 0).any():
+            codes.append(group)
+            if len(key) == 1 and identifier is None:
+                identifier = group
+
+    changed = True
+    while changed:
+        changed = False
+        for group in codes:
+            rows = group >= 0
+            smallest = np.full(group.max() + 1, len(df))
+            np.minimum.at(smallest, group[rows], labels[rows])
+            merged = np.minimum(labels[rows], smallest[group[rows]])
+            if (merged != labels[rows]).any():
+                labels[rows] = merged
+                changed = True
+        # Point every label at its cluster's root, so chains collapse in one pass
+        labels = labels[labels]
+    if identifier is not None:
+        labels = split_conflicts(labels, identifier)
+    return labels
+
+
+def dedupe_frame(df: pd.DataFrame, settings: CleanSettings = None) -> pd.DataFrame:
+    """One record per cluster of duplicates, in order of first appearance."""
+    settings = settings or CleanSettings()
+    if df.empty:
+        return df
+    labels = duplicate_groups(df, settings.keys)
+    if settings.merge:
+        # First non-empty value of every column across the duplicates
+        merged = df.groupby(labels, sort=False).first()
+        return merged.reset_index(drop=True)
+    return df[~pd.Series(labels).duplicated().to_numpy()].reset_index(drop=True)
+
+
+def clean_frame(df: pd.DataFrame, settings: CleanSettings = None, source_urls: Sequence[str] = None) -> pd.DataFrame:
+    """
+    normalize_frame + dedupe_frame.
+    source_urls (the page each row came from) lets keys use "url" when the records don't have that field.
+    """
+    settings = settings or CleanSettings()
+    start = time.perf_counter()
+    rows_in = len(df)
+    added_url = source_urls is not None and "url" not in {column_name(c) for c in df.columns}
+    if added_url:
+        df = df.assign(url=list(source_urls))
+    df = normalize_frame(df, settings)
+    if added_url and settings.drop_empty:
+        # The page URL alone doesn't make a record
+        df = df[df.drop(columns=["url"]).notna().any(axis=1)].reset_index(drop=True)
+    rows_normalized = len(df)
+    df = dedupe_frame(df, settings)
+    if added_url:
+        df = df.drop(columns=["url"])
+    print(
+        f"[CLEAN] {rows_in} rows -> {len(df)} ({rows_normalized - len(df)} duplicates merged, "
+        f"{rows_in - rows_normalized} empty dropped) in {time.perf_counter() - start:.2f}s"
+    )
+    return df
+
+
+def to_records(df: pd.DataFrame) -> List[dict]:
+    """Plain dicts for the exporters, missing values left out."""
+    df = df.astype(object).where(df.notna(), None)
+    return [{k: v for k, v in row.items() if v is not None} for row in df.to_dict(orient="records")]
+
+
+def clean_records(records: Iterable[dict], settings: CleanSettings = None, source_urls: Sequence[str] = None) -> List[dict]:
+    records = [r for r in records if isinstance(r, dict)]
+    if not records:
+        return []
+    return to_records(clean_frame(pd.DataFrame.from_records(records), settings, source_urls))
+
+
+def read_frame(path: str, fmt: str) -> pd.DataFrame:
+    """Everything as strings, like the exporters wrote it."""
+    if fmt == "csv":
+        return pd.read_csv(path, dtype=str, keep_default_na=False)
+    if fmt == "jsonl":
+        return pd.read_json(path, lines=True, dtype=False)
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+    raise ValueError(f"Can't clean '{fmt}' files")
+
+
+def write_frame(df: pd.DataFrame, path: str, fmt: str):
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+    elif fmt == "jsonl":
+        df.to_json(path, orient="records", lines=True, force_ascii=False)
+    elif fmt == "parquet":
+        # Strings like ParquetExporter, numbers stay numbers
+        df.to_parquet(path, index=False)
+    else:
+        raise ValueError(f"Can't clean '{fmt}' files")
+
+
+def clean_file(path: str, fmt: str = None, settings: CleanSettings = None, output: str = None) -> Tuple[int, int]:
+    """Cleans an exported file, in place unless output is given. Returns (rows before, rows after)."""
+    from exporters import format_for
+
+    fmt = fmt or format_for(path)
+    output = output or path
+    df = read_frame(path, fmt)
+    cleaned = clean_frame(df, settings)
+    # Written next to it first, an interrupted run leaves the original intact
+    tmp_path = output + ".tmp"
+    write_frame(cleaned, tmp_path, format_for(output, fmt))
+    os.replace(tmp_path, output)
+    return len(df), len(cleaned)
+
+
+def parse_keys(values: List[str]) -> List[Tuple[str, ...]]:
+    """['email', 'name,url'] -> [('email',), ('name', 'url')]"""
+    return [tuple(column_name(c) for c in value.split(",") if c.strip()) for value in values]
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Normalize, dedupe and merge exported records")
+    parser.add_argument("path", help="csv, jsonl or parquet file")
+    parser.add_argument("-o", "--output", help="where to write (default: in place)")
+    parser.add_argument("--key", action="append", help="columns that identify a record, comma-separated, repeatable (default: email, name+url; add phone when phones are personal)")
+    parser.add_argument("--no-merge", action="store_true", help="keep the first duplicate as is instead of filling its gaps")
+    parser.add_argument("--country-code", help="for national phone numbers, e.g. 63")
+    args = parser.parse_args(argv)
+
+    settings = CleanSettings(merge=not args.no_merge, default_country_code=args.country_code)
+    if args.key:
+        settings.keys = parse_keys(args.key)
+    before, after = clean_file(args.path, settings=settings, output=args.output)
+    print(f"Wrote {after} of {before} rows to {args.output or args.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
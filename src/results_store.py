@@ -0,0 +1,127 @@
+import os
+import json
+import sqlite3
+from typing import Iterator, List, Optional, Tuple
+
+DEFAULT_RESULTS_PATH = os.path.join("cache", "results.db")
+
+
+def _json_path(column: str) -> str:
+    """SQLite JSON path for a top-level key, quoted so spaces and dots are fine."""
+    return '$."' + column.replace('"', '') + '"'
+
+
+class ResultsStore:
+    """
+    Scrape results kept on disk in SQLite, one JSON row per record.
+
+    The dashboard only ever asks for one page of rows at a time. Sorting and
+    filtering run in SQL (json_extract / json_each), so nothing here needs the
+    whole result set in memory.
+    """
+
+    def __init__(self, path: str = DEFAULT_RESULTS_PATH):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                data TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS result_columns (
+                position INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )
+            """
+        )
+        self._conn.commit()
+        self.columns: List[str] = [
+            row[0] for row in self._conn.execute("SELECT name FROM result_columns ORDER BY position")
+        ]
+
+    def clear(self):
+        self._conn.execute("DELETE FROM results")
+        self._conn.execute("DELETE FROM result_columns")
+        self._conn.commit()
+        self.columns = []
+
+    def add(self, records: List[dict]) -> bool:
+        """Stores records. Returns True if they brought new columns."""
+        new_columns = []
+        for record in records:
+            for key in record:
+                if key not in self.columns and key not in new_columns:
+                    new_columns.append(key)
+
+        self._conn.executemany(
+            "INSERT INTO results (data) VALUES (?)",
+            [(json.dumps(r, ensure_ascii=False, default=str),) for r in records],
+        )
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO result_columns (position, name) VALUES (?, ?)",
+            [(len(self.columns) + i, name) for i, name in enumerate(new_columns)],
+        )
+        self._conn.commit()
+        self.columns.extend(new_columns)
+        return bool(new_columns)
+
+    def _where(self, filter_text: str, filter_column: Optional[str]) -> Tuple[str, list]:
+        if not filter_text:
+            return "", []
+        pattern = f"%{filter_text}%"
+        if filter_column:
+            return "WHERE CAST(json_extract(data, ?) AS TEXT) LIKE ?", [_json_path(filter_column), pattern]
+        # Match against any value, not the key names
+        return "WHERE EXISTS (SELECT 1 FROM json_each(results.data) WHERE CAST(json_each.value AS TEXT) LIKE ?)", [pattern]
+
+    def count(self, filter_text: str = "", filter_column: Optional[str] = None) -> int:
+        where, params = self._where(filter_text, filter_column)
+        return self._conn.execute(f"SELECT COUNT(*) FROM results {where}", params).fetchone()[0]
+
+    def page(
+        self,
+        offset: int = 0,
+        limit: int = 50,
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+        filter_text: str = "",
+        filter_column: Optional[str] = None,
+    ) -> List[dict]:
+        """One window of rows, sorted and filtered by SQLite."""
+        where, params = self._where(filter_text, filter_column)
+        order = "id"
+        if sort_by:
+            direction = "DESC" if descending else "ASC"
+            order = f"json_extract(data, ?) {direction}, id"
+            params.append(_json_path(sort_by))
+
+        rows = self._conn.execute(
+            f"SELECT data FROM results {where} ORDER BY {order} LIMIT ? OFFSET ?",
+            params + [limit, offset],
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def iter_records(self, batch_size: int = 1000) -> Iterator[dict]:
+        """All records in insertion order, read batch_size rows at a time."""
+        last_id = 0
+        while True:
+            rows = self._conn.execute(
+                "SELECT id, data FROM results WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)
+            ).fetchall()
+            if not rows:
+                return
+            for row_id, data in rows:
+                yield json.loads(data)
+            last_id = rows[-1][0]
+
+    def close(self):
+        self._conn.close()
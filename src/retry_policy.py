@@ -0,0 +1,171 @@
+import time
+import random
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from metrics import classify_error
+from scheduler import domain_of
+
+# What is worth another try, per error class (see metrics.classify_error)
+RETRYABLE = {"timeout", "network", "http_5xx", "rate_limited", "blocked", "llm_rate_limited", "parse", "extraction", "other"}
+# Failures that say something about the host, they count towards its circuit breaker
+# ("deadline" only reaches the breaker for pages that were too slow to load)
+HOST_FAILURES = {"timeout", "deadline", "network", "http_5xx", "rate_limited", "blocked"}
+# Being throttled or blocked: back off harder than for a blip
+SLOW_DOWN = {"rate_limited", "llm_rate_limited", "blocked"}
+# Seconds: retries due this close together go out in the same round
+ROUND_WINDOW = 1.0
+
+
+@dataclass
+class RetrySettings:
+    """
+    max_attempts: tries per URL, 1 turns retrying off
+    base_delay / max_delay: exponential backoff in seconds, with jitter, x4 for 429s and blocks
+    breaker_failures: consecutive host failures before a domain's breaker opens
+    breaker_cooldown: seconds an open breaker waits before letting one probe URL through,
+        doubled each time the probe fails
+    breaker_max_trips: after this many openings the domain's remaining URLs are failed
+    """
+    max_attempts: int = 3
+    base_delay: float = 2.0
+    max_delay: float = 60.0
+    breaker_failures: int = 5
+    breaker_cooldown: float = 30.0
+    breaker_max_trips: int = 3
+    retryable: set = field(default_factory=lambda: set(RETRYABLE))
+
+
+def backoff_delay(attempt: int, error_class: str, settings: RetrySettings) -> float:
+    """Exponential backoff with "equal jitter": half the delay fixed, half random."""
+    delay = settings.base_delay * (2 ** max(attempt - 1, 0))
+    if error_class in SLOW_DOWN:
+        delay *= 4
+    delay = min(delay, settings.max_delay)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class CircuitBreaker:
+    """closed -> (too many failures) open -> (cooldown) half_open: one probe -> closed or open again"""
+
+    def __init__(self, settings: RetrySettings):
+        self.settings = settings
+        self.state = "closed"
+        self.failures = 0
+        self.trips = 0
+        self.reopen_at = 0.0
+        self.probing = False
+
+    def record(self, host_failure: bool):
+        if not host_failure:
+            self.state, self.failures, self.probing = "closed", 0, False
+            return
+        self.failures += 1
+        # Requests sent before it opened are still coming back, they don't trip it again
+        if self.state == "open":
+            return
+        if self.state == "half_open" or self.failures >= self.settings.breaker_failures:
+            self.trips += 1
+            self.state = "open"
+            self.probing = False
+            self.reopen_at = time.monotonic() + self.settings.breaker_cooldown * 2 ** (self.trips - 1)
+
+    def allows(self) -> bool:
+        """True if a URL of this domain may be sent now (for half_open: only the one probe)."""
+        if self.state == "open" and time.monotonic() >= self.reopen_at:
+            self.state = "half_open"
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    @property
+    def gave_up(self) -> bool:
+        return self.trips >= self.settings.breaker_max_trips
+
+
+class RetryPolicy:
+    """
+    Decides what happens to a failed URL and keeps each domain's circuit breaker.
+    Crawl failures are put back at the end of the line, for the next round of the
+    scrape once their backoff is over. Extraction failures are retried in place,
+    the page is already fetched. URLs of a domain whose breaker is open wait,
+    so healthy domains keep the crawl slots.
+    """
+
+    def __init__(self, settings: RetrySettings = None):
+        self.settings = settings or RetrySettings()
+        self.attempts: Counter = Counter()
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.retried: Counter = Counter()
+        self._due: List[Tuple[float, str]] = []
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        domain = domain_of(url)
+        if domain not in self.breakers:
+            self.breakers[domain] = CircuitBreaker(self.settings)
+        return self.breakers[domain]
+
+    def record(self, url: str, error: Optional[str]):
+        """Feeds a crawl outcome to the domain's breaker."""
+        self.breaker(url).record(classify_error(error) in HOST_FAILURES)
+
+    def should_retry(self, url: str, error: str) -> Optional[float]:
+        """Counts the attempt. Returns the backoff in seconds if the URL gets another one, else None."""
+        self.attempts[url] += 1
+        error_class = classify_error(error)
+        if error_class not in self.settings.retryable or self.attempts[url] >= self.settings.max_attempts:
+            return None
+        self.retried[error_class] += 1
+        return backoff_delay(self.attempts[url], error_class, self.settings)
+
+    def defer(self, url: str, delay: float):
+        """Queues a URL for a later round, behind everything that's already waiting."""
+        self._due.append((time.monotonic() + delay, url))
+
+    def admit(self, urls: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Splits URLs into (send now, give up). URLs of domains with an open
+        breaker are deferred until it lets a probe through.
+        """
+        ready, dropped = [], []
+        for url in urls:
+            breaker = self.breaker(url)
+            if breaker.gave_up:
+                dropped.append(url)
+            elif breaker.allows():
+                ready.append(url)
+            else:
+                self._due.append((breaker.reopen_at, url))
+        return ready, dropped
+
+    def has_pending(self) -> bool:
+        return bool(self._due)
+
+    async def next_round(self) -> List[str]:
+        """
+        Waits for the earliest retry to be due and returns every URL due by then,
+        or within ROUND_WINDOW seconds after, so retries go out together rather than one per round.
+        """
+        if not self._due:
+            return []
+        wait = min(due for due, _ in self._due) - time.monotonic()
+        if wait > 0:
+            if wait >= 1:
+                print(f"[RETRY] Waiting {wait:.1f}s before retrying {len(self._due)} URLs")
+            await asyncio.sleep(wait)
+        cutoff = time.monotonic() + ROUND_WINDOW
+        ready = [url for due, url in self._due if due <= cutoff]
+        self._due = [(due, url) for due, url in self._due if due > cutoff]
+        return list(dict.fromkeys(ready))
+
+    def print_summary(self):
+        if self.retried:
+            print("Retries: " + ", ".join(f"{k}: {v}" for k, v in self.retried.most_common()))
+        tripped = {domain: b.trips for domain, b in self.breakers.items() if b.trips}
+        if tripped:
+            print("Circuit breakers opened: " + ", ".join(f"{d} x{n}" for d, n in tripped.items()))
@@ -0,0 +1,54 @@
+import time
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+# No crawl4ai here: the UI and the URL helpers import this before the crawler stack is loaded.
+# The dispatcher itself is in domain_scheduler.py.
+
+
+@dataclass
+class SchedulerSettings:
+    """
+    Politeness knobs for multi-URL scrapes.
+    per_domain_rate is requests/second per host, per_domain_burst is how many can go back to back.
+    """
+    max_concurrency: int = 10
+    per_domain_concurrency: int = 2
+    per_domain_rate: float = 1.0
+    per_domain_burst: int = 2
+    memory_threshold_percent: float = 85.0
+
+
+def domain_of(url: str) -> str:
+    netloc = urlparse(url).netloc.lower()
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holds at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        if self.rate <= 0:
+            return
+        self._refill()
+        self.tokens -= 1
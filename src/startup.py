@@ -0,0 +1,238 @@
+"""
+Fast start for the app, the CLI and worker processes.
+
+The crawler stack (crawl4ai, and through it Playwright, litellm, numpy...) is not
+imported by the UI and the settings modules. It is loaded on a background thread
+with warm_up() while the window is already up, and crawler_stack() hands it over
+when the first scrape starts. The Playwright browser check is a file lookup,
+cached in cache/browsers.json, instead of a subprocess on every start.
+
+    python src/startup.py                 # cold import time of each module
+    python src/startup.py --budget 0.5    # exit 1 if a UI module takes longer (for CI)
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+import subprocess
+import importlib
+import importlib.util
+from typing import Dict, List, Optional, Tuple
+
+# Entry points import this module first, so this is (close to) process start
+PROCESS_START = time.perf_counter()
+
+BROWSER_CHECK_PATH = os.path.join("cache", "browsers.json")
+
+# What a scrape needs, loaded in the background (crawl4ai only imports litellm on the first LLM call)
+CRAWLER_MODULES = ("LLM_extraction", "litellm")
+# What the window and the CLI need before they can take input: must stay cheap
+UI_MODULES = (
+    "scheduler", "markdown_pruning", "llm_batching", "template_schemas", "near_duplicates",
+    "fetch_profiles", "retry_policy", "structured_output", "job_control", "results_store", "job_store", "browser_pool",
+    "metrics", "crawl_frontier", "deep_crawler", "exporters",
+)
+
+
+class StartupProfile:
+    """Seconds since launch of each startup milestone, and how long each lazy import took."""
+
+    def __init__(self):
+        self.marks: Dict[str, float] = {}
+        self.imports: Dict[str, float] = {}
+
+    def mark(self, label: str):
+        self.marks[label] = time.perf_counter() - PROCESS_START
+
+    def summary(self) -> str:
+        parts = [f"{label} at {seconds:.2f}s" for label, seconds in self.marks.items()]
+        if self.imports:
+            parts.append("loaded " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.imports.items()))
+        return "[STARTUP] " + ", ".join(parts)
+
+
+PROFILE = StartupProfile()
+_warmup: Optional[threading.Thread] = None
+
+
+def load(name: str):
+    """Imports a module, timing it in PROFILE the first time."""
+    if name in sys.modules:
+        return sys.modules[name]
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    PROFILE.imports[name] = time.perf_counter() - start
+    return module
+
+
+def warm_up(modules=CRAWLER_MODULES, check_browsers: bool = True) -> threading.Thread:
+    """
+    Loads the modules (and checks the browsers) on a daemon thread, once.
+    Import locks make a scrape that starts early simply wait for the module it needs.
+    """
+    global _warmup
+    if _warmup is not None:
+        return _warmup
+
+    def run():
+        try:
+            for name in modules:
+                load(name)
+            if check_browsers:
+                ensure_browsers_installed()
+        except Exception as e:
+            # The scrape imports it again and gets the real error
+            print(f"[STARTUP] Warm-up failed: {e}")
+            return
+        PROFILE.mark("crawler ready")
+        print(PROFILE.summary())
+
+    _warmup = threading.Thread(target=run, name="warm-up", daemon=True)
+    _warmup.start()
+    return _warmup
+
+
+def crawler_stack():
+    """LLM_extraction, loaded. Blocks until the warm-up is done, call it off the event loop."""
+    if _warmup is not None:
+        _warmup.join()
+    return load("LLM_extraction")
+
+
+def browsers_path() -> str:
+    """Where Playwright keeps its browsers (PLAYWRIGHT_BROWSERS_PATH or the per-OS default)."""
+    custom = os.environ.get("PLAYWRIGHT_BROWSERS_PATH")
+    if custom == "0":
+        spec = importlib.util.find_spec("playwright")
+        return os.path.join(spec.submodule_search_locations[0], "driver", "package", ".local-browsers")
+    if custom:
+        return custom
+    if sys.platform == "win32":
+        return os.path.join(os.environ.get("LOCALAPPDATA", os.path.expanduser("~")), "ms-playwright")
+    if sys.platform == "darwin":
+        return os.path.expanduser(os.path.join("~", "Library", "Caches", "ms-playwright"))
+    return os.path.expanduser(os.path.join("~", ".cache", "ms-playwright"))
+
+
+def expected_chromium() -> Tuple[Optional[str], Optional[str]]:
+    """
+    (folder name, e.g. "chromium-1248", path of the list it came from) of the Chromium
+    the installed Playwright wants, read from its browsers.json without importing Playwright.
+    """
+    spec = importlib.util.find_spec("playwright")
+    if spec is None or not spec.submodule_search_locations:
+        return None, None
+    listing = os.path.join(spec.submodule_search_locations[0], "driver", "package", "browsers.json")
+    try:
+        with open(listing, encoding="utf-8") as f:
+            browsers = json.load(f)["browsers"]
+    except (OSError, ValueError, KeyError):
+        return None, None
+    for browser in browsers:
+        if browser.get("name") == "chromium":
+            return f"chromium-{browser['revision']}", listing
+    return None, listing
+
+
+def browsers_installed() -> bool:
+    """
+    True if the Chromium this Playwright version needs is on disk.
+    The answer is cached with the browsers.json it came from, so after an
+    upgrade of Playwright (new revision) the check runs again.
+    """
+    try:
+        with open(BROWSER_CHECK_PATH, encoding="utf-8") as f:
+            cached = json.load(f)
+        if os.path.isdir(cached["chromium"]) and os.path.getmtime(cached["listing"]) == cached["mtime"]:
+            return True
+    except (OSError, ValueError, KeyError):
+        pass
+
+    folder, listing = expected_chromium()
+    if folder is None:
+        return False
+    chromium = os.path.join(browsers_path(), folder)
+    if not os.path.isdir(chromium):
+        return False
+
+    os.makedirs(os.path.dirname(BROWSER_CHECK_PATH), exist_ok=True)
+    with open(BROWSER_CHECK_PATH, "w", encoding="utf-8") as f:
+        json.dump({"chromium": chromium, "listing": listing, "mtime": os.path.getmtime(listing)}, f)
+    return True
+
+
+def ensure_browsers_installed():
+    """Checks if Playwright browsers are present. If not, installs them."""
+    if browsers_installed():
+        return
+    print("First time setup: Installing browsers (this takes a minute)...")
+    subprocess.run([sys.executable, "-m", "playwright", "install", "chromium"], check=True)
+    browsers_installed()
+    print("Browser setup complete!")
+
+
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def cold_import(module: str, src: str = None) -> Tuple[float, List[Tuple[str, float]]]:
+    """
+    Imports `module` in a fresh interpreter with -X importtime.
+    Returns (seconds, [(top-level dependency, seconds)] slowest first).
+    """
+    src = src or os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=src, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed: {proc.stderr.strip().splitlines()[-1]}")
+    # Children are listed (indented) before their parent, interpreter startup imports come first
+    children: Dict[str, float] = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        cumulative, depth, name = int(match.group(2)) / 1e6, len(match.group(3)) // 2, match.group(4)
+        if depth == 0:
+            if name == module:
+                return cumulative, sorted(children.items(), key=lambda item: item[1], reverse=True)
+            children = {}
+        elif depth == 1:
+            top = name.split(".")[0]
+            children[top] = children.get(top, 0.0) + cumulative
+    return 0.0, []
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Cold import times of the app's modules")
+    parser.add_argument("modules", nargs="*", help="modules to time (default: UI modules + the crawler stack)")
+    parser.add_argument("--budget", type=float, help="seconds a UI module may take, exit 1 if one is slower")
+    parser.add_argument("--top", type=int, default=3, help="slowest dependencies listed per module")
+    parser.add_argument("--out", help="save the times as JSON")
+    args = parser.parse_args(argv)
+
+    modules = args.modules or list(UI_MODULES) + list(CRAWLER_MODULES)
+    results = {}
+    over = []
+    for module in modules:
+        seconds, deps = cold_import(module)
+        results[module] = {"seconds": round(seconds, 4), "slowest": [[d, round(s, 4)] for d, s in deps[:args.top]]}
+        slowest = ", ".join(f"{d} {s * 1000:.0f}ms" for d, s in deps[:args.top])
+        print(f"{module:<18} {seconds * 1000:7.0f} ms   {slowest}")
+        if args.budget is not None and module in UI_MODULES and seconds > args.budget:
+            over.append(module)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if over:
+        print(f"Over the {args.budget}s budget: {', '.join(over)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
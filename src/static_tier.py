@@ -0,0 +1,78 @@
+import re
+from typing import List, Optional, Tuple
+
+from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, CacheMode
+from crawl4ai.async_configs import HTTPCrawlerConfig
+from crawl4ai.async_crawler_strategy import AsyncHTTPCrawlerStrategy
+from crawl4ai.content_scraping_strategy import LXMLWebScrapingStrategy
+
+from markdown_pruning import field_terms, score_text
+from pre_extractors import FIELD_KINDS
+
+# Markers of client-side rendered pages: an empty mount point or a "turn on JS" notice
+SPA_MARKERS = [
+    re.compile(r'<div[^>]+id=["\'](root|app|__next|__nuxt|svelte)["\'][^>]*>\s*</div>', re.I),
+    re.compile(r'<noscript[^>]*>[^<]*(enable|requires?)\s+javascript', re.I),
+    re.compile(r'<app-root[^>]*>\s*</app-root>', re.I),
+    re.compile(r'\bng-app\b|window\.__NUXT__|data-reactroot', re.I),
+]
+
+MIN_WORDS = 50            # Less than this is an empty page
+SHELL_WORDS = 300         # Below this, an SPA marker means the content is still to come
+MIN_TEXT_DENSITY = 0.01   # markdown chars / html chars
+
+
+def create_http_crawler() -> AsyncWebCrawler:
+    """A crawler that fetches with crawl4ai's pooled aiohttp client, no browser."""
+    return AsyncWebCrawler(crawler_strategy=AsyncHTTPCrawlerStrategy(browser_config=HTTPCrawlerConfig()))
+
+
+def build_static_run_config(excluded_tags: List[str]) -> CrawlerRunConfig:
+    return CrawlerRunConfig(
+        cache_mode=CacheMode.BYPASS,
+        page_timeout=30000,
+        scraping_strategy=LXMLWebScrapingStrategy(),
+        excluded_tags=excluded_tags,
+        exclude_external_links=False,
+        stream=True
+    )
+
+
+def needs_browser(res, field_names: List[str] = None) -> Tuple[bool, Optional[str]]:
+    """
+    Decides if a static fetch is good enough or the page needs the real browser.
+    With field_names, a page that has none of them (no label, no email/phone/price pattern)
+    goes to the browser before any LLM call is spent on it.
+    Returns (needs_browser, reason).
+    """
+    if not res.success:
+        return True, f"fetch failed ({res.error_message})"
+
+    html = res.html or ""
+    markdown = res.markdown.raw_markdown if res.markdown else ""
+    words = len(markdown.split())
+
+    if words < MIN_WORDS:
+        return True, f"only {words} words"
+
+    if words < SHELL_WORDS:
+        for marker in SPA_MARKERS:
+            if marker.search(html):
+                return True, "JS app shell"
+
+        if html and len(markdown) / len(html) < MIN_TEXT_DENSITY:
+            return True, "low text density"
+
+    if field_names and not fields_on_page(markdown, field_names):
+        return True, "no fields found"
+
+    return False, None
+
+
+def fields_on_page(markdown: str, field_names: List[str]) -> bool:
+    """Cheap look for the requested fields: their names or their value patterns in the text."""
+    # The page URL is always "found", it says nothing about the content
+    field_names = [f for f in field_names if FIELD_KINDS.get(f.lower()) != "url"]
+    if not field_names:
+        return True
+    return score_text(markdown, field_terms(field_names)) > 0
@@ -0,0 +1,381 @@
+import re
+import json
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+
+# Records carry the fields that failed validation under this key until they are
+# re-requested, it never reaches the results
+INVALID_KEY = "_invalid"
+# Providers that rejected response_format this run, they get the plain prompt from then on
+_NO_NATIVE: Set[str] = set()
+# What litellm says each provider supports: "schema", "json" or "prompt" (see resolve_native_mode)
+_NATIVE_MODE: Dict[str, str] = {}
+
+FENCE_RE = re.compile(r"```(?:json)?", re.I)
+BLOCKS_RE = re.compile(r"<blocks>", re.I)
+NUMBER_RE = re.compile(r"-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+OPEN_RE = re.compile(r"[\[{]")
+KEY_RE = re.compile(r"[A-Za-z_$][\w$-]*")
+# JSON values tried in a reply before giving up
+MAX_TRIES = 8
+LITERALS = {"true": True, "false": False, "null": None, "True": True, "False": False, "None": None}
+
+
+@dataclass
+class StructuredSettings:
+    """
+    mode: "auto" uses the provider's JSON-schema output when litellm says the model has it,
+        else its JSON mode, else the prompt alone. "schema", "json" and "prompt" force one.
+    refill: re-ask the LLM for the fields that were missing or invalid in the reply
+        (a cut-off reply, a nested object instead of text), only those fields.
+    """
+    mode: str = "auto"
+    refill: bool = True
+
+
+def lookup_native_mode(provider: str) -> str:
+    """
+    Asks litellm what the provider supports, once: "schema", "json" or "prompt".
+    A failed lookup is remembered as "prompt". Imports litellm, so it blocks for seconds
+    the first time: from async code, use resolve_native_mode.
+    """
+    if provider not in _NATIVE_MODE:
+        try:
+            import litellm
+
+            if litellm.supports_response_schema(model=provider):
+                mode = "schema"
+            elif "response_format" in (litellm.get_supported_openai_params(model=provider) or []):
+                mode = "json"
+            else:
+                mode = "prompt"
+        except Exception:
+            mode = "prompt"
+        _NATIVE_MODE[provider] = mode
+    return _NATIVE_MODE[provider]
+
+
+async def resolve_native_mode(provider: str) -> str:
+    """lookup_native_mode on a worker thread, for the setup of a scrape."""
+    if provider in _NATIVE_MODE:
+        return _NATIVE_MODE[provider]
+    return await asyncio.to_thread(lookup_native_mode, provider)
+
+
+def response_format_for(provider: str, schema: dict, mode: str = "auto") -> Optional[dict]:
+    """
+    The response_format to send for this provider, or None to rely on the prompt.
+    "auto" goes by resolve_native_mode, a provider it hasn't resolved gets the prompt alone.
+    """
+    if mode == "prompt" or provider in _NO_NATIVE:
+        return None
+    if mode == "auto":
+        mode = _NATIVE_MODE.get(provider, "prompt")
+    if mode == "schema":
+        # Strict schemas need every property required and no extra ones, at every level
+        item = {
+            "type": "object",
+            "properties": {name: {"type": "string", "description": prop.get("description", "")} for name, prop in schema.get("properties", {}).items()},
+            "required": list(schema.get("properties", {})),
+            "additionalProperties": False,
+        }
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "records",
+                "strict": True,
+                "schema": {"type": "object", "properties": {"records": {"type": "array", "items": item}}, "required": ["records"], "additionalProperties": False},
+            },
+        }
+    if mode == "json":
+        return {"type": "json_object"}
+    return None
+
+
+def native_rejected(provider: str, error: Exception) -> bool:
+    """True (and remembered) if the provider refused the response_format we sent."""
+    if "response_format" in str(error) or "json_schema" in str(error):
+        _NO_NATIVE.add(provider)
+        return True
+    return False
+
+
+class _Repair:
+    """
+    Recursive-descent JSON reader that keeps going where json.loads gives up.
+    A value cut off by the end of the text (a half string, "12.") is left out
+    rather than kept wrong, open arrays and objects are closed.
+    """
+
+    def __init__(self, text: str, pos: int):
+        self.text = text
+        self.pos = pos
+        self.end = len(text)
+        self.repaired = False
+        # The text ended inside a value, and whether that was inside the last member
+        # (of the outermost object or array, the last one to finish)
+        self.cut_off = False
+        self.last_cut = False
+
+    def skip(self):
+        text, end = self.text, self.end
+        while self.pos < end:
+            ch = text[self.pos]
+            if ch in " \t\r\n":
+                self.pos += 1
+            elif text.startswith("//", self.pos):
+                newline = text.find("\n", self.pos)
+                self.pos = end if newline == -1 else newline + 1
+                self.repaired = True
+            elif text.startswith("/*", self.pos):
+                close = text.find("*/", self.pos + 2)
+                self.pos = end if close == -1 else close + 2
+                self.repaired = True
+            else:
+                return
+
+    def value(self) -> Tuple[Any, bool]:
+        """(value, complete). Raises ValueError on something that isn't JSON at all."""
+        self.skip()
+        if self.pos >= self.end:
+            return None, False
+        ch = self.text[self.pos]
+        if ch == "{":
+            return self.object(), True
+        if ch == "[":
+            return self.array(), True
+        if ch in "\"'":
+            return self.string()
+        match = NUMBER_RE.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+            # A number right at the end of the text may have been cut short
+            if self.pos >= self.end:
+                return None, False
+            number = match.group()
+            return (float(number) if any(c in number for c in ".eE") else int(number)), True
+        match = KEY_RE.match(self.text, self.pos)
+        if match and match.group() in LITERALS:
+            self.pos = match.end()
+            self.repaired = self.repaired or match.group() not in ("true", "false", "null")
+            return LITERALS[match.group()], True
+        raise ValueError(f"unexpected {ch!r} at {self.pos}")
+
+    def string(self) -> Tuple[Optional[str], bool]:
+        quote = self.text[self.pos]
+        if quote == '"':
+            try:
+                value, self.pos = json.decoder.scanstring(self.text, self.pos + 1, False)
+                return value, True
+            except ValueError:
+                pass
+        # Single quotes, raw newlines or a string that never ends
+        self.repaired = True
+        chars = []
+        i = self.pos + 1
+        while i < self.end:
+            ch = self.text[i]
+            if ch == "\\" and i + 1 < self.end:
+                nxt = self.text[i + 1]
+                chars.append({"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}.get(nxt, nxt))
+                i += 2
+                continue
+            if ch == quote:
+                self.pos = i + 1
+                return "".join(chars), True
+            chars.append(ch)
+            i += 1
+        self.pos = self.end
+        return None, False
+
+    def key(self) -> Optional[str]:
+        if self.text[self.pos] in "\"'":
+            key, complete = self.string()
+            return key if complete else None
+        match = KEY_RE.match(self.text, self.pos)
+        if not match:
+            raise ValueError(f"bad key at {self.pos}")
+        self.repaired = True
+        self.pos = match.end()
+        return match.group()
+
+    def object(self) -> dict:
+        self.pos += 1
+        result = {}
+        while True:
+            self.skip()
+            if self.pos >= self.end:
+                self.repaired = self.cut_off = True
+                return result
+            ch = self.text[self.pos]
+            if ch == "}":
+                self.pos += 1
+                return result
+            if ch == ",":
+                # Trailing or doubled comma
+                self.pos += 1
+                continue
+            key = self.key()
+            self.skip()
+            if key is None or self.pos >= self.end:
+                self.repaired = self.cut_off = True
+                return result
+            if self.text[self.pos] == ":":
+                self.pos += 1
+            else:
+                self.repaired = True
+            before = self.cut_off
+            value, complete = self.value()
+            if not complete:
+                self.repaired = self.cut_off = True
+                return result
+            result[key] = value
+            self.last_cut = self.cut_off and not before
+
+    def array(self) -> list:
+        self.pos += 1
+        result = []
+        while True:
+            self.skip()
+            if self.pos >= self.end:
+                self.repaired = self.cut_off = True
+                return result
+            ch = self.text[self.pos]
+            if ch == "]":
+                self.pos += 1
+                return result
+            if ch == ",":
+                self.pos += 1
+                continue
+            before = self.cut_off
+            value, complete = self.value()
+            if not complete:
+                self.repaired = self.cut_off = True
+                return result
+            result.append(value)
+            self.last_cut = self.cut_off and not before
+
+
+def parse_json_reply(text: str) -> Tuple[Any, bool]:
+    """
+    The JSON in an LLM reply as (value, repaired), value None if there is none.
+    Code fences, <blocks> tags and prose around it are skipped. Trailing commas,
+    comments, single quotes, unquoted keys, Python literals and a reply cut off
+    mid-way are repaired. Well-formed replies take the json module's C fast path.
+    """
+    value, repaired, _ = read_json_reply(text)
+    return value, repaired
+
+
+def read_json_reply(text: str) -> Tuple[Any, bool, bool]:
+    """
+    parse_json_reply, plus whether the reply was cut off inside the last member of the
+    value (the last record, the last page of a batch): (value, repaired, last_cut).
+    """
+    if not text:
+        return None, False, False
+    text = FENCE_RE.sub("", text)
+    tag = BLOCKS_RE.search(text)
+    start = tag.end() if tag else 0
+    decoder = json.JSONDecoder()
+
+    # Prose before the JSON can hold a stray "[" or "{", or valid JSON that isn't
+    # the answer (a citation like "[1]"): keep looking until something holds records
+    fallback = None
+    for _ in range(MAX_TRIES):
+        match = OPEN_RE.search(text, start)
+        if match is None:
+            break
+        start = match.start()
+        try:
+            value, end = decoder.raw_decode(text, start)
+            repaired = last_cut = False
+        except ValueError:
+            reader = _Repair(text, start)
+            try:
+                value, _ = reader.value()
+            except ValueError:
+                start += 1
+                continue
+            end, repaired, last_cut = reader.pos, True, reader.last_cut
+        if to_items(value):
+            return value, repaired, last_cut
+        if fallback is None:
+            fallback = (value, repaired, last_cut)
+        start = max(end, start + 1)
+    return fallback or (None, False, False)
+
+
+def to_items(data: Any) -> List[dict]:
+    """The records in a parsed reply: a list, {"records": [...]}-style wrappers or a single record."""
+    if isinstance(data, dict):
+        inner = next(iter(data.values())) if len(data) == 1 else None
+        # A wrapper holds records, a single record can have one list-valued field ({"tags": [...]})
+        if isinstance(inner, list) and all(isinstance(item, dict) for item in inner):
+            data = inner
+        else:
+            data = [data]
+    if not isinstance(data, list):
+        return []
+    return [item for item in data if isinstance(item, dict)]
+
+
+def coerce_value(value: Any) -> Any:
+    """Scalars become the strings the schema asks for. Anything else is left to fail validation."""
+    if isinstance(value, str):
+        return value
+    if value is None:
+        return "N/A"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, list) and all(isinstance(v, (str, int, float)) for v in value):
+        return ", ".join(str(v) for v in value) if value else "N/A"
+    return value
+
+
+def validate_records(data: Any, model, fields: List[str]) -> List[dict]:
+    """
+    Checks every record against the pydantic model. Fields that are missing or still
+    invalid after coercion are dropped from the record and listed under INVALID_KEY.
+    """
+    records = []
+    for item in to_items(data):
+        record = {key: coerce_value(value) if key in fields else value for key, value in item.items()}
+        try:
+            model.model_validate(record)
+            invalid = []
+        except ValidationError as e:
+            invalid = sorted({str(err["loc"][0]) for err in e.errors() if err.get("loc")})
+        for name in invalid:
+            record.pop(name, None)
+        if invalid:
+            record[INVALID_KEY] = invalid
+        record["error"] = False
+        records.append(record)
+    # A record cut off right after it started has nothing in it, unless it's all there is
+    usable = [r for r in records if len(r.get(INVALID_KEY, ())) < len(fields)]
+    return usable or records
+
+
+def parse_records(content: str, model, fields: List[str]) -> Tuple[Optional[List[dict]], bool]:
+    """Parse and validate in one go: (records or None if the reply held no JSON, repaired)."""
+    data, repaired = parse_json_reply(content)
+    if data is None:
+        return None, repaired
+    return validate_records(data, model, fields), repaired
+
+
+def invalid_fields(records: List[dict]) -> List[str]:
+    """Fields still missing on some record (a field filled by another chunk doesn't count)."""
+    missing: Dict[str, None] = {}
+    for record in records:
+        if isinstance(record, dict):
+            for name in record.get(INVALID_KEY, ()):
+                if name not in record:
+                    missing[name] = None
+    return list(missing)
@@ -0,0 +1,234 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from extraction_cache import BUSY_TIMEOUT_S
+from markdown_pruning import MISSING_VALUES
+from metrics import current_metrics
+
+DEFAULT_TEMPLATE_PATH = os.path.join("cache", "templates.db")
+SEGMENT_VARIABLE_RE = re.compile(r"\d|[-_].*[-_]|^[A-Za-z0-9_-]{20,}$")
+
+
+@dataclass
+class TemplateSettings:
+    """
+    samples_needed: LLM-extracted pages per URL pattern before we generate selectors
+    min_agreement: share of fields the selectors must get right on the samples
+    check_every: every Nth selector page is double-checked with the LLM
+    max_failures: failed checks before the schema is thrown away and relearned
+    """
+    samples_needed: int = 3
+    min_agreement: float = 0.8
+    check_every: int = 20
+    max_failures: int = 2
+    max_html_chars: int = 60000
+
+
+def url_pattern(url: str) -> str:
+    """
+    Groups URLs that share a page template.
+    https://www.zillow.com/profile/Matt-Laricy -> zillow.com/profile/*
+    """
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+    host = host[4:] if host.startswith("www.") else host
+    segments = [s for s in parsed.path.split("/") if s]
+
+    pattern = []
+    for i, segment in enumerate(segments):
+        last = i == len(segments) - 1
+        if (last and len(segments) > 1) or SEGMENT_VARIABLE_RE.search(segment):
+            pattern.append("*")
+        else:
+            pattern.append(segment.lower())
+    return host + "/" + "/".join(pattern)
+
+
+def _norm(value) -> str:
+    return re.sub(r"[^a-z0-9@.]", "", str(value).lower())
+
+
+def _has_value(value) -> bool:
+    return value is not None and str(value).strip().lower() not in MISSING_VALUES
+
+
+def agreement(expected_records: List[dict], actual_records: List[dict], fields: List[str]) -> float:
+    """Share of fields where the selector output contains what the LLM found."""
+    checks = hits = 0
+    for field in fields:
+        expected = {_norm(r.get(field)) for r in expected_records if _has_value(r.get(field))}
+        expected.discard("")
+        if not expected:
+            continue
+        actual = [_norm(r.get(field)) for r in actual_records if _has_value(r.get(field))]
+        found = sum(1 for e in expected if any(e == a or (a and (e in a or a in e)) for a in actual))
+        checks += 1
+        if found / len(expected) >= 0.5:
+            hits += 1
+    return hits / checks if checks else 0.0
+
+
+class TemplateStore:
+    """Learned selector schemas, one per (URL pattern, field list), in SQLite."""
+
+    def __init__(self, path: str = DEFAULT_TEMPLATE_PATH):
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        # Shared by worker processes, like the extraction cache
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=BUSY_TIMEOUT_S)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS templates (
+                key TEXT PRIMARY KEY,
+                pattern TEXT NOT NULL,
+                fields TEXT NOT NULL,
+                schema TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(pattern: str, fields: List[str]) -> str:
+        return hashlib.sha256(json.dumps([pattern, sorted(fields)]).encode("utf-8")).hexdigest()
+
+    def get(self, pattern: str, fields: List[str]) -> Optional[dict]:
+        row = self._conn.execute(
+            "SELECT schema FROM templates WHERE key = ?", (self.make_key(pattern, fields),)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, pattern: str, fields: List[str], schema: dict):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO templates (key, pattern, fields, schema, created_at) VALUES (?, ?, ?, ?, ?)",
+            (self.make_key(pattern, fields), pattern, json.dumps(fields), json.dumps(schema), time.time()),
+        )
+        self._conn.commit()
+
+    def delete(self, pattern: str, fields: List[str]):
+        self._conn.execute("DELETE FROM templates WHERE key = ?", (self.make_key(pattern, fields),))
+        self._conn.commit()
+
+
+class TemplateLearner:
+    """
+    Learns a CSS selector schema per site template and uses it instead of the LLM.
+
+    The first few pages of a URL pattern go through the LLM. Their HTML and records
+    are used to have the LLM write a JsonCssExtractionStrategy schema, which must agree
+    with the LLM records before it's saved. After that, pages of that pattern are
+    extracted with selectors. Pages where the selectors find nothing, and a periodic
+    spot-check, go back to the LLM; too many failures and the schema is relearned.
+    """
+
+    def __init__(self, llm_config, store: TemplateStore = None, settings: TemplateSettings = None):
+        self.llm_config = llm_config
+        self.store = store or TemplateStore()
+        self.settings = settings or TemplateSettings()
+        self._samples: Dict[str, List[tuple]] = {}
+        self._uses: Dict[str, int] = {}
+        self._failures: Dict[str, int] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.selector_pages = 0
+
+    def _run_schema(self, schema: dict, url: str, html: str, fields: List[str]) -> List[dict]:
+        from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
+
+        records = JsonCssExtractionStrategy(schema).run(url, [html])
+        return [
+            {f: (r.get(f) if _has_value(r.get(f)) else "N/A") for f in fields}
+            for r in records
+            if isinstance(r, dict) and any(_has_value(r.get(f)) for f in fields)
+        ]
+
+    def _fail(self, pattern: str, fields: List[str], reason: str):
+        self._failures[pattern] = self._failures.get(pattern, 0) + 1
+        print(f"[TEMPLATE] {pattern}: {reason} ({self._failures[pattern]}/{self.settings.max_failures})")
+        if self._failures[pattern] >= self.settings.max_failures:
+            print(f"[TEMPLATE] {pattern}: dropping schema, relearning from the LLM")
+            self.store.delete(pattern, fields)
+            self._failures[pattern] = 0
+            self._samples.pop(pattern, None)
+
+    async def extract(self, url: str, html: str, fields: List[str], llm_extract: Callable[[], Awaitable[List[dict]]]) -> List[dict]:
+        pattern = url_pattern(url)
+        schema = self.store.get(pattern, fields)
+
+        if schema is not None:
+            self._uses[pattern] = self._uses.get(pattern, 0) + 1
+            records = self._run_schema(schema, url, html, fields)
+            if not records:
+                self._fail(pattern, fields, "selectors found nothing")
+                return await llm_extract()
+
+            # Spot-check now and then in case the site changed its markup
+            if self._uses[pattern] % self.settings.check_every == 0:
+                expected = await llm_extract()
+                if agreement([r for r in expected if isinstance(r, dict)], records, fields) < self.settings.min_agreement:
+                    self._fail(pattern, fields, "spot-check disagreed with the LLM")
+                    return expected
+
+            self.selector_pages += 1
+            metrics = current_metrics()
+            if metrics is not None:
+                metrics.source = "template"
+            for record in records:
+                record["error"] = False
+            return records
+
+        # Still learning this pattern: use the LLM and keep the page as a sample
+        records = await llm_extract()
+        good = [r for r in records if isinstance(r, dict) and not r.get("error")]
+        if good:
+            samples = self._samples.setdefault(pattern, [])
+            samples.append((url, html[: self.settings.max_html_chars], good))
+            if len(samples) >= self.settings.samples_needed:
+                lock = self._locks.setdefault(pattern, asyncio.Lock())
+                if not lock.locked():
+                    async with lock:
+                        await self._learn(pattern, fields, list(samples))
+        return records
+
+    async def _learn(self, pattern: str, fields: List[str], samples: List[tuple]):
+        url, html, records = samples[0]
+        example = {f: records[0].get(f, "N/A") for f in fields}
+        from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
+
+        try:
+            schema = await asyncio.to_thread(
+                JsonCssExtractionStrategy.generate_schema,
+                html,
+                schema_type="CSS",
+                query=f"Extract these fields: {', '.join(fields)}",
+                target_json_example=json.dumps(example),
+                llm_config=self.llm_config,
+            )
+        except Exception as e:
+            print(f"[TEMPLATE] {pattern}: schema generation failed: {e}")
+            self._samples[pattern] = []
+            return
+
+        scores = [
+            agreement(expected, self._run_schema(schema, sample_url, sample_html, fields), fields)
+            for sample_url, sample_html, expected in samples
+        ]
+        score = min(scores) if scores else 0.0
+        if score >= self.settings.min_agreement:
+            self.store.set(pattern, fields, schema)
+            self._failures[pattern] = 0
+            self._samples[pattern] = []
+            print(f"[TEMPLATE] {pattern}: learned selectors (agreement {score:.0%}), next pages skip the LLM")
+        else:
+            print(f"[TEMPLATE] {pattern}: selectors only agreed {score:.0%} with the LLM, collecting new samples")
+            self._samples[pattern] = []
@@ -0,0 +1,227 @@
+import sys
+import queue
+import asyncio
+import multiprocessing
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sized
+
+import startup
+from browser_pool import BrowserPool
+from job_control import JobLimits, ScrapeControl
+from job_store import ScrapeJob
+
+
+@dataclass
+class WorkerSettings:
+    """
+    workers: processes, each with its own event loop, browser and crawler
+    batch_size: URLs a worker takes at a time. Small batches keep the load even
+        (a worker that drew slow pages just takes fewer batches), big ones cost less overhead.
+    ordered: yield results in input order (a slow URL holds back the ones after it)
+    """
+    workers: int = max(multiprocessing.cpu_count() - 1, 1)
+    batch_size: int = 20
+    ordered: bool = True
+
+
+def _worker_main(worker_id: int, tasks, results, stop, scrape_kwargs: dict):
+    # Worker logs are diagnostics, keep stdout clean for whoever reads the parent's output
+    sys.stdout = sys.stderr
+    try:
+        asyncio.run(_worker_loop(worker_id, tasks, results, stop, scrape_kwargs))
+    finally:
+        results.put(("exit", worker_id, None))
+
+
+async def _watch_stop(stop, control: ScrapeControl):
+    while not stop.is_set():
+        await asyncio.sleep(0.5)
+    control.cancel("stopped by the parent process")
+
+
+async def _worker_loop(worker_id: int, tasks, results, stop, scrape_kwargs: dict):
+    # The crawler stack loads while the worker waits for its first batch
+    loading = asyncio.create_task(asyncio.to_thread(startup.load, "LLM_extraction"))
+    control = ScrapeControl(scrape_kwargs.pop("limits", None))
+    watcher = asyncio.create_task(_watch_stop(stop, control))
+    pool = BrowserPool()
+    try:
+        while True:
+            batch = await asyncio.to_thread(tasks.get)
+            if batch is None or control.stopped:
+                break
+            LLM_extraction = await loading
+
+            index_of = {url: i for i, url in batch}
+            async for event in LLM_extraction.stream_scrape([url for _, url in batch], pool=pool, control=control, **scrape_kwargs):
+                i = index_of.pop(event["url"], None)
+                if i is not None:
+                    results.put(("event", i, {k: event[k] for k in ("url", "success", "records", "error")}))
+            if control.stopped:
+                break
+
+            # Anything the scrape didn't report on counts as failed
+            for url, i in index_of.items():
+                results.put(("event", i, {"url": url, "success": False, "records": [], "error": "No result from worker"}))
+    finally:
+        watcher.cancel()
+        await pool.close()
+
+
+async def sharded_scrape(urls: Iterable[str], fields: List[str], model_id: str, api_key: str, settings: WorkerSettings = None, job: ScrapeJob = None, **scrape_options):
+    """
+    stream_scrape spread over several processes.
+    Workers pull batches of URLs from a shared queue, so the work balances itself,
+    and every result is merged back into one stream of the usual events
+        {"url", "success", "records", "error", "done", "failed", "pending"}
+    urls can be a lazy iterator (a URL file read line by line): the workers are started
+    once, with their browsers, and batches are read from it as they are taken, a few
+    ahead, so there is no restart and no idle tail between chunks of a big list.
+    "pending" counts the URLs read but not finished when the total isn't known.
+    scrape_options are passed on to stream_scrape (scheduler_settings, chunk_settings...),
+    they must be picklable. The job, if any, is updated here in the parent.
+    A control (see job_control.py) is watched here: once it stops, the workers are told
+    to stop too and close their browsers, and the stream ends with what was reported.
+    Workers apply its per-URL time limit themselves.
+    """
+    if not api_key:
+        raise ValueError("API Key is missing.")
+
+    settings = settings or WorkerSettings()
+    total = None
+    if isinstance(urls, Sized):
+        urls = list(dict.fromkeys(urls))
+        total = len(urls)
+    url_iter = iter(urls)
+    # URLs handed to the workers and not reported yet, by position in the input
+    in_flight: Dict[int, str] = {}
+    state = {"next": 0, "exhausted": False, "closed": False}
+
+    def next_batch() -> list:
+        batch: Dict[str, int] = {}
+        for url in url_iter:
+            if url not in batch:
+                batch[url] = state["next"]
+                state["next"] += 1
+            if len(batch) >= settings.batch_size:
+                break
+        else:
+            state["exhausted"] = True
+        in_flight.update((i, url) for url, i in batch.items())
+        return [(i, url) for url, i in batch.items()]
+
+    # Enough batches for every worker, more are read as results come in
+    first = []
+    while len(first) < settings.workers and not state["exhausted"]:
+        batch = next_batch()
+        if batch:
+            first.append(batch)
+    if not first:
+        return
+
+    # spawn: Playwright and a forked event loop don't mix
+    ctx = multiprocessing.get_context("spawn")
+    tasks = ctx.Queue()
+    results = ctx.Queue()
+    stop = ctx.Event()
+    control = scrape_options.pop("control", None)
+    if control is not None:
+        control.start()
+
+    for batch in first:
+        tasks.put(batch)
+    worker_count = max(1, min(settings.workers, len(first)))
+    # A couple of batches per worker queued up, so none waits on the parent
+    queued_ahead = worker_count * settings.batch_size * 2
+
+    scrape_kwargs = dict(scrape_options, fields=fields, model_id=model_id, api_key=api_key)
+    if control is not None:
+        # The job clock runs here in the parent
+        scrape_kwargs["limits"] = JobLimits(url_timeout=control.limits.url_timeout)
+    processes = [
+        ctx.Process(target=_worker_main, args=(i, tasks, results, stop, scrape_kwargs), daemon=True)
+        for i in range(worker_count)
+    ]
+    for process in processes:
+        process.start()
+    size = f"{total} URLs" if total is not None else "URLs"
+    print(f"[WORKERS] {size} over {worker_count} processes, {settings.batch_size} URLs per batch")
+
+    counts = {"done": 0, "failed": 0}
+    waiting: Dict[int, dict] = {}
+    next_index = 0
+    running = worker_count
+
+    def feed():
+        while not state["exhausted"] and len(in_flight) < queued_ahead:
+            batch = next_batch()
+            if batch:
+                tasks.put(batch)
+        if state["exhausted"] and not state["closed"]:
+            for _ in range(worker_count):
+                tasks.put(None)
+            state["closed"] = True
+
+    def finish(event: dict) -> dict:
+        if event["success"]:
+            counts["done"] += 1
+        else:
+            counts["failed"] += 1
+            print(f"Failed to scrape {event['url']}: {event['error']}")
+        if job is not None:
+            if event["success"]:
+                job.mark_extracted(event["url"], event["records"])
+            else:
+                job.mark_failed(event["url"], event["error"])
+        pending = (total if total is not None else state["next"]) - counts["done"] - counts["failed"]
+        return dict(event, done=counts["done"], failed=counts["failed"], pending=max(pending, 0))
+
+    try:
+        feed()
+        while running:
+            if control is not None and control.stopped:
+                break
+            try:
+                kind, key, event = await asyncio.to_thread(results.get, True, 1.0)
+            except queue.Empty:
+                # A worker killed from outside (OOM...) never says goodbye
+                if not any(process.is_alive() for process in processes):
+                    break
+                continue
+            if kind == "exit":
+                running -= 1
+                continue
+            if in_flight.pop(key, None) is None:
+                continue
+            feed()
+
+            if not settings.ordered:
+                yield finish(event)
+                continue
+
+            waiting[key] = event
+            while next_index in waiting:
+                yield finish(waiting.pop(next_index))
+                next_index += 1
+
+        if control is not None and control.stopped:
+            # Finished results held back for ordering are kept, the gaps stay unreported
+            for i in sorted(waiting):
+                yield finish(waiting[i])
+            print(f"[WORKERS] Stopped ({control.reason}): {counts['done']} done, {counts['failed']} failed")
+            return
+        # A worker that crashed leaves holes, report them as failed
+        for i, url in in_flight.items():
+            waiting[i] = {"url": url, "success": False, "records": [], "error": "Worker process died"}
+        for i in sorted(waiting):
+            yield finish(waiting[i])
+        if not state["exhausted"]:
+            print("[WORKERS] All workers died, the rest of the URLs were not read")
+    finally:
+        stop.set()
+        for process in processes:
+            # A stopped worker closes its browser first, give it a moment
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout=5)
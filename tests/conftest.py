@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app's modules are flat in src/, imported the way the app and the CLI import them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,48 @@
+import asyncio
+
+from crawl4ai.models import CrawlResult, CrawlerTaskResult
+
+from domain_scheduler import DomainScheduler
+from scheduler import SchedulerSettings
+
+
+class RecordingScheduler(DomainScheduler):
+    """Pages take a moment and record how many were in flight when each started."""
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.active = 0
+        self.started_with = []
+
+    async def crawl_url(self, url, config, task_id):
+        self.active += 1
+        self.started_with.append(self.active)
+        await asyncio.sleep(0.05)
+        self.active -= 1
+        return CrawlerTaskResult(
+            task_id=task_id, url=url, result=CrawlResult(url=url, html="", success=True),
+            memory_usage=0, peak_memory=0, start_time=0, end_time=0,
+        )
+
+
+def crawl(scheduler, urls):
+    async def run():
+        return [result async for result in scheduler._dispatch(urls, None)]
+
+    return asyncio.run(run())
+
+
+def test_one_domain_starts_up_to_its_cap_at_once():
+    scheduler = RecordingScheduler(SchedulerSettings(max_concurrency=10, per_domain_concurrency=4, per_domain_rate=0, memory_threshold_percent=100))
+    results = crawl(scheduler, [f"https://a.test/{i}" for i in range(8)])
+    assert len(results) == 8
+    # The first four go out in the same pass, the next four as they finish
+    assert scheduler.started_with[:4] == [1, 2, 3, 4]
+    assert max(scheduler.started_with) == 4
+
+
+def test_token_bucket_still_limits_a_domain():
+    scheduler = RecordingScheduler(SchedulerSettings(max_concurrency=10, per_domain_concurrency=4, per_domain_rate=5.0, per_domain_burst=2, memory_threshold_percent=100))
+    crawl(scheduler, [f"https://a.test/{i}" for i in range(3)] + ["https://b.test/0"])
+    # a's burst of two and b's first page start together, a's third page waits for a token
+    assert scheduler.started_with == [1, 2, 3, 1]
@@ -0,0 +1,74 @@
+import asyncio
+from types import SimpleNamespace
+
+from llm_batching import BatchSettings, PageBatcher, parse_batch_response
+from structured_output import INVALID_KEY
+
+
+def test_complete_reply_with_a_trailing_comma_keeps_every_page():
+    assert parse_batch_response('{"1": [{"name": "Ann"}], "2": [{"name": "Bo"}],}') == {
+        "1": [{"name": "Ann"}],
+        "2": [{"name": "Bo"}],
+    }
+
+
+def test_reply_cut_off_inside_the_last_page_drops_it():
+    assert parse_batch_response('{"1": [{"name": "Ann"}], "2": [{"name": "Bo"}, {"name": "Cy') == {"1": [{"name": "Ann"}]}
+
+
+def test_reply_cut_off_between_pages_keeps_the_finished_ones():
+    assert parse_batch_response('```json\n{"1": [{"name": "Ann"}], "2": {"name": "Bo"}') == {
+        "1": [{"name": "Ann"}],
+        "2": [{"name": "Bo"}],
+    }
+
+
+def test_batched_records_are_validated_like_single_pages(monkeypatch):
+    from LLM_extraction import schema_model
+    import crawl4ai.utils
+
+    reply = '{"1": [{"name": 7, "email": {"work": "a@x.com"}}], "2": []}'
+
+    async def fake_completion(*args, **kwargs):
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))], usage=None)
+
+    monkeypatch.setattr(crawl4ai.utils, "aperform_completion_with_backoff", fake_completion)
+    schema = {"properties": {"name": {"type": "string"}, "email": {"type": "string"}}}
+    batcher = PageBatcher(SimpleNamespace(provider="openai/test", api_token="key", base_url=None), schema, "", BatchSettings(linger_seconds=0.01), model=schema_model(("name", "email")))
+
+    async def run():
+        return await asyncio.gather(batcher.submit("http://a", "page a"), batcher.submit("http://b", "page b"))
+
+    first, second = asyncio.run(run())
+    assert first == [{"name": "7", INVALID_KEY: ["email"], "error": False, "URL": "http://a"}]
+    assert second == []
+
+
+def test_same_url_twice_in_one_batch_gets_its_own_usage(monkeypatch):
+    import crawl4ai.utils
+    from metrics import UrlMetrics, set_current_metrics
+
+    reply = '{"1": [{"name": "Ann"}], "2": [{"name": "Ann"}]}'
+
+    async def fake_completion(*args, **kwargs):
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=reply))],
+            usage=SimpleNamespace(prompt_tokens=100, completion_tokens=40),
+        )
+
+    monkeypatch.setattr(crawl4ai.utils, "aperform_completion_with_backoff", fake_completion)
+    schema = {"properties": {"name": {"type": "string"}}}
+    batcher = PageBatcher(SimpleNamespace(provider="openai/test", api_token="key", base_url=None), schema, "", BatchSettings(linger_seconds=0.01))
+
+    async def submit(metrics):
+        set_current_metrics(metrics)
+        return await batcher.submit("http://a", "page a")
+
+    async def run():
+        pages = [UrlMetrics(url="http://a"), UrlMetrics(url="http://a")]
+        await asyncio.gather(*(submit(m) for m in pages))
+        return pages
+
+    for m in asyncio.run(run()):
+        assert (m.prompt_tokens, m.completion_tokens, m.source) == (50, 20, "batch")
+    assert batcher._usage == {}
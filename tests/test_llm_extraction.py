@@ -0,0 +1,55 @@
+import asyncio
+
+
+def extractor_returning(fields, blocks):
+    from LLM_extraction import build_scrape_setup
+
+    _, _, extractor = build_scrape_setup(fields, "openai/test", "key", use_cache=False)
+    extractor.use_pre_extractors = False
+
+    async def fake_llm_extract(url, markdown, strategy):
+        return [dict(block) for block in blocks]
+
+    extractor._llm_extract = fake_llm_extract
+    return extractor
+
+
+def test_url_asked_for_in_capitals_is_stamped_with_the_current_page():
+    # A cached or near-duplicate extraction carries the URL of the page it came from
+    extractor = extractor_returning(["Name", "URL"], [{"name": "Ann", "url": "http://old", "URL": "http://old", "error": False}])
+    records = asyncio.run(extractor.extract("http://new", "page"))
+    assert records == [{"name": "Ann", "url": "http://new", "error": False}]
+
+
+def test_url_not_asked_for_is_only_updated_where_present():
+    extractor = extractor_returning(["name"], [{"name": "Ann", "error": False}, {"name": "Bo", "URL": "http://old", "error": False}])
+    records = asyncio.run(extractor.extract("http://new", "page"))
+    assert records == [{"name": "Ann", "error": False}, {"name": "Bo", "URL": "http://new", "error": False}]
+
+
+def test_batched_records_are_cached_under_the_full_schema(tmp_path):
+    from LLM_extraction import build_scrape_setup
+    from extraction_cache import ExtractionCache
+    from llm_batching import BatchSettings
+    from markdown_pruning import ChunkSettings
+
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite"))
+    _, _, extractor = build_scrape_setup(["name", "email"], "openai/test", "key", cache=cache, batch_settings=BatchSettings(), chunk_settings=ChunkSettings(enabled=False))
+    sent = []
+
+    async def fake_submit(url, markdown):
+        sent.append(url)
+        return [{"name": "Ann", "email": "ann@x.com", "URL": url, "error": False}]
+
+    extractor.batcher.submit = fake_submit
+    name_only = extractor._strategy_for(["name"])
+
+    records = asyncio.run(extractor._llm_extract("http://a", "page", name_only))
+    assert records[0]["email"] == "ann@x.com"
+    # Full-schema records under the reduced schema's key would come back with fields it didn't ask for
+    assert cache.get(extractor.cache_key("page", name_only.schema)) is None
+    assert cache.get(extractor.cache_key("page", extractor.llm_strategy.schema)) == records
+
+    asyncio.run(extractor._llm_extract("http://a", "page", name_only))
+    assert sent == ["http://a"]
+    cache.close()
@@ -0,0 +1,42 @@
+from markdown_pruning import merge_chunk_records
+
+FIELDS = ["name", "email"]
+
+
+def test_records_from_the_same_chunk_are_never_merged():
+    chunks = [[{"name": "Alice", "email": "N/A"}, {"name": "N/A", "email": "bob@x.com"}]]
+    assert merge_chunk_records(chunks, FIELDS) == chunks[0]
+
+
+def test_profile_split_at_a_chunk_boundary_is_merged():
+    chunks = [
+        [{"name": "Zed", "email": "z@x.com"}, {"name": "Alice", "email": "N/A"}],
+        [{"name": "N/A", "email": "alice@x.com"}, {"name": "Bob", "email": "N/A"}],
+    ]
+    assert merge_chunk_records(chunks, FIELDS) == [
+        {"name": "Zed", "email": "z@x.com"},
+        {"name": "Alice", "email": "alice@x.com"},
+        {"name": "Bob", "email": "N/A"},
+    ]
+
+
+def test_records_in_other_chunks_merge_on_a_shared_value_only():
+    chunks = [
+        [{"name": "Alice", "email": "N/A", "phone": "1"}],
+        [{"name": "Carol", "email": "N/A"}],
+        [{"name": "Alice", "email": "alice@x.com"}],
+    ]
+    assert merge_chunk_records(chunks, FIELDS) == [
+        {"name": "Alice", "email": "alice@x.com", "phone": "1"},
+        {"name": "Carol", "email": "N/A"},
+    ]
+
+
+def test_conflicting_values_stay_separate():
+    chunks = [[{"name": "Alice", "email": "a@x.com"}], [{"name": "Alice", "email": "b@x.com"}]]
+    assert len(merge_chunk_records(chunks, FIELDS)) == 2
+
+
+def test_empty_page_keeps_one_na_record():
+    chunks = [[{"name": "N/A", "email": "N/A"}], [{"name": "", "email": "none"}]]
+    assert merge_chunk_records(chunks, FIELDS) == [{"name": "N/A", "email": "N/A"}]
@@ -0,0 +1,46 @@
+import asyncio
+from types import SimpleNamespace
+
+from metrics import MetricsRecorder
+
+
+def crawl_result(url, start, end):
+    return SimpleNamespace(url=url, html="<p>x</p>", dispatch_result=SimpleNamespace(start_time=start, end_time=end))
+
+
+def test_browser_fallback_is_not_a_retry_and_not_fetch_time():
+    metrics = MetricsRecorder(path=None)
+    metrics.record_crawl(crawl_result("https://a.test", 10.0, 10.2), "static")
+    m = metrics.record_crawl(crawl_result("https://a.test", 1.0, 2.0), "browser")
+    assert m.fell_back and m.retries == 0
+    assert m.stages_ms == {"fallback": 200.0, "fetch": 1000.0}
+
+    metrics.finish("https://a.test", True)
+    assert metrics.summary()["totals"]["fallbacks"] == 1
+    assert metrics.summary()["totals"]["retries"] == 0
+
+
+def test_retries_count_what_the_retry_policy_reran():
+    metrics = MetricsRecorder(path=None)
+    metrics.record_crawl(crawl_result("https://a.test", 10.0, 10.1), "static")
+    metrics.record_retry("https://a.test")
+    m = metrics.record_crawl(crawl_result("https://a.test", 1.0, 1.1), "static")
+    assert m.retries == 1 and not m.fell_back
+
+
+def test_cost_needs_the_price_table():
+    metrics = MetricsRecorder(path=None, provider="openai/gpt-4o-mini")
+    metrics.for_url("https://a.test").add_llm(1000, 100)
+    assert metrics.finish("https://a.test", True).cost_usd is None
+
+    metrics.cost_per_token = lambda model, prompt_tokens, completion_tokens: (prompt_tokens * 1e-6, completion_tokens * 2e-6)
+    metrics.for_url("https://b.test").add_llm(1000, 100)
+    assert metrics.finish("https://b.test", True).cost_usd == 0.0012
+
+
+def test_load_pricing_runs_once():
+    metrics = MetricsRecorder(path=None)
+    marker = object()
+    metrics.cost_per_token = marker
+    asyncio.run(metrics.load_pricing())
+    assert metrics.cost_per_token is marker
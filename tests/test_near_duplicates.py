@@ -0,0 +1,79 @@
+import asyncio
+import random
+
+from near_duplicates import DedupSettings, NearDuplicateIndex, page_facts, simhash
+
+random.seed(7)
+# Letters only, numbers would count as page facts
+VOCABULARY = ["".join(random.choices("abcdefghijklmnopqrstuvwxyz", k=6)) for _ in range(2000)]
+WORDS = random.choices(VOCABULARY, k=300)
+
+
+def page(words, heading="Listing"):
+    return f"# {heading}\n\n" + " ".join(words)
+
+
+def distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def edited(words, count):
+    words = list(words)
+    for i in range(count):
+        words[10 + i * 25] = "changed"
+    return words
+
+
+def test_simhash_is_close_for_small_edits_and_far_for_unrelated_text():
+    assert simhash(WORDS) == simhash(list(WORDS))
+    assert distance(simhash(WORDS), simhash(edited(WORDS, 2))) <= DedupSettings().max_distance
+    assert distance(simhash(WORDS), simhash(random.choices(VOCABULARY, k=300))) > 20
+
+
+def test_page_facts_hold_emails_numbers_and_heading():
+    facts = page_facts("# Jane Doe\n\nMail [Jane@X.com](mailto:jane@x.com), call 555-0100.")
+    assert facts == frozenset({"jane@x.com", "555", "0100", "#jane doe"})
+
+
+def run_pages(index, pages, delay=0.0):
+    calls = []
+
+    async def extract(url, markdown):
+        async def run():
+            calls.append(url)
+            await asyncio.sleep(delay)
+            return [{"page": url, "error": False}]
+        return await index.extract(url, markdown, ("name",), run)
+
+    async def main():
+        return await asyncio.gather(*(extract(url, markdown) for url, markdown in pages))
+
+    return asyncio.run(main()), calls
+
+
+def test_pages_within_the_distance_reuse_the_original():
+    index = NearDuplicateIndex(DedupSettings())
+    results, calls = run_pages(index, [("a", page(WORDS)), ("b", page(edited(WORDS, 2)))])
+    assert calls == ["a"]
+    assert results[1] == ([{"page": "a", "error": False}], "a")
+
+
+def test_pages_past_the_distance_are_extracted():
+    index = NearDuplicateIndex(DedupSettings(max_distance=0))
+    _, calls = run_pages(index, [("a", page(WORDS)), ("b", page(edited(WORDS, 2)))])
+    assert calls == ["a", "b"]
+
+
+def test_same_template_with_other_facts_is_extracted():
+    # Identical text around a different heading: another profile, not a copy
+    index = NearDuplicateIndex(DedupSettings())
+    _, calls = run_pages(index, [("a", page(WORDS, "Jane Doe")), ("b", page(WORDS, "John Roe"))])
+    assert calls == ["a", "b"]
+
+
+def test_duplicate_stops_waiting_for_a_slow_original():
+    index = NearDuplicateIndex(DedupSettings(), url_timeout=0.1)
+    results, calls = run_pages(index, [("a", page(WORDS)), ("b", page(WORDS))], delay=0.3)
+    assert calls == ["a", "b"]
+    assert results[1] == ([{"page": "b", "error": False}], None)
+    assert index.waits_expired == 1
@@ -0,0 +1,103 @@
+import pandas as pd
+
+from record_cleaning import CleanSettings, clean_frame, clean_records, duplicate_groups
+
+KEYS = [("email",), ("phone",), ("name", "url")]
+
+
+def frame(rows):
+    return pd.DataFrame(rows, dtype="string")
+
+
+def test_rows_sharing_a_key_group_get_one_label():
+    df = frame([
+        {"email": "a@x.com", "phone": None},
+        {"email": "b@x.com", "phone": None},
+        {"email": "A@X.com", "phone": None},
+    ])
+    assert list(duplicate_groups(df, KEYS)) == [0, 1, 0]
+
+
+def test_groups_merge_transitively_across_keys():
+    # a-b share an email, b-c a phone, c-d name + url: one cluster, e stays alone
+    df = frame([
+        {"email": "a@x.com", "phone": None, "name": "Al", "url": "u1"},
+        {"email": "a@x.com", "phone": "555", "name": None, "url": "u2"},
+        {"email": None, "phone": "555", "name": "Cy", "url": "u3"},
+        {"email": None, "phone": None, "name": "Cy", "url": "u3"},
+        {"email": "e@x.com", "phone": "777", "name": "Ed", "url": "u1"},
+    ])
+    assert list(duplicate_groups(df, KEYS)) == [0, 0, 0, 0, 4]
+
+
+def test_long_chain_collapses_to_the_first_row():
+    # 0-4 share a phone, 4-1 a name + url, 1-3 a phone, 3-2 an email: row 2 only reaches row 0 through all of them
+    df = frame([
+        {"email": None, "phone": "p", "name": None, "url": None},
+        {"email": None, "phone": "q", "name": "n", "url": "u"},
+        {"email": "e", "phone": None, "name": None, "url": None},
+        {"email": "e", "phone": "q", "name": None, "url": None},
+        {"email": None, "phone": "p", "name": "n", "url": "u"},
+        {"email": "f", "phone": "r", "name": None, "url": None},
+    ])
+    assert list(duplicate_groups(df, KEYS)) == [0, 0, 0, 0, 0, 5]
+
+
+def test_rows_with_different_emails_never_share_a_cluster():
+    # A switchboard number links everyone, the emails keep them apart; c has nothing of its own to merge on
+    df = frame([
+        {"email": "a@x.com", "phone": "555"},
+        {"email": "b@x.com", "phone": "555"},
+        {"email": None, "phone": "555"},
+        {"email": "a@x.com", "phone": None},
+    ])
+    assert list(duplicate_groups(df, KEYS)) == [0, 1, 2, 0]
+
+
+def test_phone_is_not_a_key_by_default():
+    df = frame([
+        {"name": f"Person {i}", "email": f"p{i}@x.com", "phone": "+6321234567"}
+        for i in range(50)
+    ] + [{"name": "Front desk", "email": None, "phone": "+6321234567"}])
+    assert len(clean_frame(df)) == 51
+    assert ("phone",) not in CleanSettings().keys
+
+
+def test_missing_values_and_unknown_columns_never_match():
+    df = frame([
+        {"email": None, "name": "Al"},
+        {"email": None, "name": "Al"},
+    ])
+    # ("name", "url") is skipped, there is no url column
+    assert list(duplicate_groups(df, KEYS)) == [0, 1]
+
+
+def test_clean_frame_normalizes_and_merges_duplicates():
+    df = pd.DataFrame([
+        {"Name": " Alice  Smith ", "Email": "ALICE@X.COM", "Phone": "N/A"},
+        {"Name": "Bob", "Email": "n/a", "Phone": "+1 (555) 010-2000"},
+        {"Name": "Alice Smith", "Email": "alice@x.com", "Phone": "+44 20 7946 0000"},
+        {"Name": "-", "Email": "", "Phone": "none"},
+    ])
+    cleaned = clean_frame(df)
+    assert list(cleaned.columns) == ["name", "email", "phone"]
+    # Alice's rows merge on the email, the empty row is dropped
+    assert cleaned.astype(object).where(cleaned.notna(), None).to_dict(orient="records") == [
+        {"name": "Alice Smith", "email": "alice@x.com", "phone": "+442079460000"},
+        {"name": "Bob", "email": None, "phone": "+15550102000"},
+    ]
+
+
+def test_source_urls_key_records_without_being_kept():
+    records = [{"name": "Al"}, {"name": "Al"}, {"name": "Al"}, {"name": "N/A"}]
+    cleaned = clean_records(records, CleanSettings(), ["u1", "u1", "u2", "u3"])
+    assert cleaned == [{"name": "Al"}, {"name": "Al"}]
+
+
+def test_no_merge_keeps_the_first_duplicate_as_is():
+    df = frame([
+        {"email": "a@x.com", "name": None},
+        {"email": "a@x.com", "name": "Al"},
+    ])
+    cleaned = clean_frame(df, CleanSettings(merge=False))
+    assert cleaned["name"].isna().all() and len(cleaned) == 1
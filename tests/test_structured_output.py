@@ -0,0 +1,138 @@
+import sys
+import asyncio
+from types import SimpleNamespace
+
+from structured_output import INVALID_KEY, invalid_fields, parse_json_reply, parse_records, to_items, validate_records
+
+FIELDS = ["name", "email"]
+SCHEMA = {"properties": {name: {"type": "string"} for name in FIELDS}}
+
+
+def model():
+    from LLM_extraction import schema_model
+    return schema_model(tuple(FIELDS))
+
+
+def test_well_formed_reply_is_not_repaired():
+    assert parse_json_reply('[{"name": "Ann", "email": "a@x.com"}]') == ([{"name": "Ann", "email": "a@x.com"}], False)
+
+
+def test_trailing_commas_and_fences():
+    value, repaired = parse_json_reply('```json\n[{"name": "Ann", "email": "a@x.com",},]\n```')
+    assert value == [{"name": "Ann", "email": "a@x.com"}]
+    assert repaired
+
+
+def test_truncated_reply_keeps_complete_values_only():
+    value, repaired = parse_json_reply('[{"name": "Ann", "email": "a@x.com"}, {"name": "Bo", "email": "b@x')
+    assert repaired
+    assert value == [{"name": "Ann", "email": "a@x.com"}, {"name": "Bo"}]
+
+
+def test_truncated_number_is_left_out():
+    value, _ = parse_json_reply('{"name": "Ann", "age": 4')
+    assert value == {"name": "Ann"}
+
+
+def test_prose_around_the_json():
+    value, repaired = parse_json_reply('Sure! Here are the records:\n[{"name": "Ann"}]\nLet me know if you need more.')
+    assert value == [{"name": "Ann"}]
+    assert not repaired
+
+
+def test_valid_json_in_prose_is_skipped_for_the_records():
+    assert parse_json_reply('Note [1] says: [{"a": "x"}]') == ([{"a": "x"}], False)
+
+
+def test_json_without_records_is_still_returned():
+    assert parse_json_reply("[1, 2]") == ([1, 2], False)
+    assert parse_json_reply("no json here") == (None, False)
+
+
+def test_single_quotes_unquoted_keys_and_python_literals():
+    value, repaired = parse_json_reply("[{name: 'Ann', 'active': True, 'note': None}]")
+    assert value == [{"name": "Ann", "active": True, "note": None}]
+    assert repaired
+
+
+def test_to_items_unwraps_record_lists_only():
+    assert to_items({"records": [{"name": "Ann"}]}) == [{"name": "Ann"}]
+    assert to_items({"records": []}) == []
+    assert to_items({"tags": ["a", "b"]}) == [{"tags": ["a", "b"]}]
+    assert to_items({"name": "Ann"}) == [{"name": "Ann"}]
+
+
+def test_validate_coerces_scalars_and_lists_invalid_fields():
+    records = validate_records([{"name": 42, "email": {"work": "a@x.com"}}], model(), FIELDS)
+    assert records == [{"name": "42", INVALID_KEY: ["email"], "error": False}]
+    assert invalid_fields(records) == ["email"]
+
+
+def test_cut_off_record_is_dropped_unless_it_is_all_there_is():
+    records, repaired = parse_records('[{"name": "Ann", "email": "a@x.com"}, {"na', model(), FIELDS)
+    assert repaired
+    assert [r["name"] for r in records] == ["Ann"]
+    records, _ = parse_records('[{"na', model(), FIELDS)
+    assert len(records) == 1 and sorted(records[0][INVALID_KEY]) == sorted(FIELDS)
+
+
+def extractor_with_answers(answers):
+    from LLM_extraction import build_scrape_setup
+
+    _, _, extractor = build_scrape_setup(FIELDS, "openai/test", "key", use_cache=False)
+    asked = []
+
+    async def fake_chunks(url, markdown, strategy, use_batcher=True, chunks=None):
+        asked.append(list(strategy.schema["properties"]))
+        return answers, strategy.schema
+
+    extractor._extract_chunks = fake_chunks
+    return extractor, asked
+
+
+def test_refill_asks_for_the_failed_fields_and_matches_by_position():
+    blocks = [
+        {"name": "Ann", INVALID_KEY: ["email"], "error": False},
+        {"name": "Bo", "email": "b@x.com", "error": False},
+    ]
+    extractor, asked = extractor_with_answers([{"email": "a@x.com", "error": False}, {"email": "other@x.com", "error": False}])
+    records = asyncio.run(extractor._refill("http://x", "page", blocks))
+    assert asked == [["email"]]
+    assert records == [
+        {"name": "Ann", "email": "a@x.com", "error": False},
+        {"name": "Bo", "email": "b@x.com", "error": False},
+    ]
+
+
+def test_refill_with_a_different_record_count_leaves_na():
+    blocks = [{"name": "Ann", INVALID_KEY: ["email"], "error": False}, {"name": "Bo", INVALID_KEY: ["email"], "error": False}]
+    extractor, _ = extractor_with_answers([{"email": "a@x.com", "error": False}])
+    records = asyncio.run(extractor._refill("http://x", "page", blocks))
+    assert [r["email"] for r in records] == ["N/A", "N/A"]
+
+
+def test_failed_capability_lookup_is_remembered_as_prompt(monkeypatch):
+    import structured_output
+
+    calls = []
+
+    def supports_response_schema(model):
+        calls.append(model)
+        raise RuntimeError("no such model")
+
+    monkeypatch.setitem(sys.modules, "litellm", SimpleNamespace(supports_response_schema=supports_response_schema))
+    monkeypatch.setattr(structured_output, "_NATIVE_MODE", {})
+    assert structured_output.response_format_for("acme/model", SCHEMA) is None
+    assert calls == []
+
+    assert asyncio.run(structured_output.resolve_native_mode("acme/model")) == "prompt"
+    assert asyncio.run(structured_output.resolve_native_mode("acme/model")) == "prompt"
+    assert calls == ["acme/model"]
+
+
+def test_resolved_schema_mode_sends_a_strict_schema(monkeypatch):
+    import structured_output
+
+    monkeypatch.setattr(structured_output, "_NATIVE_MODE", {"acme/model": "schema"})
+    response_format = structured_output.response_format_for("acme/model", SCHEMA)
+    assert response_format["json_schema"]["strict"] is True